@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .slow_queries import install_slow_query_log
+        from .timing import install_query_recorder
+
+        connection_created.connect(install_query_recorder, dispatch_uid="api.timing")
+        connection_created.connect(install_slow_query_log, dispatch_uid="api.slow_queries")
@@ -0,0 +1,233 @@
+"""
+Асинхронные (async ORM) варианты часто вызываемых эндпоинтов чтения.
+Под ASGI они не занимают поток на время запроса к БД. Ответы совпадают
+с синхронными представлениями из views.py; какие из них подключены к
+маршрутам, определяет настройка ASYNC_READ_VIEWS. Потоковую отдачу
+(?stream=1) и форматы, кроме JSON (msgpack), async-варианты передают
+синхронному представлению.
+"""
+
+import io
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from rest_framework import status
+from rest_framework.exceptions import NotAcceptable, ParseError
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from core.models import (
+    Machine,
+    DictionaryEntry,
+)
+from .authentication import CookiesJWTAuthentication
+from .components import get_machine_queryset
+from .filters import MachineFilter
+from .parsers import FastJSONParser
+from .permissions import IsManagerOrSuperadmin
+from .renderers import FastJSONRenderer
+from .serializers import (
+    MachinePublicSerializer,
+    MachineFullSerializer,
+    MachineListSerializer,
+    MachineDetailSerializer,
+    DictionaryEntryListSerializer,
+)
+from .streaming import StreamingListMixin
+from .timing import timed
+from .views import DictEntryListView, MachineListView
+
+
+NOT_AUTHENTICATED = {"detail": "Authentication credentials were not provided."}
+PERMISSION_DENIED = {"detail": "You do not have permission to perform this action."}
+
+
+def serialize(serializer):
+    with timed("serialize"):
+        return serializer.data
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    with timed("render"):
+        content = FastJSONRenderer().render(data)
+    response = HttpResponse(
+        content,
+        content_type="application/json",
+        status=status,
+    )
+    if status == 401:
+        response["WWW-Authenticate"] = 'Bearer realm="api"'
+    return response
+
+
+class AsyncAPIView(View):
+    """
+    Базовое async-представление: аутентификация по JWT из cookie, как у
+    CookiesJWTAuthentication. Если requires_auth, анонимным отвечает 401.
+
+    sync_view - синхронное представление DRF с тем же ответом: ему
+    передаются запросы, которые async-вариант не обслуживает (см.
+    needs_sync_view).
+    """
+    requires_auth = True
+    sync_view = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        if self.sync_view is not None and self.needs_sync_view(request):
+            return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+        user = await CookiesJWTAuthentication().aauthenticate(request)
+        request.user = user or AnonymousUser()
+        if self.requires_auth and user is None:
+            return json_response(NOT_AUTHENTICATED, status.HTTP_401_UNAUTHORIZED)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def needs_sync_view(self, request):
+        """Потоковая отдача или формат ответа, отличный от компактного JSON."""
+        if request.GET.get(StreamingListMixin.stream_param) in ("1", "true"):
+            return True
+        renderers = [renderer_class() for renderer_class in api_settings.DEFAULT_RENDERER_CLASSES]
+        try:
+            renderer, media_type = DefaultContentNegotiation().select_renderer(Request(request), renderers)
+        except NotAcceptable:
+            # Ответ 406 формирует DRF
+            return True
+        return not isinstance(renderer, FastJSONRenderer) or bool(
+            renderer.get_indent(media_type, {})
+        )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncMachineSearchView(AsyncAPIView):
+    requires_auth = False
+
+    def parse_data(self, request):
+        if request.content_type == "application/json":
+            return FastJSONParser().parse(
+                io.BytesIO(request.body),
+                parser_context={"encoding": request.encoding or "utf-8"},
+            )
+        return request.POST
+
+    async def post(self, request):
+        try:
+            factory_number = self.parse_data(request).get("factory_number")
+        except (ParseError, AttributeError) as e:
+            return json_response({"detail": str(e)}, status.HTTP_400_BAD_REQUEST)
+
+        if not factory_number:
+            return json_response(
+                {
+                    "success": False,
+                    "error": "Заводской номер машины обязателен.",
+                },
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            machine = await Machine.objects.select_related(
+                "model_tech",
+                "engine_model",
+                "transmission_model",
+                "drive_axle_model",
+                "steering_axle_model",
+                "client",
+                "service_company",
+            ).aget(
+                factory_number=factory_number,
+            )
+
+            if request.user.is_authenticated:
+                serializer = MachineFullSerializer(machine)
+                user_status = "authorized"
+            else:
+                serializer = MachinePublicSerializer(machine)
+                user_status = "unauthorized"
+
+            return json_response({
+                "success": True,
+                "data": serialize(serializer),
+                "user_status": user_status,
+            })
+        except Machine.DoesNotExist:
+            return json_response(
+                {
+                    "success": False,
+                    "error": "Машина с указанным заводским номером не найдена.",
+                },
+                status.HTTP_404_NOT_FOUND,
+            )
+        except Exception as e:
+            return json_response(
+                {
+                    "success": False,
+                    "error": f"Произошла ошибка при поиске машины: {str(e)}",
+                },
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class AsyncMachineListView(AsyncAPIView):
+    sync_view = staticmethod(MachineListView.as_view())
+
+    async def get(self, request):
+        filterset = MachineFilter(
+            request.GET,
+            queryset=get_machine_queryset(request.user),
+            request=request,
+        )
+        if not filterset.is_valid():
+            return json_response(filterset.errors, status.HTTP_400_BAD_REQUEST)
+
+        machines = [machine async for machine in filterset.qs]
+        return json_response(serialize(MachineListSerializer(machines, many=True)))
+
+
+class AsyncMachineDetailView(AsyncAPIView):
+    async def get(self, request, pk):
+        user = request.user
+        queryset = Machine.objects.select_related(
+            'client',
+            'service_company',
+            'steering_axle_model',
+            'drive_axle_model',
+            'transmission_model',
+            'engine_model',
+            'model_tech',
+        )
+
+        if await user.groups.filter(name='client').aexists():
+            queryset = queryset.filter(client=user)
+        elif await user.groups.filter(name='service_company').aexists():
+            queryset = queryset.filter(service_company=user)
+
+        try:
+            machine = await queryset.aget(pk=pk)
+        except Machine.DoesNotExist:
+            return json_response(
+                {"detail": f"Машина с ID {pk} не найдена или недоступна"},
+                status.HTTP_404_NOT_FOUND,
+            )
+
+        return json_response(serialize(MachineDetailSerializer(machine)))
+
+
+class AsyncDictEntryListView(AsyncAPIView):
+    sync_view = staticmethod(DictEntryListView.as_view())
+
+    async def get(self, request):
+        # Те же права, что у DictEntryListView (группа загружена при аутентификации)
+        if not IsManagerOrSuperadmin().has_permission(request, self):
+            return json_response(PERMISSION_DENIED, status.HTTP_403_FORBIDDEN)
+
+        entries = [
+            entry
+            async for entry in DictionaryEntry.objects.all().order_by('entity')
+        ]
+        return json_response(serialize(DictionaryEntryListSerializer(entries, many=True)))
@@ -1,5 +1,7 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
 
 
 class CookiesJWTAuthentication(JWTAuthentication):
@@ -16,3 +18,34 @@ class CookiesJWTAuthentication(JWTAuthentication):
             return None
         except Exception:
             return None
+
+    async def aauthenticate(self, request):
+        """
+        Асинхронный вариант authenticate для async-представлений: токен
+        проверяется так же, пользователь читается через async ORM.
+        Возвращает пользователя (с группой) или None.
+        """
+        access_token = request.COOKIES.get("access_token")
+        if not access_token:
+            return None
+
+        try:
+            validated_token = self.get_validated_token(access_token)
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except (InvalidToken, TokenError, KeyError):
+            return None
+
+        try:
+            user = await self.user_model.objects.select_related("group").aget(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist:
+            return None
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            return None
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            return None
+        return user
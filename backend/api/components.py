@@ -0,0 +1,95 @@
+"""
+Общие для эндпоинтов части ответа с кэшированием по версиям core.cache:
+данные пользователя, видимые ему машины и версия справочников.
+"""
+
+from django.core.cache import cache
+
+from core.cache import get_version, get_versions
+from core.metrics import count_cache
+from core.models import Machine
+
+from .serializers import MachineListSerializer
+
+
+USER_TYPE_MAPPING = {
+    "Клиент": "client",
+    "Сервисная организация": "service_company",
+    "Менеджер": "manager",
+    "Суперадмин": "superadmin",
+}
+
+CACHE_TIMEOUT = 300
+
+# Группы версий (core.cache), от которых зависят компоненты
+COMPONENT_VERSIONS = ("users", "machines", "dictionary")
+
+
+def get_component_versions():
+    """Версии всех компонентов одним запросом - для эндпоинтов из нескольких частей."""
+    return get_versions(*COMPONENT_VERSIONS)
+
+
+def get_user_data(user, versions=None):
+    """Данные текущего пользователя в формате CurrentUserView."""
+    version = versions["users"] if versions else get_version("users")
+    key = f"user-data:{user.pk}:{version}"
+    data = cache.get(key)
+    count_cache("user-data", data is not None)
+    if data is None:
+        group_name = user.group.name if user.group else None
+        data = {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email or "empty",
+            "user_description": user.user_description or "empty",
+            "group_name": USER_TYPE_MAPPING.get(group_name, "unknown"),
+            "permissions": sorted(user.get_all_permissions()),
+        }
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def get_machine_queryset(user):
+    """Машины, видимые пользователю по его группе."""
+    queryset = Machine.objects.select_related(
+        'client',
+        'service_company',
+        'steering_axle_model',
+        'drive_axle_model',
+        'transmission_model',
+        'engine_model',
+        'model_tech',
+    )
+
+    group_name = user.group.name if user.group else None
+
+    if group_name == 'Клиент':
+        queryset = queryset.filter(client=user)
+    elif group_name == 'Сервисная организация':
+        queryset = queryset.filter(service_company=user)
+    elif not group_name:
+        return Machine.objects.none()
+
+    return queryset.order_by('-shipment_date')
+
+
+def get_machine_page(user, page_size, versions=None):
+    """Первые page_size машин пользователя и их общее число."""
+    version = versions["machines"] if versions else get_version("machines")
+    key = f"machine-page:{user.pk}:{page_size}:{version}"
+    page = cache.get(key)
+    count_cache("machine-page", page is not None)
+    if page is None:
+        queryset = get_machine_queryset(user)
+        page = {
+            "count": queryset.count(),
+            "results": MachineListSerializer(queryset[:page_size], many=True).data,
+        }
+        cache.set(key, page, CACHE_TIMEOUT)
+    return page
+
+
+def get_dictionary_version(versions=None):
+    """Меняется при любом изменении справочников."""
+    return str(versions["dictionary"] if versions else get_version("dictionary"))
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+
+from core.events import hub
+
+from .authentication import CookiesJWTAuthentication
+from .components import USER_TYPE_MAPPING
+
+
+# Комментарий-пинг, чтобы прокси не закрывали простаивающее соединение
+HEARTBEAT_INTERVAL = 15
+# Событий в очереди соединения, после которых клиент отключается
+QUEUE_SIZE = 100
+
+
+def format_event(event):
+    # Поля для фильтрации по роли клиенту не отдаются
+    payload = {
+        key: value
+        for key, value in event.items()
+        if key not in ("client_id", "service_company_id")
+    }
+    return (
+        f"id: {event['version']}\n"
+        f"event: {event['type']}\n"
+        f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    )
+
+
+async def stream_events(user_id, role):
+    subscription = hub.subscribe(user_id, role, max_size=QUEUE_SIZE)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if event is None:
+                # Клиент не успевал читать события - переподключится и
+                # догонит изменения через /machines/changes
+                yield "event: dropped\ndata: {}\n\n"
+                return
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def fleet_events(request):
+    """
+    SSE-поток изменений парка техники (создание, изменение и удаление
+    машин, новые ТО и рекламации) с фильтрацией по роли. Работает под
+    ASGI (silant_project.asgi); события приходят из сигналов моделей
+    этого процесса. Под WSGI бесконечный поток занял бы воркер на всё
+    время подписки, поэтому там отвечает 501.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "Event stream requires the ASGI server (silant_project.asgi)."},
+            status=501,
+        )
+    user = await CookiesJWTAuthentication().aauthenticate(request)
+    if user is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."},
+            status=401,
+        )
+    role = USER_TYPE_MAPPING.get(user.group.name if user.group else None)
+    if role is None:
+        return JsonResponse(
+            {"detail": "You do not have permission to perform this action."},
+            status=403,
+        )
+
+    response = StreamingHttpResponse(
+        stream_events(user.pk, role),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
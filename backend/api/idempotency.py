@@ -0,0 +1,137 @@
+import hashlib
+
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.models import IdempotencyRecord
+
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def get_ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+
+def get_pending_timeout():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_PENDING_TIMEOUT", 60))
+
+
+def take_over(record):
+    """
+    Занимает ключ оборванного запроса: запись без ответа старше
+    IDEMPOTENCY_PENDING_TIMEOUT. Обновление условное, поэтому из
+    нескольких повторов ключ достаётся только одному.
+    """
+    now = timezone.now()
+    taken = IdempotencyRecord.objects.filter(
+        pk=record.pk,
+        status_code__isnull=True,
+        created_at=record.created_at,
+    ).update(created_at=now)
+    record.created_at = now
+    return bool(taken)
+
+
+def purge_expired():
+    """Удаляет ответы старше IDEMPOTENCY_KEY_TTL, возвращает их число."""
+    deleted, _ = IdempotencyRecord.objects.filter(
+        created_at__lt=timezone.now() - get_ttl(),
+    ).delete()
+    return deleted
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(b"\0")
+    digest.update(request.path.encode())
+    digest.update(b"\0")
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def replay(record):
+    response = Response(record.response_data, status=record.status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def idempotent(view):
+    """
+    Декоратор создающего представления (под @api_view): запрос с
+    заголовком Idempotency-Key выполняется один раз, повтор с тем же
+    ключом получает сохранённый ответ без вызова представления. Ответы
+    с кодом 5xx не сохраняются - такой запрос можно повторить, как и
+    запрос, оставшийся без ответа дольше IDEMPOTENCY_PENDING_TIMEOUT.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'{HEADER} длиннее {MAX_KEY_LENGTH} символов'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = request.user
+        fingerprint = request_fingerprint(request)
+        record = IdempotencyRecord.objects.filter(user=user, key=key).first()
+        # Просроченный ключ считается неиспользованным
+        if record is not None and record.created_at < timezone.now() - get_ttl():
+            record.delete()
+            record = None
+
+        if record is not None:
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {'error': f'{HEADER} уже использован для другого запроса'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if record.status_code is not None:
+                return replay(record)
+            if (
+                record.created_at >= timezone.now() - get_pending_timeout()
+                or not take_over(record)
+            ):
+                return Response(
+                    {'error': 'Запрос с этим ключом ещё выполняется'},
+                    status=status.HTTP_409_CONFLICT
+                )
+        else:
+            try:
+                record = IdempotencyRecord.objects.create(
+                    user=user,
+                    key=key,
+                    fingerprint=fingerprint,
+                )
+            except IntegrityError:
+                # Параллельный запрос с тем же ключом успел начаться первым
+                return wrapper(request, *args, **kwargs)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+
+        # Сохраняются только ответы DRF (Response.data)
+        if response.status_code >= 500 or not hasattr(response, "data"):
+            record.delete()
+        else:
+            record.status_code = response.status_code
+            record.response_data = response.data
+            record.save(update_fields=["status_code", "response_data"])
+        return response
+
+    return wrapper
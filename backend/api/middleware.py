@@ -0,0 +1,325 @@
+import hashlib
+import json
+import logging
+import time
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+from core.metrics import (
+    REQUEST_DB_QUERIES,
+    REQUEST_DURATION,
+    REQUESTS,
+    THROTTLED_REQUESTS,
+    count_cache,
+)
+
+from .timing import get_current, measure_request
+
+logger = logging.getLogger("api.timing")
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class GzipCodec:
+    name = "gzip"
+
+    def compress(self, data):
+        compressor = self.compressobj()
+        return compressor.compress(data) + compressor.flush()
+
+    def compressobj(self):
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def flush_chunk(self, compressor, data):
+        # Z_SYNC_FLUSH отдаёт клиенту всё сжатое к этому моменту
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, compressor):
+        return compressor.flush()
+
+
+class BrotliCodec:
+    name = "br"
+
+    def compress(self, data):
+        return brotli.compress(data, quality=5)
+
+    def compressobj(self):
+        return brotli.Compressor(quality=5)
+
+    def flush_chunk(self, compressor, data):
+        return compressor.process(data) + compressor.flush()
+
+    def finish(self, compressor):
+        return compressor.finish()
+
+
+class ZstdCodec:
+    name = "zstd"
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=3).compress(data)
+
+    def compressobj(self):
+        return zstandard.ZstdCompressor(level=3).compressobj()
+
+    def flush_chunk(self, compressor, data):
+        return compressor.compress(data) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, compressor):
+        return compressor.flush()
+
+
+# Кодеки в порядке предпочтения; br и zstd - если установлены пакеты
+CODECS = [
+    *([BrotliCodec()] if brotli is not None else []),
+    *([ZstdCodec()] if zstandard is not None else []),
+    GzipCodec(),
+]
+
+
+def parse_accept_encoding(header):
+    """Кодировки из Accept-Encoding с q > 0."""
+    accepted = set()
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов API (COMPRESSION_PATH_PREFIXES) размером от
+    COMPRESSION_MIN_SIZE байт: br или zstd, если пакеты установлены и клиент
+    их принимает, иначе gzip. Потоковые ответы сжимаются по чанкам со сбросом
+    буфера после каждого, поэтому клиент получает данные сразу.
+
+    Сжатые тела размером от COMPRESSION_CACHE_MIN_SIZE кэшируются по хэшу
+    несжатого тела: повторно отрендеренный одинаковый ответ не сжимается
+    заново.
+    """
+    # Поток событий должен доходить до клиента без буферизации
+    SKIP_CONTENT_TYPES = ("text/event-stream",)
+
+    # Под ASGI работает без переключения в поток
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        self.cache_min_size = getattr(settings, "COMPRESSION_CACHE_MIN_SIZE", 64 * 1024)
+        self.cache_timeout = getattr(settings, "COMPRESSION_CACHE_TIMEOUT", 300)
+        self.path_prefixes = tuple(getattr(settings, "COMPRESSION_PATH_PREFIXES", ["/api/"]))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.path.startswith(self.path_prefixes):
+            return self.process_response(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.path.startswith(self.path_prefixes):
+            return self.process_response(request, response)
+        return response
+
+    def choose_codec(self, request):
+        accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        for codec in CODECS:
+            if codec.name in accepted:
+                return codec
+        return None
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+        if response.get("Content-Type", "").startswith(self.SKIP_CONTENT_TYPES):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        codec = self.choose_codec(request)
+        if codec is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.compress_async_stream(
+                    codec, response.streaming_content,
+                )
+            else:
+                response.streaming_content = self.compress_stream(
+                    codec, response.streaming_content,
+                )
+            del response.headers["Content-Length"]
+        else:
+            compressed = self.compress_content(codec, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = codec.name
+        return response
+
+    def compress_content(self, codec, content):
+        if len(content) < self.cache_min_size:
+            return codec.compress(content)
+
+        key = f"compressed:{codec.name}:{hashlib.blake2b(content, digest_size=20).hexdigest()}"
+        compressed = cache.get(key)
+        count_cache("compressed-body", compressed is not None)
+        if compressed is None:
+            compressed = codec.compress(content)
+            cache.set(key, compressed, self.cache_timeout)
+        return compressed
+
+    def compress_stream(self, codec, chunks):
+        compressor = codec.compressobj()
+        for chunk in chunks:
+            if chunk:
+                yield codec.flush_chunk(compressor, chunk)
+        yield codec.finish(compressor)
+
+    async def compress_async_stream(self, codec, chunks):
+        compressor = codec.compressobj()
+        async for chunk in chunks:
+            if chunk:
+                yield codec.flush_chunk(compressor, chunk)
+        yield codec.finish(compressor)
+
+
+class RequestTimingMiddleware:
+    """
+    Замер запросов API (REQUEST_TIMING_PATH_PREFIXES): число и время
+    запросов к БД, сериализация (api.timing.timed), рендеринг и общее
+    время. Результат отдаётся заголовком Server-Timing и в метрики
+    Prometheus (core.metrics), строка JSON по каждому запросу пишется в
+    лог api.timing с уровнем DEBUG. Для потоковых ответов учитывается
+    время до начала отправки тела.
+
+    QUERY_BUDGETS задаёт допустимое число запросов к БД по имени
+    маршрута (DEFAULT_QUERY_BUDGET - для остальных); при превышении в
+    лог пишется предупреждение с самыми частыми запросами (SQL обрезается
+    до BUDGET_SQL_LENGTH символов).
+    """
+    BUDGET_SQL_LENGTH = 300
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.path_prefixes = tuple(getattr(settings, "REQUEST_TIMING_PATH_PREFIXES", ["/api/"]))
+        self.budgets = getattr(settings, "QUERY_BUDGETS", {})
+        self.default_budget = getattr(settings, "DEFAULT_QUERY_BUDGET", None)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not request.path.startswith(self.path_prefixes):
+            return self.get_response(request)
+        with measure_request() as timing:
+            response = self.get_response(request)
+            self.finish(request, response, timing)
+        return response
+
+    async def __acall__(self, request):
+        if not request.path.startswith(self.path_prefixes):
+            return await self.get_response(request)
+        with measure_request() as timing:
+            response = await self.get_response(request)
+            self.finish(request, response, timing)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = get_current()
+        if timing is not None:
+            timing.view = request.resolver_match.url_name
+            timing.path = request.path
+        return None
+
+    def process_template_response(self, request, response):
+        # Вызывается последним перед render(): мидлварь стоит первой в списке
+        timing = get_current()
+        if timing is None:
+            return response
+        started = time.perf_counter()
+        response.add_post_render_callback(
+            lambda rendered: timing.add_phase("render", time.perf_counter() - started)
+        )
+        return response
+
+    def finish(self, request, response, timing):
+        response["Server-Timing"] = timing.server_timing()
+
+        match = request.resolver_match
+        route = match.url_name if match is not None else None
+        self.record_metrics(request, response, timing, route)
+        if logger.isEnabledFor(logging.DEBUG):
+            fields = {
+                "method": request.method,
+                "path": request.path,
+                "route": route,
+                "status": response.status_code,
+                "db_queries": timing.db_count,
+                **{
+                    f"{name}_ms": round(duration * 1000, 1)
+                    for name, duration, _ in timing.metrics()
+                },
+            }
+            logger.debug(json.dumps(fields, ensure_ascii=False))
+
+        budget = self.budgets.get(route, self.default_budget)
+        if budget is not None and timing.db_count > budget:
+            lines = [
+                f"{request.method} {request.path} ({route}): {timing.db_count} DB queries, "
+                f"budget {budget}, {timing.total() * 1000:.1f} ms",
+            ]
+            for sql, count in timing.repeated_queries():
+                if len(sql) > self.BUDGET_SQL_LENGTH:
+                    sql = f"{sql[:self.BUDGET_SQL_LENGTH]}..."
+                lines.append(f"  x{count}: {sql}")
+            logger.warning("\n".join(lines))
+
+    def record_metrics(self, request, response, timing, route):
+        # Метка view - имя маршрута, а не путь: число рядов ограничено
+        view = route or "unmatched"
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        REQUEST_DURATION.observe(timing.total(), view=view, method=request.method)
+        REQUEST_DB_QUERIES.observe(timing.db_count, view=view)
+        if response.status_code == 429:
+            THROTTLED_REQUESTS.inc(view=view)
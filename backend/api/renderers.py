@@ -0,0 +1,61 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Типы, которые orjson и msgpack не кодируют сами (lazy-строки, Decimal,
+# timedelta и т.п.), приводятся так же, как в стандартном JSONRenderer
+_default_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    return _default_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Вывод побайтно совпадает со стандартным
+    рендерером (компактный JSON в UTF-8; проверяется в api.tests), кроме
+    записи float в экспоненциальной форме (1e16 вместо 1e+16 - то же
+    число) и NaN/Infinity, которые orjson кодирует как null. Целые шире
+    64 бит кодирует json из stdlib, как и при отсутствии orjson и при
+    запросе с отступами (Accept: application/json; indent=N).
+    """
+    options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if orjson is not None else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        try:
+            ret = orjson.dumps(data, default=encode_default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как и JSONRenderer, экранируем U+2028/U+2029 для встраивания в JS
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack по Accept: application/msgpack (требуется пакет msgpack)."""
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
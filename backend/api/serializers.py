@@ -8,6 +8,7 @@ from core.models import (
     Claim,
     DictionaryEntry,
     CustomUser,
+    ImportJob,
 )
 
 
@@ -547,3 +548,66 @@ class DictionaryEntrySerializer(serializers.ModelSerializer):
             return instance
         except Exception as e:
             raise serializers.ValidationError({'error': str(e)})
+
+
+class MaintenanceUploadSerializer(serializers.Serializer):
+    """
+    Запись ТО из пакетной выгрузки. Связи передаются ID и разрешаются
+    для всего пакета сразу (api.uploads).
+    """
+    idempotency_key = serializers.CharField(max_length=64)
+    machine = serializers.IntegerField()
+    maintenance_type = serializers.IntegerField()
+    maintenance_date = serializers.DateField()
+    operating_hours = serializers.IntegerField(min_value=0)
+    work_order_number = serializers.CharField(
+        max_length=50,
+        required=False,
+        allow_blank=True,
+        allow_null=True,
+    )
+    work_order_date = serializers.DateField(
+        required=False,
+        allow_null=True,
+    )
+    service_company = serializers.IntegerField(
+        required=False,
+        allow_null=True,
+        help_text="По умолчанию - сервисная организация машины",
+    )
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    """Статус задания импорта: прогресс, скорость и оценка оставшегося времени."""
+    throughput = serializers.SerializerMethodField()
+    eta_seconds = serializers.SerializerMethodField()
+
+    def get_throughput(self, obj):
+        throughput = obj.throughput()
+        return round(throughput, 1) if throughput is not None else None
+
+    def get_eta_seconds(self, obj):
+        eta = obj.eta_seconds()
+        return round(eta) if eta is not None else None
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id',
+            'status',
+            'file_name',
+            'sheet',
+            'rows_total',
+            'rows_processed',
+            'throughput',
+            'eta_seconds',
+            'created',
+            'updated',
+            'unchanged',
+            'rejected',
+            'sheets',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
@@ -0,0 +1,139 @@
+"""
+Лог медленных запросов к БД. Запрос дольше SLOW_QUERY_THRESHOLD секунд
+пишется строкой JSON в лог api.slow_queries (файл SLOW_QUERY_LOG с
+ротацией): SQL, параметры, маршрут текущего запроса API, место вызова в
+коде проекта и план EXPLAIN QUERY PLAN. Запросы группируются по
+отпечатку - хешу SQL без литералов и параметров; план снимается для
+отпечатка не чаще раза в SLOW_QUERY_PLAN_INTERVAL секунд. Сводку по
+отпечаткам выводит команда slow-queries.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import timing as request_timing
+from .timing import get_current
+
+
+logger = logging.getLogger("api.slow_queries")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+# Обёртки execute_wrappers не считаются местом вызова
+_WRAPPER_FILES = {__file__, request_timing.__file__}
+
+# Время последнего снятия плана по отпечатку (в пределах процесса)
+_planned = {}
+_planned_lock = threading.Lock()
+
+
+def normalize_sql(sql):
+    """SQL без литералов и параметров; списки IN (...) любой длины совпадают."""
+    sql = _STRING.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Обёртка connection.execute_wrapper, устанавливаемая на каждое соединение (api.apps)."""
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    threshold = getattr(settings, "SLOW_QUERY_THRESHOLD", None)
+    if threshold is not None and duration >= threshold:
+        log_query(context["connection"], sql, params, many, duration)
+    return result
+
+
+def install_slow_query_log(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+def log_query(connection, sql, params, many, duration):
+    key = fingerprint(sql)
+    timing = get_current()
+    record = {
+        "time": timezone.now().isoformat(),
+        "fingerprint": key,
+        "duration_ms": round(duration * 1000, 1),
+        "view": getattr(timing, "view", None),
+        "path": getattr(timing, "path", None),
+        "frame": caller_frame(),
+        "sql": sql,
+    }
+    if not many:
+        record["params"] = params
+    if not many and _plan_due(key):
+        record["plan"] = explain(connection, sql, params)
+    logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def _plan_due(key):
+    now = time.monotonic()
+    interval = getattr(settings, "SLOW_QUERY_PLAN_INTERVAL", 0)
+    with _planned_lock:
+        last = _planned.get(key)
+        if last is not None and now - last < interval:
+            return False
+        _planned[key] = now
+        return True
+
+
+def explain(connection, sql, params):
+    """
+    Строки EXPLAIN QUERY PLAN с отступами по вложенности (только SQLite).
+    Курсор создаётся в обход execute_wrappers, чтобы план не попадал в
+    замер запроса и сам не считался медленным запросом.
+    """
+    if connection.vendor != "sqlite":
+        return None
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        rows = cursor.fetchall()
+    except connection.Database.Error as e:
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        cursor.close()
+
+    depths = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depths[node] = depths.get(parent, -1) + 1
+        lines.append("  " * depths[node] + detail)
+    return lines
+
+
+def caller_frame():
+    """Ближайший к запросу кадр стека в коде проекта (не Django и не обёртки запросов)."""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (
+            filename.startswith(base_dir)
+            and filename not in _WRAPPER_FILES
+            and "site-packages" not in filename
+        ):
+            return f"{os.path.relpath(filename, base_dir)}:{frame.lineno} in {frame.name}: {frame.line}"
+    return None
@@ -0,0 +1,63 @@
+from django.http import StreamingHttpResponse
+
+from .renderers import FastJSONRenderer
+from .timing import timed
+
+
+class StreamingJSONRenderer(FastJSONRenderer):
+    """
+    Рендерер JSON-массива по частям: объекты читаются из БД курсором
+    (QuerySet.iterator), сериализуются и кодируются чанками, поэтому
+    память не зависит от размера выборки. Чанки кодируются
+    FastJSONRenderer; результат побайтно совпадает с JSONRenderer для
+    того же списка.
+    """
+
+    def render_iter(self, queryset, serializer_class, context=None, chunk_size=500):
+        yield b"["
+        first = True
+        chunk = []
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            chunk.append(obj)
+            if len(chunk) == chunk_size:
+                yield self._render_chunk(chunk, serializer_class, context, first)
+                first = False
+                chunk = []
+        if chunk:
+            yield self._render_chunk(chunk, serializer_class, context, first)
+        yield b"]"
+
+    def _render_chunk(self, objects, serializer_class, context, first):
+        data = serializer_class(objects, many=True, context=context).data
+        # Рендерится массив чанка, внешние скобки отбрасываются
+        body = self.render(data)[1:-1]
+        return body if first else b"," + body
+
+
+class StreamingListMixin:
+    """
+    Потоковая отдача списка по запросу с ?stream=1 (chunked transfer).
+    Без параметра ответ формируется обычным ListAPIView.list().
+    """
+    stream_param = "stream"
+    stream_chunk_size = 500
+
+    def should_stream(self, request):
+        return request.query_params.get(self.stream_param) in ("1", "true")
+
+    def list(self, request, *args, **kwargs):
+        if not self.should_stream(request):
+            with timed("serialize"):
+                return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = StreamingJSONRenderer()
+        return StreamingHttpResponse(
+            renderer.render_iter(
+                queryset,
+                self.get_serializer_class(),
+                context=self.get_serializer_context(),
+                chunk_size=self.stream_chunk_size,
+            ),
+            content_type=renderer.media_type,
+        )
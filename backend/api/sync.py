@@ -0,0 +1,66 @@
+from core.models import Tombstone
+
+from .components import get_machine_queryset
+from .serializers import MachineListSerializer
+
+
+def parse_since(token):
+    """Токен синхронизации - последняя полученная клиентом версия."""
+    if not token:
+        return 0
+    try:
+        since = int(token)
+    except ValueError:
+        raise ValueError("Некорректный токен синхронизации")
+    if since < 0:
+        raise ValueError("Некорректный токен синхронизации")
+    return since
+
+
+def get_tombstones(user, model, since):
+    queryset = Tombstone.objects.filter(model=model, version__gt=since)
+    group_name = user.group.name if user.group else None
+
+    if group_name == 'Клиент':
+        return queryset.filter(client_id=user.pk)
+    if group_name == 'Сервисная организация':
+        return queryset.filter(service_company_id=user.pk)
+    if not group_name:
+        return Tombstone.objects.none()
+    # Менеджеру видны все строки, смена владельца их не удаляет
+    return queryset.filter(reassigned=False)
+
+
+def get_machine_changes(user, since, limit):
+    """
+    Машины, изменённые и удалённые после версии since, в порядке версий.
+    Возвращает не более limit изменений и токен для следующего запроса.
+    """
+    upserted = list(
+        get_machine_queryset(user)
+        .filter(version__gt=since)
+        .order_by('version')[:limit + 1]
+    )
+    deleted = list(
+        get_tombstones(user, 'machine', since)
+        .order_by('version')
+        .values_list('version', 'object_id')[:limit + 1]
+    )
+
+    changes = sorted(
+        [(machine.version, machine) for machine in upserted]
+        + [(version, object_id) for version, object_id in deleted],
+        key=lambda change: change[0],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    return {
+        'token': str(changes[-1][0] if changes else since),
+        'has_more': has_more,
+        'upserted': MachineListSerializer(
+            [change for _, change in changes if not isinstance(change, int)],
+            many=True,
+        ).data,
+        'deleted': [change for _, change in changes if isinstance(change, int)],
+    }
@@ -0,0 +1,13 @@
+"""
+Фоновые задачи приложения api (core.tasks).
+"""
+
+from core.tasks import task
+
+from .idempotency import purge_expired
+
+
+@task()
+def purge_idempotency_keys():
+    """Удаляет ответы по ключам Idempotency-Key старше IDEMPOTENCY_KEY_TTL."""
+    return purge_expired()
@@ -0,0 +1,523 @@
+import datetime
+import decimal
+import gzip
+import json
+
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.cache import bump_version
+from core.models import (
+    CustomUser,
+    DictionaryEntry,
+    IdempotencyRecord,
+    Machine,
+    Maintenance,
+    MaintenanceUploadKey,
+)
+
+from .middleware import GzipCodec, RequestTimingMiddleware, brotli, zstandard
+from .renderers import FastJSONRenderer, msgpack
+from .urls import build_urlpatterns
+
+
+MACHINE_ENTITIES = {
+    "model_tech": "machine_model",
+    "engine_model": "engine_model",
+    "transmission_model": "transmission_model",
+    "drive_axle_model": "drive_axle_model",
+    "steering_axle_model": "steering_axle_model",
+}
+
+
+class APITestCase(TestCase):
+    """Менеджер, два клиента и сервисная организация; запросы с JWT в cookie."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command("setup-groups", stdout=StringIO())
+        cls.manager = cls.create_user("manager", "Менеджер")
+        cls.client_a = cls.create_user("client", "Клиент", "client-a")
+        cls.client_b = cls.create_user("client", "Клиент", "client-b")
+        cls.service = cls.create_user("service_company", "Сервисная организация", "service")
+        cls.entries = {
+            field: DictionaryEntry.objects.create(entity=entity, name=f"{entity}-1")
+            for field, entity in MACHINE_ENTITIES.items()
+        }
+
+    def setUp(self):
+        # Версии кэша откатываются вместе с транзакцией теста, кэш процесса - нет
+        cache.clear()
+
+    @staticmethod
+    def create_user(user_type, group_name, username=None):
+        username = username or user_type
+        return CustomUser.objects.create(
+            username=username,
+            user_description=f"{username} (описание)",
+            user_type=user_type,
+            group=Group.objects.get(name=group_name),
+        )
+
+    def create_machine(self, factory_number, client=None, **fields):
+        return Machine.objects.create(
+            factory_number=factory_number,
+            shipment_date=datetime.date(2022, 3, 1),
+            client=client or self.client_a,
+            service_company=self.service,
+            **self.entries,
+            **fields,
+        )
+
+    def login(self, user):
+        self.client.cookies["access_token"] = str(AccessToken.for_user(user))
+
+
+class RendererEquivalenceTests(APITestCase):
+    """FastJSONRenderer и потоковый список должны совпадать с JSONRenderer DRF."""
+
+    def setUp(self):
+        super().setUp()
+        for number in range(1, 4):
+            self.create_machine(str(number), consignee="ООО «Ромашка» ")
+        self.login(self.manager)
+
+    def test_values_match_drf_encoder(self):
+        values = [
+            {"text": "кириллица <>&\"  ", "none": None, "bool": True},
+            [1, -0.0, 0.1, 100.0, 2 ** 63 - 1, 2 ** 70],
+            datetime.datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc),
+            datetime.date(2024, 1, 1),
+            datetime.timedelta(seconds=3),
+            decimal.Decimal("1.10"),
+            gettext_lazy("ленивая строка"),
+            {1: "нестроковый ключ"},
+        ]
+        for value in values:
+            with self.subTest(value=value):
+                self.assertEqual(FastJSONRenderer().render(value), JSONRenderer().render(value))
+
+    def test_endpoints_match_drf_encoder(self):
+        for path in ("/api/v1/machines", "/api/v1/dict-entries", "/api/v1/bootstrap", "/api/v1/user"):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_streamed_list_matches_drf_encoder(self):
+        expected = JSONRenderer().render(self.client.get("/api/v1/machines").data)
+
+        response = self.client.get("/api/v1/machines", {"stream": "1"})
+
+        self.assertEqual(b"".join(response.streaming_content), expected)
+
+    def test_msgpack_matches_json(self):
+        if msgpack is None:
+            self.skipTest("msgpack is not installed")
+        for path in ("/api/v1/machines", "/api/v1/dict-entries"):
+            with self.subTest(path=path):
+                response = self.client.get(path, HTTP_ACCEPT="application/msgpack")
+                self.assertEqual(response["Content-Type"], "application/msgpack")
+                self.assertEqual(
+                    msgpack.unpackb(response.content),
+                    json.loads(self.client.get(path).content),
+                )
+
+
+class BootstrapCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.machine = self.create_machine("17")
+        self.login(self.client_a)
+
+    def bootstrap(self):
+        response = self.client.get("/api/v1/bootstrap")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_dictionary_version_survives_process_cache_loss(self):
+        version = self.bootstrap()["dictionary_version"]
+        # Другой процесс или перезапуск - пустой локальный кэш
+        cache.clear()
+
+        self.assertEqual(self.bootstrap()["dictionary_version"], version)
+
+        DictionaryEntry.objects.create(entity="failure_node", name="Двигатель")
+        self.assertNotEqual(self.bootstrap()["dictionary_version"], version)
+
+    def test_bump_without_signals_invalidates_cached_page(self):
+        self.assertEqual(self.bootstrap()["machines"]["results"][0]["consignee"], None)
+
+        # Импорт пишет через bulk_update без сигналов и сдвигает версии сам
+        Machine.objects.filter(pk=self.machine.pk).update(consignee="ООО Ромашка")
+        bump_version("machines")
+
+        self.assertEqual(self.bootstrap()["machines"]["results"][0]["consignee"], "ООО Ромашка")
+
+    def test_group_permission_change_invalidates_user_data(self):
+        group = Group.objects.create(name="Аудиторы")
+        self.client_a.groups.add(group)
+        self.assertNotIn("core.view_claim", self.bootstrap()["permissions"])
+
+        group.permissions.add(Permission.objects.get(codename="view_claim"))
+
+        self.assertIn("core.view_claim", self.bootstrap()["permissions"])
+
+
+class MachineChangesTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.machine = self.create_machine("17")
+
+    def changes(self, user, since=None):
+        self.login(user)
+        response = self.client.get("/api/v1/machines/changes", {"since": since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_upserts_after_token(self):
+        token = self.changes(self.client_a)["token"]
+        other = self.create_machine("18")
+
+        changes = self.changes(self.client_a, token)
+
+        self.assertEqual([machine["id"] for machine in changes["upserted"]], [other.pk])
+        self.assertEqual(changes["deleted"], [])
+        self.assertEqual(self.changes(self.client_a, changes["token"])["upserted"], [])
+
+    def test_delete_is_reported_to_owners_only(self):
+        tokens = {user: self.changes(user)["token"] for user in (self.client_a, self.client_b, self.manager)}
+        pk = self.machine.pk
+        self.machine.delete()
+
+        self.assertEqual(self.changes(self.client_a, tokens[self.client_a])["deleted"], [pk])
+        self.assertEqual(self.changes(self.manager, tokens[self.manager])["deleted"], [pk])
+        self.assertEqual(self.changes(self.client_b, tokens[self.client_b])["deleted"], [])
+
+    def test_client_change_removes_machine_from_previous_client(self):
+        tokens = {user: self.changes(user)["token"] for user in self.all_users()}
+        self.machine.client = self.client_b
+        self.machine.save()
+
+        old_owner = self.changes(self.client_a, tokens[self.client_a])
+        self.assertEqual(old_owner["deleted"], [self.machine.pk])
+        self.assertEqual(old_owner["upserted"], [])
+
+        new_owner = self.changes(self.client_b, tokens[self.client_b])
+        self.assertEqual([machine["id"] for machine in new_owner["upserted"]], [self.machine.pk])
+        self.assertEqual(new_owner["deleted"], [])
+
+        # Сервисная организация и менеджер по-прежнему видят машину
+        for user in (self.service, self.manager):
+            with self.subTest(user=user.username):
+                changes = self.changes(user, tokens[user])
+                self.assertEqual(changes["deleted"], [])
+                self.assertEqual([machine["id"] for machine in changes["upserted"]], [self.machine.pk])
+
+    def all_users(self):
+        return (self.manager, self.client_a, self.client_b, self.service)
+
+
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login(self.manager)
+
+    def create_entry(self, name, key="key-1"):
+        return self.client.post(
+            "/api/v1/dict-entry-create",
+            {"entity": "failure_node", "name": name},
+            content_type="application/json",
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_repeat_replays_saved_response(self):
+        first = self.create_entry("Двигатель")
+        second = self.create_entry("Двигатель")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(DictionaryEntry.objects.filter(name="Двигатель").count(), 1)
+
+    def test_key_reused_for_other_request(self):
+        self.create_entry("Двигатель")
+
+        response = self.create_entry("Трансмиссия")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(DictionaryEntry.objects.filter(name="Трансмиссия").exists())
+
+    def pending_record(self, age):
+        self.create_entry("Двигатель")
+        DictionaryEntry.objects.filter(name="Двигатель").delete()
+        IdempotencyRecord.objects.update(
+            status_code=None,
+            response_data=None,
+            created_at=timezone.now() - datetime.timedelta(seconds=age),
+        )
+
+    @override_settings(IDEMPOTENCY_PENDING_TIMEOUT=60)
+    def test_request_in_progress_conflicts(self):
+        self.pending_record(age=5)
+
+        self.assertEqual(self.create_entry("Двигатель").status_code, 409)
+        self.assertFalse(DictionaryEntry.objects.filter(name="Двигатель").exists())
+
+    @override_settings(IDEMPOTENCY_PENDING_TIMEOUT=60)
+    def test_abandoned_request_can_be_retried(self):
+        self.pending_record(age=120)
+
+        response = self.create_entry("Двигатель")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(DictionaryEntry.objects.filter(name="Двигатель").count(), 1)
+        record = IdempotencyRecord.objects.get()
+        self.assertEqual(record.status_code, 201)
+        self.assertEqual(self.create_entry("Двигатель")["Idempotent-Replayed"], "true")
+
+
+class MaintenanceBatchUploadTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.machine = self.create_machine("17")
+        self.maintenance_type = DictionaryEntry.objects.create(entity="maintenance_type", name="ТО-1")
+        self.login(self.service)
+
+    def record(self, key, **fields):
+        return {
+            "idempotency_key": key,
+            "machine": self.machine.pk,
+            "maintenance_type": self.maintenance_type.pk,
+            "maintenance_date": "2024-05-01",
+            "operating_hours": 120,
+            **fields,
+        }
+
+    def upload(self, records):
+        return self.client.post("/api/v1/maintenance/batch", records, content_type="application/json")
+
+    def statuses(self, response):
+        return [result["status"] for result in response.json()["results"]]
+
+    def test_repeated_batch_creates_no_duplicates(self):
+        records = [self.record("key-1"), self.record("key-2", operating_hours=250)]
+
+        first = self.upload(records)
+        second = self.upload(records)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.statuses(first), ["created", "created"])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(self.statuses(second), ["duplicate", "duplicate"])
+        self.assertEqual(
+            [result["id"] for result in second.json()["results"]],
+            [result["id"] for result in first.json()["results"]],
+        )
+        self.assertEqual(Maintenance.objects.count(), 2)
+        self.assertEqual(MaintenanceUploadKey.objects.filter(user=self.service).count(), 2)
+
+    def test_key_repeated_in_batch_rejects_batch(self):
+        response = self.upload([self.record("key-1"), self.record("key-1", operating_hours=250)])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.statuses(response), ["rejected", "invalid"])
+        self.assertIn("idempotency_key", response.json()["results"][1]["errors"])
+        self.assertFalse(Maintenance.objects.exists())
+
+    def test_invalid_record_rejects_batch(self):
+        self.upload([self.record("key-1")])
+
+        response = self.upload([
+            self.record("key-1"),
+            self.record("key-2"),
+            self.record("key-3", machine=0),
+            self.record("key-4", operating_hours=-1),
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.statuses(response), ["duplicate", "rejected", "invalid", "invalid"])
+        self.assertEqual(response.json()["created"], 0)
+        self.assertEqual(Maintenance.objects.count(), 1)
+        self.assertFalse(MaintenanceUploadKey.objects.filter(key="key-2").exists())
+
+        # Исправленный пакет принимается
+        response = self.upload([self.record("key-1"), self.record("key-2"), self.record("key-3")])
+        self.assertEqual(self.statuses(response), ["duplicate", "created", "created"])
+
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for number in range(1, 11):
+            self.create_machine(str(number), consignee="ООО «Ромашка»")
+        self.login(self.manager)
+
+    def decompress(self, encoding, content):
+        if encoding == "br":
+            return brotli.decompress(content)
+        if encoding == "zstd":
+            return zstandard.ZstdDecompressor().decompressobj().decompress(content)
+        return gzip.decompress(content)
+
+    def test_encoding_follows_accept_encoding(self):
+        plain = self.client.get("/api/v1/machines").content
+        self.assertGreater(len(plain), 1024)
+        cases = [
+            ("gzip", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("GZIP;q=0.5", "gzip"),
+            ("br, gzip", "br" if brotli is not None else "gzip"),
+            ("zstd, gzip", "zstd" if zstandard is not None else "gzip"),
+            ("identity", None),
+        ]
+        for header, encoding in cases:
+            with self.subTest(accept_encoding=header):
+                response = self.client.get("/api/v1/machines", HTTP_ACCEPT_ENCODING=header)
+
+                self.assertIn("Accept-Encoding", response["Vary"])
+                self.assertEqual(response.get("Content-Encoding"), encoding)
+                if encoding is None:
+                    self.assertEqual(response.content, plain)
+                else:
+                    self.assertEqual(response["Content-Length"], str(len(response.content)))
+                    self.assertEqual(self.decompress(encoding, response.content), plain)
+
+    def test_body_under_threshold_is_not_compressed(self):
+        response = self.client.get("/api/v1/authenticated", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertLess(len(response.content), 1024)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertNotIn("Accept-Encoding", response.get("Vary", ""))
+
+    def test_streaming_response_is_compressed_by_chunks(self):
+        plain = self.client.get("/api/v1/machines").content
+
+        response = self.client.get("/api/v1/machines", {"stream": "1"}, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertFalse(response.has_header("Content-Length"))
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), plain)
+
+    @override_settings(COMPRESSION_CACHE_MIN_SIZE=0)
+    def test_identical_bodies_are_compressed_once(self):
+        with mock.patch.object(GzipCodec, "compress", autospec=True, side_effect=GzipCodec.compress) as compress:
+            first = self.client.get("/api/v1/machines", HTTP_ACCEPT_ENCODING="gzip")
+            second = self.client.get("/api/v1/machines", HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["Content-Encoding"], "gzip")
+
+    async def test_event_stream_is_not_compressed(self):
+        self.async_client.cookies["access_token"] = str(AccessToken.for_user(self.manager))
+
+        response = await self.async_client.get("/api/v1/events", HTTP_ACCEPT_ENCODING="gzip, br, zstd")
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertNotIn("Accept-Encoding", response.get("Vary", ""))
+        chunks = aiter(response.streaming_content)
+        try:
+            self.assertEqual(await anext(chunks), b"retry: 5000\n\n")
+        finally:
+            await chunks.aclose()
+
+
+class RequestTimingLogTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_machine("17")
+        self.login(self.manager)
+
+    def test_request_within_budget_is_logged_at_debug(self):
+        with self.assertLogs("api.timing", "DEBUG") as logs:
+            self.client.get("/api/v1/machines")
+
+        self.assertEqual([record.levelname for record in logs.records], ["DEBUG"])
+        self.assertEqual(json.loads(logs.records[0].getMessage())["route"], "machine-list")
+
+    @override_settings(QUERY_BUDGETS={"machine-list": 0})
+    def test_over_budget_warning_truncates_sql(self):
+        with self.assertLogs("api.timing", "WARNING") as logs:
+            self.client.get("/api/v1/machines")
+
+        message = logs.records[0].getMessage()
+        self.assertIn("budget 0", message)
+        for line in message.splitlines()[1:]:
+            self.assertLessEqual(len(line.split(": ", 1)[1]), RequestTimingMiddleware.BUDGET_SQL_LENGTH + 3)
+
+
+# URLconf с async-представлениями чтения (ASYNC_READ_VIEWS = True)
+urlpatterns = [path("api/v1/", include(build_urlpatterns(async_views=True)))]
+
+
+@override_settings(ROOT_URLCONF="api.tests")
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for number in range(1, 4):
+            self.create_machine(str(number))
+
+    def sync_response(self, path, **headers):
+        with override_settings(ROOT_URLCONF="silant_project.urls"):
+            return self.client.get(path, **headers)
+
+    def test_dictionary_permissions_match_sync_view(self):
+        for user, status_code in ((self.client_a, 403), (self.service, 403), (self.manager, 200)):
+            self.login(user)
+            with self.subTest(user=user.username):
+                self.assertEqual(self.client.get("/api/v1/dict-entries").status_code, status_code)
+                self.assertEqual(self.sync_response("/api/v1/dict-entries").status_code, status_code)
+
+    def test_json_lists_match_sync_views(self):
+        self.login(self.manager)
+        for path in ("/api/v1/machines", "/api/v1/dict-entries"):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).content, self.sync_response(path).content)
+
+    def test_streamed_list_falls_back_to_sync_view(self):
+        self.login(self.manager)
+
+        response = self.client.get("/api/v1/machines", {"stream": "1"})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(b"".join(response.streaming_content), self.sync_response("/api/v1/machines").content)
+
+    def test_msgpack_falls_back_to_sync_view(self):
+        if msgpack is None:
+            self.skipTest("msgpack is not installed")
+        self.login(self.manager)
+        for path in ("/api/v1/machines", "/api/v1/dict-entries"):
+            with self.subTest(path=path):
+                response = self.client.get(path, HTTP_ACCEPT="application/msgpack")
+                self.assertEqual(response["Content-Type"], "application/msgpack")
+                self.assertEqual(msgpack.unpackb(response.content), self.sync_response(path).json())
+
+
+class FleetEventsTests(APITestCase):
+    def test_wsgi_is_not_supported(self):
+        self.login(self.client_a)
+
+        response = self.client.get("/api/v1/events")
+
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(response.streaming)
+
+    async def test_asgi_requires_authentication(self):
+        response = await self.async_client.get("/api/v1/events")
+
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,118 @@
+"""
+Замер времени обработки запроса по фазам: запросы к БД (число и время),
+сериализация, рендеринг и общее время. Данные текущего запроса хранятся
+в ContextVar, поэтому учитываются и запросы async ORM, выполняемые в
+других потоках через sync_to_async.
+"""
+
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+_current = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    # Сколько SQL-запросов хранить для предупреждения о превышении бюджета
+    MAX_RECORDED_QUERIES = 200
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_count = 0
+        self.db_time = 0.0
+        self.queries = []
+        self.phases = {}
+        # Маршрут и путь запроса (RequestTimingMiddleware.process_view)
+        self.view = None
+        self.path = None
+
+    def add_query(self, sql, duration):
+        self.db_count += 1
+        self.db_time += duration
+        if len(self.queries) < self.MAX_RECORDED_QUERIES:
+            self.queries.append((sql, duration))
+
+    def add_phase(self, name, duration):
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def metrics(self):
+        """[(имя, секунды, описание)] для Server-Timing и лога."""
+        metrics = [("db", self.db_time, f"queries={self.db_count}")]
+        metrics.extend((name, duration, None) for name, duration in self.phases.items())
+        metrics.append(("total", self.total(), None))
+        return metrics
+
+    def server_timing(self):
+        entries = []
+        for name, duration, description in self.metrics():
+            entry = f"{name};dur={duration * 1000:.1f}"
+            if description:
+                entry += f';desc="{description}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+    def repeated_queries(self, limit=10):
+        """Самые частые тексты SQL: повторы обычно означают N+1."""
+        counts = Counter(sql for sql, _ in self.queries)
+        return counts.most_common(limit)
+
+
+def get_current():
+    return _current.get()
+
+
+@contextmanager
+def measure_request():
+    timing = RequestTiming()
+    token = _current.set(timing)
+    try:
+        yield timing
+    finally:
+        _current.reset(token)
+
+
+def record_queries(execute, sql, params, many, context):
+    """
+    Обёртка connection.execute_wrapper, устанавливаемая на каждое
+    соединение (api.apps). Вне замеряемого запроса ничего не делает.
+    """
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query(sql, time.perf_counter() - started)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+@contextmanager
+def timed(phase):
+    """
+    Добавляет время блока к фазе текущего запроса без учёта запросов к
+    БД внутри блока (они учитываются в фазе db): сериализация списка
+    выполняет ленивые запросы QuerySet.
+    """
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    started = time.perf_counter()
+    db_time = timing.db_time
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        timing.add_phase(phase, elapsed - (timing.db_time - db_time))
@@ -0,0 +1,168 @@
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+
+from core.models import (
+    CustomUser,
+    DictionaryEntry,
+    Maintenance,
+    MaintenanceUploadKey,
+)
+from core.writer import group_commit, insert_batch
+
+from .components import get_machine_queryset
+from .serializers import MaintenanceUploadSerializer
+
+
+MAX_BATCH_SIZE = 1000
+
+
+def _outcome(index, key, status, maintenance_id=None, errors=None):
+    outcome = {
+        'index': index,
+        'idempotency_key': key,
+        'status': status,
+    }
+    if maintenance_id is not None:
+        outcome['id'] = maintenance_id
+    if errors is not None:
+        outcome['errors'] = errors
+    return outcome
+
+
+def _build(user, data, machines, maintenance_types, companies):
+    """Запись ТО из проверенных полей; ошибки - в формате serializer.errors."""
+    machine = machines.get(data['machine'])
+    if machine is None:
+        return None, {'machine': [f"Машина с ID {data['machine']} не найдена или недоступна"]}
+
+    maintenance_type = maintenance_types.get(data['maintenance_type'])
+    if maintenance_type is None:
+        return None, {'maintenance_type': [f"Вид ТО с ID {data['maintenance_type']} не найден"]}
+
+    service_company_id = data.get('service_company')
+    if service_company_id is None:
+        service_company = user if user.user_type == 'service_company' else machine.service_company
+    else:
+        service_company = companies.get(service_company_id)
+        # ТО проводит сервисная организация или сам клиент машины
+        if service_company is None or not (
+            service_company.user_type == 'service_company'
+            or service_company.pk == machine.client_id
+        ):
+            return None, {'service_company': [f"Сервисная организация с ID {service_company_id} не найдена"]}
+
+    maintenance = Maintenance(
+        machine=machine,
+        maintenance_type=maintenance_type,
+        maintenance_date=data['maintenance_date'],
+        operating_hours=data['operating_hours'],
+        work_order_number=data.get('work_order_number') or None,
+        work_order_date=data.get('work_order_date'),
+        service_company=service_company,
+    )
+    try:
+        maintenance.before_save()
+    except ValidationError as e:
+        return None, e.message_dict if hasattr(e, 'error_dict') else {'non_field_errors': e.messages}
+    return maintenance, None
+
+
+def upload_maintenance(user, records):
+    """
+    Пакетная выгрузка записей ТО с ключами идемпотентности. Записи с уже
+    известным ключом не создаются повторно; новые вставляются одним
+    bulk_create вместе с ключами. Пакет с ошибочной записью (в том числе
+    с повтором ключа внутри пакета) не создаёт ничего, остальные новые
+    записи получают статус rejected. Возвращает итог по каждой записи.
+    """
+    try:
+        return _upload_maintenance(user, records)
+    except IntegrityError:
+        # Параллельная выгрузка успела записать те же ключи - повтор
+        # увидит их как уже выгруженные
+        return _upload_maintenance(user, records)
+
+
+def _upload_maintenance(user, records):
+    results = [None] * len(records)
+    validated = []
+    batch_keys = set()
+
+    for index, record in enumerate(records):
+        serializer = MaintenanceUploadSerializer(data=record)
+        if not serializer.is_valid():
+            key = record.get('idempotency_key') if isinstance(record, dict) else None
+            results[index] = _outcome(index, key, 'invalid', errors=serializer.errors)
+            continue
+
+        key = serializer.validated_data['idempotency_key']
+        if key in batch_keys:
+            results[index] = _outcome(
+                index, key, 'invalid',
+                errors={'idempotency_key': ["Ключ повторяется в пакете"]},
+            )
+        else:
+            batch_keys.add(key)
+            validated.append((index, serializer.validated_data))
+
+    seen = dict(
+        MaintenanceUploadKey.objects
+        .filter(user=user, key__in=batch_keys)
+        .values_list('key', 'maintenance_id')
+    )
+    fresh = []
+    for index, data in validated:
+        key = data['idempotency_key']
+        if key in seen:
+            results[index] = _outcome(index, key, 'duplicate', maintenance_id=seen[key])
+        else:
+            fresh.append((index, data))
+
+    # Связи всех новых записей читаются тремя запросами на пакет
+    machines = get_machine_queryset(user).filter(
+        pk__in={data['machine'] for _, data in fresh},
+    ).in_bulk()
+    maintenance_types = DictionaryEntry.objects.filter(
+        entity='maintenance_type',
+        pk__in={data['maintenance_type'] for _, data in fresh},
+    ).in_bulk()
+    companies = CustomUser.objects.filter(
+        pk__in={data['service_company'] for _, data in fresh if data.get('service_company')},
+    ).in_bulk()
+
+    created = []
+    for index, data in fresh:
+        maintenance, errors = _build(user, data, machines, maintenance_types, companies)
+        if errors is not None:
+            results[index] = _outcome(index, data['idempotency_key'], 'invalid', errors=errors)
+        else:
+            created.append((index, data['idempotency_key'], maintenance))
+
+    if any(result is not None and result['status'] == 'invalid' for result in results):
+        # Клиент исправляет ошибки и повторяет пакет целиком
+        for index, key, _ in created:
+            results[index] = _outcome(index, key, 'rejected')
+        created = []
+
+    def write():
+        insert_batch(Maintenance, [maintenance for _, _, maintenance in created])
+        MaintenanceUploadKey.objects.bulk_create([
+            MaintenanceUploadKey(user=user, key=key, maintenance=maintenance)
+            for _, key, maintenance in created
+        ])
+
+    if created:
+        # Записи и ключи фиксируются вместе, при GROUP_COMMIT_WRITES - одной
+        # транзакцией с пачками других выгрузок
+        group_commit(write)
+
+    for index, key, maintenance in created:
+        results[index] = _outcome(index, key, 'created', maintenance_id=maintenance.pk)
+
+    return {
+        'created': len(created),
+        'duplicate': sum(result['status'] == 'duplicate' for result in results),
+        'invalid': sum(result['status'] == 'invalid' for result in results),
+        'rejected': sum(result['status'] == 'rejected' for result in results),
+        'results': results,
+    }
@@ -1,19 +1,35 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from core.routers import read_from_replica
+
+from .async_views import (
+    AsyncMachineSearchView,
+    AsyncMachineListView,
+    AsyncMachineDetailView,
+    AsyncDictEntryListView,
+)
+from .events import fleet_events
 from .views import (
     CustomTokenObtainPairView,
     CustomRefreshTokenView,
     CurrentUserView,
+    BootstrapView,
     is_authenticated,
     logout,
 
     MachineSearchAPIView,
     MachineListView,
+    MachineChangesView,
     MachineDetailView,
     machine_update,
     machine_create,
     machine_delete,
+    MaintenanceBatchUploadView,
+    ImportJobUploadView,
+    ImportJobDetailView,
+    export_sheet,
 
     DictEntryListView,
     DictEntryDetailView,
@@ -23,49 +39,92 @@ from .views import (
 )
 
 
-urlpatterns = [
-    path(
-        route="login",
-        view=CustomTokenObtainPairView.as_view(),
-        name="login",
-    ),
-    path(
-        route="token-refresh",
-        view=CustomRefreshTokenView.as_view(),
-        name="token-refresh",
-    ),
-    path(
-        route="logout",
-        view=logout,
-        name="logout",
-    ),
-    path(
-        route="user",
-        view=CurrentUserView.as_view(),
-        name="current-user",
-    ),
-    path(
-        route="authenticated",
-        view=is_authenticated,
-        name="is-authenticated",
-    ),
-    path(
-        route="machines/search",
-        view=MachineSearchAPIView.as_view(),
-        name="machine-search",
-    ),
-
-    #
-    path('machines', MachineListView.as_view(), name='machine-list'),
-    path('machines/<int:pk>', MachineDetailView.as_view(), name='machine-detail'),
-    path('machine-update/<int:pk>', machine_update, name='machine-update'),
-    path('machine-create', machine_create, name='machine-create'),
-    path('machine-delete/<int:pk>', machine_delete, name='machine-delete'),
-
-    #
-    path('dict-entries', DictEntryListView.as_view(), name='dict-entry-list'),
-    path('dict-entries/<int:pk>', DictEntryDetailView.as_view(), name='dict-entry-detail'),
-    path('dict-entry-update/<int:pk>', dict_entry_update, name='dict-entry-update'),
-    path('dict-entry-create', dict_entry_create, name='dict-entry-create'),
-    path('dict-entry-delete/<int:pk>', dict_entry_delete, name='dict-entry-delete'),
-]
+
+def get_read_views(async_views):
+    """
+    Эндпоинты чтения: синхронные (DRF) или на async ORM (для ASGI).
+    Поиск, списки и справочники читают из реплики.
+    """
+    if async_views:
+        return {
+            "machine-search": read_from_replica(AsyncMachineSearchView.as_view()),
+            "machine-list": read_from_replica(AsyncMachineListView.as_view()),
+            "machine-detail": AsyncMachineDetailView.as_view(),
+            "dict-entry-list": read_from_replica(AsyncDictEntryListView.as_view()),
+        }
+    return {
+        "machine-search": read_from_replica(MachineSearchAPIView.as_view()),
+        "machine-list": read_from_replica(MachineListView.as_view()),
+        "machine-detail": MachineDetailView.as_view(),
+        "dict-entry-list": read_from_replica(DictEntryListView.as_view()),
+    }
+
+
+def build_urlpatterns(async_views=False):
+    read_views = get_read_views(async_views)
+
+    return [
+        path(
+            route="login",
+            view=CustomTokenObtainPairView.as_view(),
+            name="login",
+        ),
+        path(
+            route="token-refresh",
+            view=CustomRefreshTokenView.as_view(),
+            name="token-refresh",
+        ),
+        path(
+            route="logout",
+            view=logout,
+            name="logout",
+        ),
+        path(
+            route="user",
+            view=CurrentUserView.as_view(),
+            name="current-user",
+        ),
+        path(
+            route="bootstrap",
+            view=BootstrapView.as_view(),
+            name="bootstrap",
+        ),
+        path(
+            route="authenticated",
+            view=is_authenticated,
+            name="is-authenticated",
+        ),
+        path(
+            route="machines/search",
+            view=read_views["machine-search"],
+            name="machine-search",
+        ),
+
+        #
+        path('machines', read_views['machine-list'], name='machine-list'),
+        # SSE: только под ASGI (silant_project.asgi), под WSGI - 501
+        path('events', fleet_events, name='fleet-events'),
+        path('machines/changes', MachineChangesView.as_view(), name='machine-changes'),
+        path('machines/<int:pk>', read_views['machine-detail'], name='machine-detail'),
+        path('machine-update/<int:pk>', machine_update, name='machine-update'),
+        path('machine-create', machine_create, name='machine-create'),
+        path('machine-delete/<int:pk>', machine_delete, name='machine-delete'),
+
+        #
+        path('maintenance/batch', MaintenanceBatchUploadView.as_view(), name='maintenance-batch'),
+        path('import-jobs', ImportJobUploadView.as_view(), name='import-job-upload'),
+        path('import-jobs/<int:pk>', ImportJobDetailView.as_view(), name='import-job-detail'),
+
+        #
+        path('export/<str:sheet>.<str:file_format>', read_from_replica(export_sheet), name='export-sheet'),
+
+        #
+        path('dict-entries', read_views['dict-entry-list'], name='dict-entry-list'),
+        path('dict-entries/<int:pk>', read_from_replica(DictEntryDetailView.as_view()), name='dict-entry-detail'),
+        path('dict-entry-update/<int:pk>', dict_entry_update, name='dict-entry-update'),
+        path('dict-entry-create', dict_entry_create, name='dict-entry-create'),
+        path('dict-entry-delete/<int:pk>', dict_entry_delete, name='dict-entry-delete'),
+    ]
+
+
+urlpatterns = build_urlpatterns(async_views=settings.ASYNC_READ_VIEWS)
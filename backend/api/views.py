@@ -1,8 +1,10 @@
 import json
+import os
 
 from rest_framework import status
 from rest_framework import generics
 from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -10,17 +12,25 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.exceptions import TokenError
 
-from django.http import Http404, JsonResponse
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import authenticate
 
 from django_filters.rest_framework import DjangoFilterBackend
 
+from core.exporters import (
+    EXPORTERS,
+    STREAM_FORMATS,
+)
+from core.importers import IMPORTERS_BY_SHEET
+from core.importers.jobs import enqueue_upload
+from core.importers.reader import READERS
 from core.models import (
     Machine,
     Maintenance,
     Claim,
     DictionaryEntry,
+    ImportJob,
 )
 from .serializers import (
     MachinePublicSerializer,
@@ -31,6 +41,7 @@ from .serializers import (
     DictionaryEntryListSerializer,
     DictionaryEntryDetailSerializer,
     DictionaryEntrySerializer,
+    ImportJobSerializer,
 )
 from .filters import (
     MachineFilter,
@@ -41,6 +52,18 @@ from .permissions import (
     IsManagerOrSuperadmin,
     CanEditMachines,
 )
+from .components import (
+    get_component_versions,
+    get_dictionary_version,
+    get_machine_page,
+    get_machine_queryset,
+    get_user_data,
+)
+from .idempotency import idempotent
+from .streaming import StreamingListMixin
+from .timing import timed
+from .sync import get_machine_changes, parse_since
+from .uploads import MAX_BATCH_SIZE, upload_maintenance
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
@@ -151,23 +174,27 @@ class CurrentUserView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        group_name = user.group.name if user.group else None
-        user_type_mapping = {
-            "Клиент": "client",
-            "Сервисная организация": "service_company",
-            "Менеджер": "manager",
-            "Суперадмин": "superadmin"
-        }
-        user_type = user_type_mapping.get(group_name, "unknown")
+        return Response(get_user_data(request.user))
+
+
+class BootstrapView(APIView):
+    """
+    Всё, что нужно фронтенду при загрузке, за один запрос: пользователь,
+    роль, права, версия справочников и первая страница машин.
+    """
+    permission_classes = [IsAuthenticated]
+    machine_page_size = 50
+
+    def get(self, request):
+        versions = get_component_versions()
+        user_data = get_user_data(request.user, versions)
 
         return Response({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email or "empty",
-            'user_description': user.user_description or "empty",
-            'group_name': user_type,
-            'permissions': list(user.get_all_permissions())
+            'user': user_data,
+            'role': user_data['group_name'],
+            'permissions': user_data['permissions'],
+            'dictionary_version': get_dictionary_version(versions),
+            'machines': get_machine_page(request.user, self.machine_page_size, versions),
         })
     
 
@@ -270,11 +297,13 @@ class MachineSearchAPIView(APIView):
             else:
                 serializer = MachinePublicSerializer(machine)
                 user_status = "unauthorized"
+            with timed("serialize"):
+                data = serializer.data
 
             return Response(
                 data={
                     "success": True,
-                    "data": serializer.data,
+                    "data": data,
                     "user_status": user_status,
                 },
                 status=status.HTTP_200_OK,
@@ -297,7 +326,7 @@ class MachineSearchAPIView(APIView):
             )
 
 
-class MachineListView(generics.ListAPIView):
+class MachineListView(StreamingListMixin, generics.ListAPIView):
     queryset = Machine.objects.all()
     serializer_class = MachineListSerializer
     permission_classes = [IsAuthenticated]
@@ -305,29 +334,30 @@ class MachineListView(generics.ListAPIView):
     filterset_class = MachineFilter
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = super().get_queryset()
+        return get_machine_queryset(self.request.user)
 
-        queryset = queryset.select_related(
-            'client',
-            'service_company',
-            'steering_axle_model',
-            'drive_axle_model',
-            'transmission_model',
-            'engine_model',
-            'model_tech',
-        )
 
-        group_name = user.group.name if user.group else None
+class MachineChangesView(APIView):
+    """
+    Дельта-синхронизация: машины, изменённые или удалённые после токена
+    ?since=<token>. Без токена возвращаются все машины пользователя.
+    """
+    permission_classes = [IsAuthenticated]
+    default_limit = 500
+    max_limit = 5000
 
-        if group_name == 'Клиент':
-            queryset = queryset.filter(client=user)
-        elif group_name == 'Сервисная организация':
-            queryset = queryset.filter(service_company=user)
-        elif not group_name:
-            return Machine.objects.none()
+    def get(self, request):
+        try:
+            since = parse_since(request.query_params.get('since'))
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        return queryset.order_by('-shipment_date')
+        limit = max(1, min(limit, self.max_limit))
+        return Response(get_machine_changes(request.user, since, limit))
 
 
 class MachineDetailView(generics.RetrieveAPIView):
@@ -370,6 +400,12 @@ class MachineDetailView(generics.RetrieveAPIView):
 
         self.check_object_permissions(self.request, obj)
         return obj
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        with timed("serialize"):
+            data = self.get_serializer(instance).data
+        return Response(data)
     
 
 @api_view(['PUT', 'PATCH'])
@@ -413,6 +449,7 @@ def machine_update(request, pk):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated, IsManagerOrSuperadmin])
+@idempotent
 def machine_create(request):
     serializer = MachineSerializer(
         data=request.data,
@@ -453,13 +490,105 @@ def machine_delete(request, pk):
         )
 
 
+class MaintenanceBatchUploadView(APIView):
+    """
+    Пакетная выгрузка записей ТО, накопленных без связи. Каждая запись
+    несёт ключ идемпотентности, повторная отправка пакета безопасна.
+    Пакет с ошибками не сохраняется и возвращается с кодом 400.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        records = request.data
+        if not isinstance(records, list):
+            return Response(
+                {'error': 'Ожидается массив записей ТО'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(records) > MAX_BATCH_SIZE:
+            return Response(
+                {'error': f'Не более {MAX_BATCH_SIZE} записей в пакете'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = upload_maintenance(request.user, records)
+        return Response(
+            result,
+            status=status.HTTP_400_BAD_REQUEST if result['invalid'] else status.HTTP_200_OK
+        )
+
+
+class ImportJobUploadView(APIView):
+    """
+    Загрузка файла импорта менеджером: файл записывается на диск, импорт
+    ставится в очередь и выполняется воркером (run-workers). Xlsx без
+    указания листа импортируется целиком, как db-import-all.
+    """
+    permission_classes = [IsAuthenticated, IsManagerOrSuperadmin]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'Файл не передан (поле file)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        extension = os.path.splitext(upload.name)[1].lower()
+        if extension not in READERS:
+            return Response(
+                {'error': f'Неподдерживаемый формат файла, допустимы: {", ".join(READERS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        sheet = request.data.get('sheet') or ''
+        if sheet and sheet not in IMPORTERS_BY_SHEET:
+            return Response(
+                {'error': f'Неизвестный лист, допустимы: {", ".join(IMPORTERS_BY_SHEET)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # Файлы csv, ndjson и parquet содержат один лист
+        if not sheet and extension != '.xlsx':
+            return Response(
+                {'error': 'Для файла с одним листом укажите sheet'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        job = enqueue_upload(upload, request.user, sheet)
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportJobDetailView(generics.RetrieveAPIView):
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated, IsManagerOrSuperadmin]
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def export_sheet(request, sheet, file_format):
+    exporter_class = EXPORTERS.get(sheet)
+    if exporter_class is None or file_format not in STREAM_FORMATS:
+        raise Http404("Неизвестный лист или формат выгрузки")
+
+    iter_chunks, content_type = STREAM_FORMATS[file_format]
+    # Строки читаются из БД курсором по мере отправки ответа
+    response = StreamingHttpResponse(
+        iter_chunks(exporter_class(user=request.user)),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{sheet}.{file_format}"'
+    return response
+
+
 class DictEntryListView(APIView):
     permission_classes = [IsAuthenticated, IsManagerOrSuperadmin]
 
     def get(self, request, *args, **kwargs):
         queryset = DictionaryEntry.objects.all().order_by('entity')
         serializer = DictionaryEntryListSerializer(queryset, many=True)
-        return JsonResponse(serializer.data, safe=False)
+        with timed("serialize"):
+            return Response(serializer.data)
 
 
 class DictEntryDetailView(generics.RetrieveAPIView):
@@ -479,6 +608,7 @@ class DictEntryDetailView(generics.RetrieveAPIView):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, IsManagerOrSuperadmin])
+@idempotent
 def dict_entry_create(request):
     serializer = DictionaryEntrySerializer(data=request.data)
 
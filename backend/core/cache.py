@@ -0,0 +1,35 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import CacheVersion
+
+
+def get_version(name):
+    """
+    Версия группы закэшированных данных. Ключи кэша включают версию,
+    поэтому смена версии делает устаревшими все ключи группы сразу.
+    Версии хранятся в БД (CacheVersion) и общие для всех процессов.
+    """
+    return get_versions(name)[name]
+
+
+def get_versions(*names):
+    """Версии нескольких групп одним запросом: {группа: версия}."""
+    versions = dict(CacheVersion.objects.filter(name__in=names).values_list("name", "value"))
+    return {name: versions.get(name, 0) for name in names}
+
+
+def bump_version(*names):
+    """
+    Увеличивает версии групп. Внутри транзакции записи новая версия
+    становится видна другим процессам вместе с изменёнными данными.
+    """
+    for name in names:
+        if CacheVersion.objects.filter(name=name).update(value=F("value") + 1):
+            continue
+        try:
+            with transaction.atomic():
+                CacheVersion.objects.create(name=name, value=1)
+        except IntegrityError:
+            # Строку успел создать другой процесс
+            CacheVersion.objects.filter(name=name).update(value=F("value") + 1)
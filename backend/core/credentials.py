@@ -0,0 +1,89 @@
+"""
+Отложенная генерация паролей для пользователей, созданных импортом.
+"""
+
+import os
+import secrets
+
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.db import transaction
+
+from .models import CustomUser, PendingCredential
+
+
+def generate_password():
+    return secrets.token_urlsafe(12)
+
+
+def _init_worker():
+    # При запуске процессов через spawn Django нужно инициализировать заново
+    django.setup()
+
+
+def _hash_password(raw_password):
+    return make_password(raw_password)
+
+
+def hash_pending_credentials(batch_size=200, workers=None, on_batch=None):
+    """
+    Генерирует пароли для пользователей из очереди PendingCredential,
+    хэширует их в пуле процессов и записывает через bulk_update.
+
+    Пароль записывается, только если он всё ещё неиспользуемый: пароль,
+    заданный после постановки в очередь, не перезаписывается.
+    on_batch(пары (пользователь, пароль)) вызывается внутри транзакции
+    до её фиксации - например, для выгрузки выданных паролей.
+    Возвращает число пользователей, получивших пароль.
+    """
+    workers = workers or os.cpu_count() or 1
+    processed = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        while True:
+            pending = list(
+                PendingCredential.objects.select_related("user").order_by("pk")[:batch_size]
+            )
+            if not pending:
+                break
+
+            raw_passwords = [generate_password() for _ in pending]
+            hashes = executor.map(
+                _hash_password,
+                raw_passwords,
+                chunksize=max(1, len(raw_passwords) // workers),
+            )
+
+            hashed = list(zip(pending, hashes, raw_passwords))
+
+            # Транзакции SQLite - IMMEDIATE: проверка и запись идут под одной
+            # блокировкой, пароль не может смениться между ними
+            with transaction.atomic():
+                unusable = set(
+                    CustomUser.objects.filter(
+                        pk__in=[item.user_id for item in pending],
+                        password__startswith=UNUSABLE_PASSWORD_PREFIX,
+                    ).values_list("pk", flat=True)
+                )
+                users = []
+                credentials = []
+                for item, password, raw_password in hashed:
+                    if item.user_id not in unusable:
+                        continue
+                    item.user.password = password
+                    users.append(item.user)
+                    credentials.append((item.user, raw_password))
+
+                if on_batch is not None and credentials:
+                    on_batch(credentials)
+                CustomUser.objects.bulk_update(users, ["password"], batch_size=batch_size)
+                PendingCredential.objects.filter(
+                    pk__in=[item.pk for item in pending],
+                ).delete()
+
+            processed += len(users)
+
+    return processed
@@ -0,0 +1,92 @@
+"""
+Разбор расписаний в формате cron: пять полей "минута час день месяц
+день_недели" со значениями *, */шаг, a-b, a-b/шаг и списками через
+запятую. День недели 0-7, воскресенье - 0 или 7.
+"""
+
+from datetime import timedelta
+
+
+FIELDS = [
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),
+]
+
+ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+
+
+def _parse_field(value, low, high):
+    result = set()
+    for part in value.split(","):
+        part, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(bound) for bound in part.split("-", 1))
+        else:
+            start = end = int(part)
+            # "5/15" - с 5 до конца диапазона
+            if step > 1:
+                end = high
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Value '{value}' out of range {low}-{high}")
+        result.update(range(start, end + 1, step))
+    return result
+
+
+class CronSchedule:
+    def __init__(self, expression):
+        self.expression = expression
+        fields = ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != len(FIELDS):
+            raise ValueError(f"Cron expression '{expression}' must have {len(FIELDS)} fields")
+
+        parsed = {}
+        for value, (name, low, high) in zip(fields, FIELDS):
+            try:
+                parsed[name] = _parse_field(value, low, high)
+            except ValueError as e:
+                raise ValueError(f"Cron expression '{expression}', {name}: {e}")
+        self.minutes = parsed["minute"]
+        self.hours = parsed["hour"]
+        self.days = parsed["day"]
+        self.months = parsed["month"]
+        self.weekdays = {day % 7 for day in parsed["weekday"]}
+        # Как в cron: если ограничены и день месяца, и день недели,
+        # подходит любой из них
+        self.any_day = fields[2] != "*" and fields[4] != "*"
+
+    def _day_matches(self, moment):
+        in_days = moment.day in self.days
+        # weekday(): понедельник - 0, в cron понедельник - 1
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, moment):
+        """Ближайшее время запуска строго после moment (с точностью до минуты)."""
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        # Ограничение на случай невозможных дат вроде 31 февраля
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression '{self.expression}' never fires")
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+
+class Subscription:
+    """
+    Подписка одного соединения на события: ограниченная очередь в event
+    loop соединения и данные для фильтрации по роли. При переполнении
+    очереди подписчик считается медленным и отключается.
+    """
+
+    def __init__(self, loop, user_id, role, max_size):
+        self.loop = loop
+        self.user_id = user_id
+        self.role = role
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = False
+
+    def accepts(self, event):
+        if self.role == "client":
+            return event["client_id"] == self.user_id
+        if self.role == "service_company":
+            return event["service_company_id"] == self.user_id
+        return self.role in ("manager", "superadmin")
+
+    def offer(self, event):
+        # Выполняется в event loop соединения
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped = True
+            # Вместо накопленных событий - маркер закрытия потока
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+    async def get(self):
+        """Следующее событие или None, если подписчик отключён."""
+        return await self.queue.get()
+
+
+class BroadcastHub:
+    """
+    Рассылка событий об изменениях внутри процесса. Публикация возможна
+    из любого потока (сигналы моделей), доставка - через event loop
+    каждого подписчика.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, role, max_size=100):
+        subscription = Subscription(asyncio.get_running_loop(), user_id, role, max_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.dropped:
+                self.unsubscribe(subscription)
+            elif subscription.accepts(event):
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.offer, event)
+                except RuntimeError:
+                    # Event loop соединения уже закрыт
+                    self.unsubscribe(subscription)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+
+hub = BroadcastHub()
+
+
+def change_event(event_type, instance):
+    """Событие об изменении машины, ТО или рекламации."""
+    client_id, service_company_id = instance.sync_scope()
+    machine = instance if instance._meta.model_name == "machine" else instance.machine
+    return {
+        "type": event_type,
+        "id": instance.pk,
+        "version": instance.version,
+        "machine_id": machine.pk,
+        "factory_number": machine.factory_number,
+        "client_id": client_id,
+        "service_company_id": service_company_id,
+    }
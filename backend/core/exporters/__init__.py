@@ -0,0 +1,26 @@
+"""
+Выгрузка машин, ТО и рекламаций из БД в формате листов basic_data.xlsx.
+Используется командой db-export и эндпоинтом export API.
+"""
+
+from .base import BaseExporter
+from .claims import ClaimExporter
+from .machines import MachineExporter
+from .maintenance import MaintenanceExporter
+from .writers import (
+    STREAM_FORMATS,
+    iter_csv,
+    iter_ndjson,
+    write_stream,
+    write_xlsx,
+)
+
+
+EXPORTERS = {
+    exporter_class.sheet_name: exporter_class
+    for exporter_class in (
+        MachineExporter,
+        MaintenanceExporter,
+        ClaimExporter,
+    )
+}
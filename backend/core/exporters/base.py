@@ -0,0 +1,72 @@
+from django.db.models import Q
+
+
+class BaseExporter:
+    """
+    Выгрузка одного листа. Связанные справочники и пользователи
+    подтягиваются в том же запросе через values(), строки читаются
+    курсором QuerySet.iterator() чанками по chunk_size.
+
+    Подклассы задают модель, лист, колонки (заголовок, поле values())
+    и поля, по которым ограничивается видимость для клиента и сервисной
+    организации.
+    """
+    model = None
+    sheet_name = None
+    # Строка заголовка и название над ним - как в basic_data.xlsx
+    header_row = 1
+    title = None
+    columns = []
+    # Дополнительные поля values(), не попадающие в колонки
+    extra_fields = []
+    ordering = []
+    client_lookups = []
+    service_company_lookups = []
+
+    def __init__(self, user=None, chunk_size=2000):
+        self.user = user
+        self.chunk_size = chunk_size
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def get_queryset(self):
+        queryset = self.model.objects.order_by(*self.ordering, "pk")
+        if self.user is None:
+            return queryset
+        return self.scope(queryset, self.user)
+
+    def scope(self, queryset, user):
+        """Ограничивает выгрузку данными, доступными роли пользователя."""
+        group_name = user.group.name if user.group else None
+
+        if group_name == "Клиент":
+            lookups = self.client_lookups
+        elif group_name == "Сервисная организация":
+            lookups = self.service_company_lookups
+        elif not group_name:
+            return queryset.none()
+        else:
+            return queryset
+
+        condition = Q()
+        for lookup in lookups:
+            condition |= Q(**{lookup: user})
+        return queryset.filter(condition)
+
+    def prepare(self, record):
+        """Преобразование строки values() перед выгрузкой."""
+        return record
+
+    def rows(self):
+        """Строки листа - списки значений в порядке колонок."""
+        fields = [field for _, field in self.columns if field] + self.extra_fields
+        records = self.get_queryset().values(*fields).iterator(chunk_size=self.chunk_size)
+
+        for number, record in enumerate(records, start=1):
+            record = self.prepare(record)
+            yield [
+                record.get(field) if field else number
+                for _, field in self.columns
+            ]
@@ -0,0 +1,24 @@
+from core.models import Claim
+
+from .base import BaseExporter
+
+
+class ClaimExporter(BaseExporter):
+    """Выгрузка рекламаций в лист claims."""
+    model = Claim
+    sheet_name = "claims"
+    header_row = 2
+    columns = [
+        ("Зав. номер машины", "machine__factory_number"),
+        ("Дата отказа", "failure_date"),
+        ("Наработка, м/час", "operating_hours"),
+        ("Узел отказа", "failure_node__name"),
+        ("Описание отказа", "failure_description"),
+        ("Способ восстановления", "recovery_method__name"),
+        ("Используемые запасные части", "spare_parts"),
+        ("Дата восстановления", "recovery_date"),
+        ("Время простоя техники", "downtime_days"),
+    ]
+    ordering = ["failure_date"]
+    client_lookups = ["machine__client"]
+    service_company_lookups = ["machine__service_company"]
@@ -0,0 +1,34 @@
+from core.models import Machine
+
+from .base import BaseExporter
+
+
+class MachineExporter(BaseExporter):
+    """Выгрузка машин в лист machines."""
+    model = Machine
+    sheet_name = "machines"
+    header_row = 3
+    title = "ОБЩИЕ СВЕДЕНИЯ"
+    columns = [
+        # Порядковый номер строки
+        ("Номер п/п", None),
+        ("Модель техники", "model_tech__name"),
+        ("Зав. номер машины", "factory_number"),
+        ("Модель двигателя", "engine_model__name"),
+        ("Зав. номер двигателя", "engine_factory_number"),
+        ("Модель трансмиссии", "transmission_model__name"),
+        ("Зав. номер трансмиссии", "transmission_factory_number"),
+        ("Модель ведущего моста", "drive_axle_model__name"),
+        ("Зав. номер ведущего моста", "drive_axle_factory_number"),
+        ("Модель управляемого моста", "steering_axle_model__name"),
+        ("Зав. номер управляемого моста", "steering_axle_factory_number"),
+        ("Дата отгрузки с завода", "shipment_date"),
+        ("Покупатель", "client__user_description"),
+        ("Грузополучатель (конечный потребитель)", "consignee"),
+        ("Адрес поставки (эксплуатации)", "delivery_address"),
+        ("Комплектация (доп. опции)", "configuration"),
+        ("Сервисная компания", "service_company__user_description"),
+    ]
+    ordering = ["shipment_date"]
+    client_lookups = ["client"]
+    service_company_lookups = ["service_company"]
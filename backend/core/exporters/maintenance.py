@@ -0,0 +1,33 @@
+from core.importers import MaintenanceImporter
+from core.models import Maintenance
+
+from .base import BaseExporter
+
+
+class MaintenanceExporter(BaseExporter):
+    """Выгрузка записей о ТО в лист maintenances."""
+    model = Maintenance
+    sheet_name = "maintenances"
+    header_row = 1
+    columns = [
+        ("Зав. номер машины", "machine__factory_number"),
+        ("Вид ТО", "maintenance_type__name"),
+        ("Дата проведения ТО", "maintenance_date"),
+        ("Наработка, м/час", "operating_hours"),
+        ("Номер заказ-наряда", "work_order_number"),
+        ("Дата заказ-наряда", "work_order_date"),
+        ("Организация, проводившая ТО", "service_company__user_description"),
+    ]
+    extra_fields = [
+        "service_company_id",
+        "machine__client_id",
+    ]
+    ordering = ["maintenance_date"]
+    client_lookups = ["machine__client"]
+    service_company_lookups = ["service_company", "machine__service_company"]
+
+    def prepare(self, record):
+        # ТО силами клиента выгружается так же, как записано в исходном файле
+        if record["service_company_id"] == record["machine__client_id"]:
+            record["service_company__user_description"] = MaintenanceImporter.SELF_SERVICE
+        return record
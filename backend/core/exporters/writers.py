@@ -0,0 +1,71 @@
+import csv
+import io
+import json
+
+from openpyxl import Workbook
+
+from core.importers.utils import chunked
+
+
+def iter_csv(exporter):
+    """
+    CSV (UTF-8 с BOM, чтобы Excel открывал кириллицу) с заголовком
+    в первой строке. Строки отдаются блоками по chunk_size.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write("\ufeff")
+    writer.writerow(exporter.headers)
+    for rows in chunked(exporter.rows(), exporter.chunk_size):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Заголовок пустой выгрузки
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(exporter):
+    """NDJSON: один объект {заголовок: значение} на строку, даты в ISO 8601."""
+    headers = exporter.headers
+    for rows in chunked(exporter.rows(), exporter.chunk_size):
+        yield "".join(
+            json.dumps(dict(zip(headers, row)), ensure_ascii=False, default=str) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+# Форматы, которые можно отдавать потоком: расширение -> (генератор, content type)
+STREAM_FORMATS = {
+    "csv": (iter_csv, "text/csv; charset=utf-8"),
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+}
+
+
+def write_stream(path, exporter, file_format):
+    """Записывает лист в файл csv/ndjson."""
+    iter_chunks = STREAM_FORMATS[file_format][0]
+    with open(path, "wb") as file:
+        for chunk in iter_chunks(exporter):
+            file.write(chunk)
+
+
+def write_xlsx(path, exporters):
+    """
+    Записывает листы в xlsx в режиме write-only: строки сразу сбрасываются
+    во временный файл и не накапливаются в памяти.
+    """
+    workbook = Workbook(write_only=True)
+    for exporter in exporters:
+        sheet = workbook.create_sheet(exporter.sheet_name)
+        for _ in range(exporter.header_row - 2):
+            sheet.append([])
+        if exporter.header_row > 1:
+            sheet.append([exporter.title] if exporter.title else [])
+        sheet.append(exporter.headers)
+        for row in exporter.rows():
+            sheet.append(row)
+    workbook.save(path)
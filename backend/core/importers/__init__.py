@@ -0,0 +1,36 @@
+"""
+Общая логика импорта табличных данных (машины, ТО, рекламации) в БД.
+Используется management-командами db-import-*.
+"""
+
+from .base import (
+    BaseImporter,
+    ImportStats,
+    RowRejected,
+)
+from .claims import ClaimImporter
+from .machines import MachineImporter
+from .maintenance import MaintenanceImporter
+from .parallel import parse_in_parallel
+from .reader import (
+    CsvReader,
+    NdjsonReader,
+    ParquetReader,
+    SheetReader,
+    get_reader,
+)
+from .profile import ImportProfiler
+from .references import ReferenceIndex
+from .reports import RejectReport, append_summary
+
+
+# Порядок загрузки: ТО и рекламации ссылаются на машины
+IMPORTERS = [
+    MachineImporter,
+    MaintenanceImporter,
+    ClaimImporter,
+]
+IMPORTERS_BY_SHEET = {
+    importer_class.sheet_name: importer_class
+    for importer_class in IMPORTERS
+}
@@ -0,0 +1,290 @@
+import math
+
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from core.cache import bump_version
+from core.models import SyncCounter, SyncTrackedModel, Tombstone
+
+from .ledger import ImportLedger, row_hash
+from .profile import ImportProfiler
+from .utils import chunked
+
+
+class RowRejected(Exception):
+    """Строка исходного файла не может быть импортирована."""
+
+
+@dataclass
+class ImportStats:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+
+
+def is_empty(value):
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    return isinstance(value, str) and not value.strip()
+
+
+def to_str(value, default=""):
+    if is_empty(value):
+        return default
+    return str(value).strip()
+
+
+def to_factory_number(value):
+    """
+    Заводской номер машины. Числовые номера хранятся без ведущих нулей
+    ("0017" -> "17"), как их записывал исходный импорт через pandas:
+    иначе повторный импорт создавал бы дубли уже загруженных машин.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    number = to_str(value)
+    if number.isascii() and number.isdigit():
+        return str(int(number))
+    return number
+
+
+def to_int(value, default=0):
+    """Неотрицательное целое; некорректные значения заменяются на default."""
+    if is_empty(value):
+        return default
+    try:
+        number = int(value)
+    except (ValueError, TypeError, OverflowError):
+        return default
+    return max(number, 0)
+
+
+def to_date(value):
+    """
+    Дата из нативного значения источника: datetime/date (xlsx, parquet)
+    или строка ISO 8601 (csv, ndjson). None, если значение не распознано.
+    """
+    if is_empty(value):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value.strip()[:10])
+        except ValueError:
+            return None
+    return None
+
+
+class BaseImporter:
+    """
+    Пакетный инкрементальный импорт строк одного листа.
+
+    Строки поступают чанками. Для каждого чанка строки разбираются
+    (parse_row) и сверяются с журналом импорта по естественному ключу
+    (natural_key): строки с неизменившимся хэшем пропускаются. Для
+    остальных связанные объекты разрешаются одним набором запросов
+    (resolve), объекты модели собираются (build), новые вставляются
+    через bulk_create, изменённые обновляются через bulk_update.
+    Некорректные строки попадают в отчёт об отклонённых строках.
+    """
+    model = None
+    sheet_name = None
+    # Номер строки заголовка на листе (с единицы)
+    header_row = 1
+    # Группы кэша (core.cache), устаревающие после записи чанка
+    cache_versions = ("machines", "dictionary", "users")
+
+    def __init__(self, index, rejects, batch_size=500, stdout=None):
+        self.index = index
+        self.rejects = rejects
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.stats = ImportStats()
+        self.ledger = ImportLedger(self.sheet_name)
+        self.update_fields = [
+            field.name
+            for field in self.model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        self._seen_keys = set()
+
+    def parse_row(self, row_number, row):
+        raise NotImplementedError
+
+    def natural_key(self, data):
+        raise NotImplementedError
+
+    def resolve(self, parsed_rows):
+        raise NotImplementedError
+
+    def build(self, data):
+        raise NotImplementedError
+
+    def resolve_existing(self, parsed_rows):
+        """
+        Вызывается после resolve для строк, которых нет в журнале импорта:
+        пакетно находит объекты, загруженные до ведения журнала, для
+        existing_object_id.
+        """
+
+    def existing_object_id(self, data):
+        """ID объекта, уже существующего в БД до ведения журнала (если есть)."""
+        return None
+
+    def reject(self, row_number, reason, row=None):
+        self.rejects.add(row_number, reason, row)
+        self.stats.rejected += 1
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def run(self, chunks, profiler=None, on_chunk=None):
+        """
+        chunks - итерируемый объект списков пар (номер строки в файле,
+        словарь значений); profiler - ImportProfiler для замера фаз;
+        on_chunk(rows) вызывается после записи каждого чанка с числом его строк.
+        """
+        profiler = profiler or ImportProfiler()
+        chunks = iter(chunks)
+        while True:
+            with profiler.phase("read"):
+                rows = next(chunks, None)
+            if rows is None:
+                break
+            with profiler.phase("parse", rows=len(rows)):
+                parsed = self.parse_chunk(rows)
+            with profiler.phase("load", rows=len(parsed)):
+                self.load_chunk(parsed)
+            if on_chunk is not None:
+                on_chunk(len(rows))
+        return self.stats
+
+    def process_chunk(self, rows):
+        self.load_chunk(self.parse_chunk(rows))
+
+    def parse_chunk(self, rows):
+        """
+        Разбор чанка без обращений к БД (может выполняться в отдельном
+        процессе). Возвращает список (номер строки, строка, данные, ключ, хэш).
+        """
+        parsed = []
+        for row_number, row in rows:
+            try:
+                data = self.parse_row(row_number, row)
+                key = self.natural_key(data)
+                if key in self._seen_keys:
+                    raise RowRejected(f"Duplicate key {key} in file")
+            except RowRejected as e:
+                self.reject(row_number, str(e), row)
+                continue
+            self._seen_keys.add(key)
+            parsed.append((row_number, row, data, key, row_hash(data)))
+        return parsed
+
+    def load_chunk(self, parsed):
+        """Сверка разобранного чанка с журналом импорта и запись в БД."""
+        entries = self.ledger.fetch([key for _, _, _, key, _ in parsed])
+        pending = []
+        for item in parsed:
+            entry = entries.get(item[3])
+            if entry is not None and entry.row_hash == item[4]:
+                self.stats.unchanged += 1
+            else:
+                pending.append(item)
+
+        if not pending:
+            return
+
+        self.resolve([data for _, _, data, _, _ in pending])
+        self.resolve_existing([data for _, _, data, key, _ in pending if key not in entries])
+
+        built = []
+        for row_number, row, data, key, digest in pending:
+            try:
+                obj = self.build(data)
+                obj.clean()
+            except RowRejected as e:
+                self.reject(row_number, str(e), row)
+                continue
+            except ValidationError as e:
+                self.reject(row_number, "; ".join(e.messages), row)
+                continue
+
+            entry = entries.get(key)
+            obj.pk = entry.object_id if entry is not None else self.existing_object_id(data)
+            built.append((row_number, row, key, digest, obj))
+
+        self._drop_missing_pks([obj for *_, obj in built if obj.pk is not None])
+        to_create = [obj for *_, obj in built if obj.pk is None]
+        to_update = [obj for *_, obj in built if obj.pk is not None]
+
+        # Внутри внешней транзакции (db-import-all) блок становится точкой
+        # сохранения: ошибка БД откатывает и отклоняет только этот чанк
+        try:
+            with transaction.atomic():
+                self._record_reassigned(to_update)
+                self._assign_versions(to_create + to_update)
+                self._insert(to_create)
+                self.model.objects.bulk_update(to_update, self.update_fields, batch_size=self.batch_size)
+                self.ledger.record(
+                    [(key, digest, obj.pk) for _, _, key, digest, obj in built],
+                    entries,
+                )
+        except DatabaseError as e:
+            for row_number, row, *_ in built:
+                self.reject(row_number, f"Database error: {e}", row)
+            return
+
+        self.stats.created += len(to_create)
+        self.stats.updated += len(to_update)
+        # bulk-операции не отправляют сигналы, кэш сбрасывается явно
+        transaction.on_commit(lambda: bump_version(*self.cache_versions))
+        self.after_save(to_create + to_update)
+
+    def after_save(self, objects):
+        """Вызывается после успешной записи чанка."""
+
+    def _assign_versions(self, objects):
+        """bulk-операции не вызывают save(): версии строк выдаются пакетом."""
+        if not objects or not issubclass(self.model, SyncTrackedModel):
+            return
+        first_version = SyncCounter.reserve(len(objects))
+        now = timezone.now()
+        for offset, obj in enumerate(objects):
+            obj.version = first_version + offset
+            obj.updated_at = now
+
+    def _record_reassigned(self, objects):
+        """bulk_update не вызывает save(): надгробия при смене владельца пишутся здесь."""
+        if not getattr(self.model, "scope_fields", None):
+            return
+        for part in chunked(objects, self.batch_size):
+            Tombstone.record_reassigned(part)
+
+    def _drop_missing_pks(self, objects):
+        """Объекты, удалённые из БД после прошлого импорта, создаются заново."""
+        alive = set()
+        for part in chunked([obj.pk for obj in objects], self.batch_size):
+            alive.update(self.model.objects.filter(pk__in=part).values_list("pk", flat=True))
+        for obj in objects:
+            if obj.pk not in alive:
+                obj.pk = None
+
+    def _insert(self, objects):
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.model.objects.bulk_create(objects, batch_size=self.batch_size)
+        else:
+            # Без RETURNING bulk_create не проставляет pk, нужные журналу
+            for obj in objects:
+                obj.save()
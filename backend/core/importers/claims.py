@@ -0,0 +1,123 @@
+from core.models import Claim
+
+from .base import (
+    BaseImporter,
+    RowRejected,
+    to_date,
+    to_factory_number,
+    to_int,
+    to_str,
+)
+from .utils import chunked
+
+
+class ClaimImporter(BaseImporter):
+    """Импорт рекламаций из листа claims."""
+    model = Claim
+    sheet_name = "claims"
+    header_row = 2
+
+    DEFAULT_FAILURE_NODE = "Не указан"
+    DEFAULT_RECOVERY_METHOD = "Неизвестно"
+
+    def parse_row(self, row_number, row):
+        factory_number = to_factory_number(row.get("Зав. номер машины"))
+        if not factory_number:
+            raise RowRejected("Missing factory number")
+
+        failure_date = to_date(row.get("Дата отказа"))
+        if failure_date is None:
+            raise RowRejected(f"Invalid failure date: {row.get('Дата отказа')}")
+
+        return {
+            "factory_number": factory_number,
+            "failure_date": failure_date,
+            "recovery_date": to_date(row.get("Дата восстановления")),
+            "operating_hours": to_int(row.get("Наработка, м/час")),
+            "failure_node": to_str(row.get("Узел отказа")),
+            "failure_description": to_str(row.get("Описание отказа")),
+            "recovery_method": to_str(
+                row.get("Способ восстановления"),
+                default=self.DEFAULT_RECOVERY_METHOD,
+            ),
+            "spare_parts": to_str(row.get("Используемые запасные части")),
+        }
+
+    def natural_key(self, data):
+        return f"{data['factory_number']}|{data['failure_date'].isoformat()}"
+
+    def resolve(self, parsed_rows):
+        self.index.resolve_machines(data["factory_number"] for data in parsed_rows)
+
+        failure_nodes = {}
+        recovery_methods = {}
+        for data in parsed_rows:
+            description = f"Автосоздано для машины {data['factory_number']}"
+            if data["failure_node"]:
+                failure_nodes.setdefault(data["failure_node"], description)
+            else:
+                failure_nodes.setdefault(
+                    self.DEFAULT_FAILURE_NODE,
+                    "Узел отказа не был указан в исходных данных",
+                )
+            recovery_methods.setdefault(data["recovery_method"], description)
+
+        for entity, descriptions in (
+            ("failure_node", failure_nodes),
+            ("recovery_method", recovery_methods),
+        ):
+            created = self.index.resolve_entries(entity, descriptions)
+            if created:
+                self.log(f"New dictionary entries created: {entity} -> {', '.join(created)}")
+
+    def resolve_existing(self, parsed_rows):
+        machine_ids = set()
+        for data in parsed_rows:
+            machine = self.index.machine(data["factory_number"])
+            if machine is not None:
+                machine_ids.add(machine.pk)
+
+        self.existing = {}
+        for part in chunked(sorted(machine_ids), self.index.IN_BATCH_SIZE):
+            queryset = Claim.objects.filter(machine_id__in=part).order_by("pk").values_list(
+                "pk",
+                "machine_id",
+                "failure_date",
+                "failure_node_id",
+            )
+            for pk, *fields in queryset:
+                self.existing.setdefault(tuple(fields), pk)
+
+    def existing_object_id(self, data):
+        machine = self.index.machine(data["factory_number"])
+        failure_node = self.index.entry(
+            "failure_node",
+            data["failure_node"] or self.DEFAULT_FAILURE_NODE,
+        )
+        if machine is None or failure_node is None:
+            return None
+        # pop: одна запись в БД сопоставляется только одной строке файла
+        return self.existing.pop((machine.pk, data["failure_date"], failure_node.pk), None)
+
+    def build(self, data):
+        machine = self.index.machine(data["factory_number"])
+        if machine is None:
+            raise RowRejected(
+                f"Machine with factory number {data['factory_number']} not found"
+            )
+
+        claim = Claim(
+            failure_date=data["failure_date"],
+            operating_hours=data["operating_hours"],
+            failure_node=self.index.entry(
+                "failure_node",
+                data["failure_node"] or self.DEFAULT_FAILURE_NODE,
+            ),
+            failure_description=data["failure_description"],
+            recovery_method=self.index.entry("recovery_method", data["recovery_method"]),
+            spare_parts=data["spare_parts"],
+            recovery_date=data["recovery_date"],
+            machine=machine,
+        )
+        claim.downtime_days = claim.calculate_downtime_days()
+        return claim
@@ -0,0 +1,194 @@
+import os
+
+from contextlib import nullcontext
+
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import PendingCredential
+
+from .claims import ClaimImporter
+from .machines import MachineImporter
+from .maintenance import MaintenanceImporter
+from .profile import ImportProfiler
+from .reader import READERS, get_reader
+from .references import ReferenceIndex
+from .reports import RejectReport, append_summary
+
+
+DEFAULT_IMPORT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "basic_data.xlsx",
+)
+
+
+def get_group(name):
+    try:
+        return Group.objects.get(name=name)
+    except Group.DoesNotExist:
+        raise CommandError(
+            f"Group '{name}' not found! Run 'python manage.py setup-groups' first."
+        )
+
+
+def get_importer_kwargs():
+    """Аргументы импортёров для загрузки всех листов, по классу импортёра."""
+    return {
+        MachineImporter: {
+            "client_group": get_group("Клиент"),
+            "service_group": get_group("Сервисная организация"),
+        },
+        MaintenanceImporter: {
+            "service_group": get_group("Сервисная организация"),
+        },
+        ClaimImporter: {},
+    }
+
+
+def add_report_arguments(parser):
+    """Общие для команд импорта опции проверки, отчётов и профилирования."""
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help="Rows per chunk and bulk insert",
+        default=500,
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Validate and write everything in a transaction that is rolled back",
+    )
+    parser.add_argument(
+        "--summary",
+        type=str,
+        help="JSONL file to append the import summary to (default: <file>-import-summary.jsonl)",
+        default=None,
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record per-phase query count and peak memory (tracemalloc)",
+    )
+
+
+def dry_run_transaction(dry_run):
+    """Для --dry-run всё выполняется в одной транзакции, которая откатывается."""
+    if not dry_run:
+        return nullcontext()
+    return transaction.atomic()
+
+
+class ImportCommand(BaseCommand):
+    """
+    Базовая команда db-import-*: читает исходный файл потоково (формат
+    определяется по расширению) и передаёт чанки строк импортёру
+    importer_class. Файлы csv/ndjson/parquet содержат один лист.
+    """
+    importer_class = None
+    # Название импортируемых данных для сообщений
+    label = None
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--file",
+            type=str,
+            help=f"Source file full path ({', '.join(READERS)})",
+            default=DEFAULT_IMPORT_FILE,
+        )
+        parser.add_argument(
+            "--rejects",
+            type=str,
+            help="Rejected rows report path, .jsonl or .csv (default: <file>-<sheet>-rejects.jsonl)",
+            default=None,
+        )
+        add_report_arguments(parser)
+
+    def get_importer_kwargs(self):
+        return {}
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        source_path = options["file"]
+
+        if not os.path.exists(source_path):
+            raise CommandError(f"File not found: {source_path}")
+
+        sheet_name = self.importer_class.sheet_name
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+        base_path = os.path.splitext(source_path)[0]
+        rejects_path = options["rejects"] or f"{base_path}-{sheet_name}-rejects.jsonl"
+        summary_path = options["summary"] or f"{base_path}-import-summary.jsonl"
+
+        self.stdout.write(
+            f"Starting import {self.label} data from {source_path}"
+            f"{' (dry run)' if dry_run else ''}..."
+        )
+
+        profiler = ImportProfiler(detailed=options["profile"])
+        try:
+            with RejectReport(rejects_path, sheet=sheet_name) as rejects, profiler:
+                with profiler.phase("total"), dry_run_transaction(dry_run):
+                    importer = self.importer_class(
+                        ReferenceIndex(),
+                        rejects,
+                        batch_size=batch_size,
+                        # Построчные сообщения только при -v 2
+                        stdout=self.stdout if options["verbosity"] > 1 else None,
+                        **self.get_importer_kwargs(),
+                    )
+                    stats = importer.run(
+                        get_reader(
+                            source_path,
+                            sheet_name,
+                            header_row=importer.header_row,
+                            chunk_size=batch_size,
+                        ),
+                        profiler=profiler,
+                    )
+                    if dry_run:
+                        transaction.set_rollback(True)
+        except CommandError:
+            raise
+        except Exception as e:
+            raise CommandError(f"Import failed: {e}")
+
+        append_summary(
+            summary_path,
+            command=f"db-import-{self.label}",
+            sheet=sheet_name,
+            source=source_path,
+            stats=stats,
+            dry_run=dry_run,
+            rejects=rejects,
+            profiler=profiler,
+        )
+
+        self.stdout.write(
+            f"Created: {stats.created}, updated: {stats.updated}, "
+            f"unchanged: {stats.unchanged}, rejected: {stats.rejected}"
+        )
+        if stats.rejected:
+            self.stderr.write(f"Rejected rows written to {rejects_path}")
+        if options["profile"] or options["verbosity"] > 1:
+            profiler.write_report(self.stdout)
+        self.stdout.write(f"Summary appended to {summary_path}")
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS("Dry run completed, all changes rolled back."))
+            return
+
+        if PendingCredential.objects.exists():
+            self.stdout.write(
+                "New accounts are waiting for passwords: run 'python manage.py hash-credentials'"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{self.label.capitalize()} import completed successfully!")
+        )
@@ -0,0 +1,199 @@
+"""
+Очередь заданий импорта в БД (core.models.ImportJob). Загруженный файл
+записывается на диск, задание забирает воркер команды run-workers и
+выполняет его теми же импортёрами, что и команды db-import-*.
+"""
+
+import os
+import uuid
+
+from dataclasses import asdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db.models import Exists
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from core.metrics import IMPORT_JOB_DURATION, IMPORT_JOBS, IMPORT_ROWS
+from core.models import ImportJob
+
+from . import IMPORTERS, IMPORTERS_BY_SHEET
+from .command import get_importer_kwargs
+from .reader import get_reader
+from .references import ReferenceIndex
+from .reports import RejectReport
+
+
+PROGRESS_FIELDS = [
+    "rows_total",
+    "rows_processed",
+    "created",
+    "updated",
+    "unchanged",
+    "rejected",
+    "sheets",
+    "heartbeat_at",
+]
+
+# Минимальный интервал отметок о работе вне записи прогресса, с
+HEARTBEAT_INTERVAL = 5
+
+
+def enqueue_upload(uploaded_file, user, sheet=""):
+    """
+    Записывает загруженный файл на диск по чанкам и ставит задание в
+    очередь. Каждому заданию - свой каталог: туда же пишутся отчёты
+    об отклонённых строках.
+    """
+    directory = os.path.join(settings.IMPORT_UPLOAD_DIR, uuid.uuid4().hex)
+    os.makedirs(directory)
+    file_name = get_valid_filename(os.path.basename(uploaded_file.name))
+    path = os.path.join(directory, file_name)
+    with open(path, "wb") as file:
+        for chunk in uploaded_file.chunks():
+            file.write(chunk)
+
+    return ImportJob.objects.create(
+        user=user,
+        file_name=file_name,
+        file_path=path,
+        sheet=sheet,
+    )
+
+
+def claim_job(worker):
+    """
+    Забирает самое старое задание из очереди. Статус меняется условным
+    UPDATE, поэтому одно задание достаётся только одному воркеру, в том
+    числе из другого процесса. Импорт выполняется по одному заданию:
+    импортёры создают пользователей и элементы справочников без
+    блокировок, а SQLite всё равно пишет в один поток. None, если
+    очередь пуста или другое задание ещё выполняется.
+    """
+    while True:
+        job = ImportJob.objects.filter(status="queued").order_by("created_at", "pk").first()
+        if job is None:
+            return None
+
+        now = timezone.now()
+        claimed = ImportJob.objects.filter(
+            ~Exists(ImportJob.objects.filter(status="running")),
+            pk=job.pk,
+            status="queued",
+        ).update(
+            status="running",
+            worker=worker,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        if ImportJob.objects.filter(status="running").exists():
+            return None
+
+
+def requeue_stale(stale_after=None):
+    """
+    Возвращает в очередь задания, прогресс которых не обновлялся дольше
+    stale_after секунд (воркер остановлен). Повторный импорт безопасен:
+    уже загруженные строки пропускаются по журналу импорта.
+    """
+    if stale_after is None:
+        stale_after = settings.IMPORT_JOB_STALE_AFTER
+    return ImportJob.objects.filter(
+        status="running",
+        heartbeat_at__lt=timezone.now() - timedelta(seconds=stale_after),
+    ).update(
+        status="queued",
+        worker="",
+    )
+
+
+def run_job(job, batch_size=500):
+    """Выполняет задание и сохраняет итог; ошибка импорта переводит его в failed."""
+    try:
+        _import(job, batch_size)
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    else:
+        job.status = "done"
+        job.error = ""
+    job.finished_at = timezone.now()
+    job.save(update_fields=[*PROGRESS_FIELDS, "status", "error", "finished_at"])
+    IMPORT_JOBS.inc(status=job.status)
+    IMPORT_JOB_DURATION.observe((job.finished_at - job.started_at).total_seconds())
+    return job
+
+
+def _import(job, batch_size):
+    if job.sheet:
+        importer_classes = [IMPORTERS_BY_SHEET[job.sheet]]
+    else:
+        importer_classes = IMPORTERS
+
+    readers = {
+        importer_class: get_reader(
+            job.file_path,
+            importer_class.sheet_name,
+            header_row=importer_class.header_row,
+            chunk_size=batch_size,
+        )
+        for importer_class in importer_classes
+    }
+    job.rows_total = None
+    job.rows_processed = 0
+    job.sheets = {}
+    # Оценка размера - отдельный проход по файлу: без отметок о работе
+    # задание с большим xlsx считалось бы брошенным и уходило в очередь
+    _save_progress(job)
+    estimates = [
+        reader.estimate_rows(on_progress=partial(_heartbeat, job))
+        for reader in readers.values()
+    ]
+    job.rows_total = None if None in estimates else sum(estimates)
+    _save_progress(job)
+
+    importer_kwargs = get_importer_kwargs()
+    for importer_class, reader in readers.items():
+        sheet_name = importer_class.sheet_name
+        rejects_path = os.path.join(job.upload_dir, f"{sheet_name}-rejects.jsonl")
+        with RejectReport(rejects_path, sheet=sheet_name) as rejects:
+            importer = importer_class(
+                ReferenceIndex(),
+                rejects,
+                batch_size=batch_size,
+                **importer_kwargs[importer_class],
+            )
+
+            def on_chunk(rows):
+                IMPORT_ROWS.inc(rows, sheet=sheet_name)
+                job.rows_processed += rows
+                job.sheets[sheet_name] = {
+                    **asdict(importer.stats),
+                    "rejects_path": rejects.path if rejects.count else None,
+                }
+                _save_progress(job)
+
+            importer.run(reader, on_chunk=on_chunk)
+            # Итог листа фиксируется и для пустого листа
+            on_chunk(0)
+
+
+def _heartbeat(job):
+    """Отметка о работе без записи прогресса, не чаще HEARTBEAT_INTERVAL с."""
+    now = timezone.now()
+    if job.heartbeat_at is not None and (now - job.heartbeat_at).total_seconds() < HEARTBEAT_INTERVAL:
+        return
+    job.heartbeat_at = now
+    job.save(update_fields=["heartbeat_at"])
+
+
+def _save_progress(job):
+    for field in ("created", "updated", "unchanged", "rejected"):
+        setattr(job, field, sum(stats[field] for stats in job.sheets.values()))
+    job.heartbeat_at = timezone.now()
+    job.save(update_fields=PROGRESS_FIELDS)
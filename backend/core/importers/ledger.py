@@ -0,0 +1,65 @@
+import hashlib
+import json
+
+from django.utils import timezone
+
+from core.models import ImportLedgerEntry
+
+from .utils import chunked
+
+
+def row_hash(data):
+    """SHA-256 нормализованной (разобранной) строки."""
+    # Номер строки на листе не относится к содержимому строки
+    content = {key: value for key, value in data.items() if key != "row_number"}
+    serialized = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class ImportLedger:
+    """Чтение и запись журнала импорта одного листа."""
+    IN_BATCH_SIZE = 500
+
+    def __init__(self, source):
+        self.source = source
+
+    def fetch(self, keys):
+        entries = {}
+        for part in chunked(keys, self.IN_BATCH_SIZE):
+            queryset = ImportLedgerEntry.objects.filter(
+                source=self.source,
+                natural_key__in=part,
+            )
+            for entry in queryset:
+                entries[entry.natural_key] = entry
+        return entries
+
+    def record(self, rows, entries):
+        """
+        rows - список (ключ, хэш, id объекта); entries - уже существующие
+        записи журнала по ключам (результат fetch).
+        """
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for key, digest, object_id in rows:
+            entry = entries.get(key)
+            if entry is None:
+                to_create.append(ImportLedgerEntry(
+                    source=self.source,
+                    natural_key=key,
+                    row_hash=digest,
+                    object_id=object_id,
+                ))
+            else:
+                entry.row_hash = digest
+                entry.object_id = object_id
+                entry.imported_at = now
+                to_update.append(entry)
+
+        ImportLedgerEntry.objects.bulk_create(to_create, batch_size=self.IN_BATCH_SIZE)
+        ImportLedgerEntry.objects.bulk_update(
+            to_update,
+            ["row_hash", "object_id", "imported_at"],
+            batch_size=self.IN_BATCH_SIZE,
+        )
@@ -0,0 +1,132 @@
+from core.models import Machine
+
+from .base import (
+    BaseImporter,
+    RowRejected,
+    to_date,
+    to_factory_number,
+    to_str,
+)
+
+
+class MachineImporter(BaseImporter):
+    """Импорт машин из листа machines."""
+    model = Machine
+    sheet_name = "machines"
+    header_row = 3
+
+    # Колонка листа -> тип справочника
+    DICTIONARY_COLUMNS = {
+        "Модель техники": "machine_model",
+        "Модель двигателя": "engine_model",
+        "Модель трансмиссии": "transmission_model",
+        "Модель ведущего моста": "drive_axle_model",
+        "Модель управляемого моста": "steering_axle_model",
+    }
+
+    # Группы нужны только для создания пользователей (не для разбора строк)
+    def __init__(self, *args, client_group=None, service_group=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client_group = client_group
+        self.service_group = service_group
+
+    def parse_row(self, row_number, row):
+        factory_number = to_factory_number(row.get("Зав. номер машины"))
+        if not factory_number:
+            raise RowRejected("Missing factory number")
+
+        shipment_date = to_date(row.get("Дата отгрузки с завода"))
+        if shipment_date is None:
+            raise RowRejected(
+                f"Cannot process shipment date: {row.get('Дата отгрузки с завода')}"
+            )
+
+        data = {
+            "row_number": row_number,
+            "factory_number": factory_number,
+            "engine_factory_number": to_str(row.get("Зав. номер двигателя")),
+            "transmission_factory_number": to_str(row.get("Зав. номер трансмиссии")),
+            "steering_axle_factory_number": to_str(row.get("Зав. номер управляемого моста")),
+            "drive_axle_factory_number": to_str(row.get("Зав. номер ведущего моста")),
+            "consignee": to_str(row.get("Грузополучатель (конечный потребитель)")),
+            "delivery_address": to_str(row.get("Адрес поставки (эксплуатации)")),
+            "configuration": to_str(row.get("Комплектация (доп. опции)")),
+            "shipment_date": shipment_date,
+            "client": to_str(row.get("Покупатель")),
+            "service_company": to_str(row.get("Сервисная компания")),
+        }
+        if not data["client"]:
+            raise RowRejected("Missing client")
+        if not data["service_company"]:
+            raise RowRejected("Missing service company")
+
+        for column, entity in self.DICTIONARY_COLUMNS.items():
+            data[entity] = to_str(row.get(column))
+            if not data[entity]:
+                raise RowRejected(f"Missing value in column '{column}'")
+
+        return data
+
+    def natural_key(self, data):
+        return data["factory_number"]
+
+    def existing_object_id(self, data):
+        machine = self.index.machine(data["factory_number"])
+        return machine.pk if machine is not None else None
+
+    def resolve(self, parsed_rows):
+        self.index.resolve_machines(data["factory_number"] for data in parsed_rows)
+
+        for entity in self.DICTIONARY_COLUMNS.values():
+            descriptions = {}
+            for data in parsed_rows:
+                descriptions.setdefault(
+                    data[entity],
+                    f"Автосоздано для машины {data['factory_number']}",
+                )
+            created = self.index.resolve_entries(entity, descriptions)
+            if created:
+                self.log(f"New dictionary entries created: {entity} -> {', '.join(created)}")
+
+        users = {}
+        for data in parsed_rows:
+            users.setdefault(data["service_company"], {
+                "username": f"serv-comp-login-{data['row_number']}",
+                "user_type": "service_company",
+                "group": self.service_group,
+            })
+            users.setdefault(data["client"], {
+                "username": f"client-login-{data['row_number']}",
+                "user_type": "client",
+                "group": self.client_group,
+            })
+
+        for user in self.index.resolve_users(users):
+            self.log(f"Created new {user.user_type} {user.user_description} with login {user.username}")
+
+    def after_save(self, objects):
+        # Созданные и обновлённые машины сразу доступны импорту ТО и рекламаций
+        for machine in objects:
+            self.index.machines[machine.factory_number] = machine
+
+    def build(self, data):
+        return Machine(
+            factory_number=data["factory_number"],
+            model_tech=self.index.entry("machine_model", data["machine_model"]),
+            engine_model=self.index.entry("engine_model", data["engine_model"]),
+            engine_factory_number=data["engine_factory_number"],
+            transmission_model=self.index.entry("transmission_model", data["transmission_model"]),
+            transmission_factory_number=data["transmission_factory_number"],
+            drive_axle_model=self.index.entry("drive_axle_model", data["drive_axle_model"]),
+            drive_axle_factory_number=data["drive_axle_factory_number"],
+            steering_axle_model=self.index.entry("steering_axle_model", data["steering_axle_model"]),
+            steering_axle_factory_number=data["steering_axle_factory_number"],
+            # Этого поля в исходном файле нет
+            delivery_contract=None,
+            shipment_date=data["shipment_date"],
+            consignee=data["consignee"],
+            delivery_address=data["delivery_address"],
+            configuration=data["configuration"],
+            client=self.index.user(data["client"]),
+            service_company=self.index.user(data["service_company"]),
+        )
@@ -0,0 +1,157 @@
+from core.models import Maintenance
+
+from .base import (
+    BaseImporter,
+    RowRejected,
+    to_date,
+    to_factory_number,
+    to_int,
+    to_str,
+)
+from .utils import chunked
+
+
+class MaintenanceImporter(BaseImporter):
+    """Импорт записей о ТО из листа maintenances."""
+    model = Maintenance
+    sheet_name = "maintenances"
+    header_row = 1
+
+    # Значение в колонке организации, означающее ТО силами клиента
+    SELF_SERVICE = "самостоятельно"
+
+    # Группа нужна только для создания пользователей (не для разбора строк)
+    def __init__(self, *args, service_group=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.service_group = service_group
+
+    def parse_row(self, row_number, row):
+        factory_number = to_factory_number(row.get("Зав. номер машины"))
+        if not factory_number:
+            raise RowRejected("Missing factory number")
+
+        maintenance_date = to_date(row.get("Дата проведения ТО"))
+        if maintenance_date is None:
+            raise RowRejected(f"Invalid maintenance date: {row.get('Дата проведения ТО')}")
+
+        maintenance_type = to_str(row.get("Вид ТО"))
+        if not maintenance_type:
+            raise RowRejected("Missing maintenance type")
+
+        return {
+            "row_number": row_number,
+            "factory_number": factory_number,
+            "maintenance_type": maintenance_type,
+            "maintenance_date": maintenance_date,
+            "operating_hours": to_int(row.get("Наработка, м/час")),
+            "work_order_number": to_str(row.get("Номер заказ-наряда"), default=None),
+            "work_order_date": to_date(row.get("Дата заказ-наряда")),
+            "service_company": to_str(row.get("Организация, проводившая ТО")),
+        }
+
+    def natural_key(self, data):
+        if data["work_order_number"]:
+            return data["work_order_number"]
+        # Без номера заказ-наряда запись определяется машиной, датой и видом ТО
+        return "|".join((
+            data["factory_number"],
+            data["maintenance_date"].isoformat(),
+            data["maintenance_type"],
+        ))
+
+    @staticmethod
+    def existing_key(machine_id, maintenance_date, work_order_number, maintenance_type_id):
+        # Как и natural_key: без номера заказ-наряда - по виду ТО
+        if work_order_number:
+            return machine_id, maintenance_date, work_order_number
+        return machine_id, maintenance_date, None, maintenance_type_id
+
+    def resolve_existing(self, parsed_rows):
+        machine_ids = set()
+        for data in parsed_rows:
+            machine = self.index.machine(data["factory_number"])
+            if machine is not None:
+                machine_ids.add(machine.pk)
+
+        self.existing = {}
+        for part in chunked(sorted(machine_ids), self.index.IN_BATCH_SIZE):
+            queryset = Maintenance.objects.filter(machine_id__in=part).order_by("pk").values_list(
+                "pk",
+                "machine_id",
+                "maintenance_date",
+                "work_order_number",
+                "maintenance_type_id",
+            )
+            for pk, *fields in queryset:
+                self.existing.setdefault(self.existing_key(*fields), pk)
+
+    def existing_object_id(self, data):
+        machine = self.index.machine(data["factory_number"])
+        maintenance_type = self.index.entry("maintenance_type", data["maintenance_type"])
+        if machine is None or maintenance_type is None:
+            return None
+        # pop: одна запись в БД сопоставляется только одной строке файла
+        return self.existing.pop(self.existing_key(
+            machine.pk,
+            data["maintenance_date"],
+            data["work_order_number"],
+            maintenance_type.pk,
+        ), None)
+
+    def resolve(self, parsed_rows):
+        self.index.resolve_machines(data["factory_number"] for data in parsed_rows)
+
+        maintenance_types = {}
+        companies = {}
+        for data in parsed_rows:
+            maintenance_types.setdefault(
+                data["maintenance_type"],
+                f"Автосоздано для машины {data['factory_number']}",
+            )
+            name = data["service_company"]
+            if name and name.lower() != self.SELF_SERVICE:
+                companies.setdefault(name, {
+                    "username": f"serv-comp-login-{data['row_number']}",
+                    "user_type": "service_company",
+                    "group": self.service_group,
+                })
+
+        created = self.index.resolve_entries("maintenance_type", maintenance_types)
+        if created:
+            self.log(f"New dictionary entries created: maintenance_type -> {', '.join(created)}")
+
+        created_users = self.index.resolve_users(companies)
+        for user in created_users:
+            self.log(f"Created new service company {user.user_description} with login {user.username}")
+
+        added = self.index.add_to_group(
+            [self.index.user(name) for name in companies],
+            self.service_group,
+        )
+        if added:
+            self.log(f"Added {len(added)} users to service group")
+
+    def build(self, data):
+        machine = self.index.machine(data["factory_number"])
+        if machine is None:
+            raise RowRejected(
+                f"Machine with factory number {data['factory_number']} not found"
+            )
+
+        name = data["service_company"]
+        if name.lower() == self.SELF_SERVICE:
+            service_company = machine.client
+        else:
+            service_company = self.index.user(name)
+        if service_company is None:
+            raise RowRejected("Missing service company")
+
+        return Maintenance(
+            maintenance_type=self.index.entry("maintenance_type", data["maintenance_type"]),
+            maintenance_date=data["maintenance_date"],
+            operating_hours=data["operating_hours"],
+            work_order_number=data["work_order_number"],
+            work_order_date=data["work_order_date"],
+            machine=machine,
+            service_company=service_company,
+        )
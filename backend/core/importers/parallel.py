@@ -0,0 +1,61 @@
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from .reader import get_reader
+from .references import ReferenceIndex
+
+
+class CollectedRejects:
+    """Накопитель отклонённых строк в процессе-воркере (вместо файла отчёта)."""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, row_number, reason, row=None):
+        self.rows.append((row_number, reason, row))
+
+
+def _init_worker():
+    # При запуске процессов через spawn Django нужно инициализировать заново
+    django.setup()
+
+
+def parse_source(importer_class, path, chunk_size):
+    """
+    Читает и разбирает файл одного листа без обращений к БД.
+    Возвращает (разобранные чанки, отклонённые строки, время в секундах).
+    """
+    started = time.perf_counter()
+    rejects = CollectedRejects()
+    importer = importer_class(ReferenceIndex(), rejects, batch_size=chunk_size)
+    reader = get_reader(
+        path,
+        importer_class.sheet_name,
+        header_row=importer_class.header_row,
+        chunk_size=chunk_size,
+    )
+    chunks = [importer.parse_chunk(rows) for rows in reader]
+    return chunks, rejects.rows, time.perf_counter() - started
+
+
+def parse_in_parallel(sources, chunk_size, workers=None):
+    """
+    Разбирает листы параллельно в отдельных процессах.
+    sources - {класс импортёра: путь к файлу}; результат - {класс импортёра:
+    результат parse_source}.
+    """
+    with ProcessPoolExecutor(
+        max_workers=workers or len(sources),
+        initializer=_init_worker,
+    ) as executor:
+        futures = {
+            importer_class: executor.submit(parse_source, importer_class, path, chunk_size)
+            for importer_class, path in sources.items()
+        }
+        return {
+            importer_class: future.result()
+            for importer_class, future in futures.items()
+        }
@@ -0,0 +1,91 @@
+import time
+import tracemalloc
+
+from contextlib import contextmanager, nullcontext
+
+from django.db import connection
+
+
+class ImportProfiler:
+    """
+    Замер фаз импорта. Время фаз измеряется всегда; число SQL-запросов
+    и пик памяти (tracemalloc) - только в подробном режиме (--profile).
+    Повторные входы в фазу с тем же именем суммируются.
+    """
+
+    def __init__(self, detailed=False):
+        self.detailed = detailed
+        self.phases = {}
+        # Пики памяти активных (в т.ч. вложенных) фаз в байтах
+        self._active_peaks = []
+
+    def _collect_peak(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        for position, active_peak in enumerate(self._active_peaks):
+            self._active_peaks[position] = max(active_peak, peak)
+
+    def __enter__(self):
+        if self.detailed:
+            tracemalloc.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.detailed:
+            tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name, rows=0):
+        stats = self.phases.setdefault(name, {
+            "phase": name,
+            "seconds": 0.0,
+            "rows": 0,
+            "queries": 0,
+            "peak_memory_kb": 0,
+        })
+        queries = 0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        if self.detailed:
+            # Пик до сброса учитывается во внешних фазах
+            self._collect_peak()
+            tracemalloc.reset_peak()
+            self._active_peaks.append(0)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count_queries) if self.detailed else nullcontext():
+                yield stats
+        finally:
+            stats["seconds"] += time.perf_counter() - started
+            stats["rows"] += rows
+            if self.detailed:
+                self._collect_peak()
+                stats["queries"] += queries
+                stats["peak_memory_kb"] = max(
+                    stats["peak_memory_kb"],
+                    self._active_peaks.pop() // 1024,
+                )
+
+    def as_list(self):
+        return [
+            {**stats, "seconds": round(stats["seconds"], 4)}
+            for stats in self.phases.values()
+        ]
+
+    def write_report(self, stdout):
+        header = f"{'phase':<14} {'seconds':>9} {'rows':>9} {'rows/s':>10}"
+        if self.detailed:
+            header += f" {'queries':>9} {'peak KB':>10}"
+        stdout.write(header)
+
+        for stats in self.phases.values():
+            seconds = stats["seconds"]
+            rows = stats["rows"]
+            speed = f"{rows / seconds:.0f}" if rows and seconds else "-"
+            line = f"{stats['phase']:<14} {seconds:>9.3f} {rows or '-':>9} {speed:>10}"
+            if self.detailed:
+                line += f" {stats['queries']:>9} {stats['peak_memory_kb']:>10}"
+            stdout.write(line)
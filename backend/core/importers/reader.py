@@ -0,0 +1,183 @@
+import csv
+import json
+import os
+
+from openpyxl import load_workbook
+
+from .utils import chunked
+
+
+class SourceReader:
+    """
+    Потоковое чтение исходного файла импорта.
+
+    Строки отдаются чанками по chunk_size пар (номер строки в файле,
+    словарь {заголовок: значение}). Пустые строки пропускаются, файл
+    целиком в память не загружается.
+    """
+
+    def __init__(self, path, sheet_name, header_row=1, chunk_size=500):
+        self.path = path
+        self.sheet_name = sheet_name
+        self.header_row = header_row
+        self.chunk_size = chunk_size
+
+    def rows(self):
+        raise NotImplementedError
+
+    def estimate_rows(self, on_progress=None):
+        """
+        Число строк данных для прогресса импорта. По умолчанию - отдельным
+        проходом чтения (размер листа xlsx из его заголовка учитывает
+        пустые отформатированные строки); форматы, где строки можно
+        посчитать дешевле, переопределяют метод. Проход по большому файлу
+        долгий: on_progress() вызывается через каждые chunk_size строк.
+        """
+        count = 0
+        for _ in self.rows():
+            count += 1
+            if on_progress is not None and count % self.chunk_size == 0:
+                on_progress()
+        return count
+
+    def __iter__(self):
+        return chunked(self.rows(), self.chunk_size)
+
+
+class SheetReader(SourceReader):
+    """
+    Лист xlsx в режиме read-only. Значения сохраняют типы ячеек
+    (datetime, int, float, str).
+    """
+
+    def rows(self):
+        workbook = load_workbook(self.path, read_only=True, data_only=True)
+        try:
+            if self.sheet_name not in workbook.sheetnames:
+                raise ValueError(f"Sheet '{self.sheet_name}' not found in {self.path}")
+
+            rows = workbook[self.sheet_name].iter_rows(
+                min_row=self.header_row,
+                values_only=True,
+            )
+            header = next(rows, None)
+            if header is None:
+                return
+
+            columns = [
+                (position, str(name).strip())
+                for position, name in enumerate(header)
+                if name is not None
+            ]
+
+            for row_number, values in enumerate(rows, start=self.header_row + 1):
+                if all(value is None for value in values):
+                    continue
+
+                yield row_number, {
+                    name: values[position] if position < len(values) else None
+                    for position, name in columns
+                }
+        finally:
+            workbook.close()
+
+
+def count_lines(path):
+    count = 0
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            count += block.count(b"\n")
+    return count
+
+
+class CsvReader(SourceReader):
+    """
+    CSV (UTF-8) с заголовком в первой строке; файл содержит один лист.
+    Даты ожидаются в формате ISO 8601.
+    """
+
+    def rows(self):
+        with open(self.path, newline="", encoding="utf-8-sig") as file:
+            reader = csv.DictReader(file)
+            for row in reader:
+                if not any(row.values()):
+                    continue
+                yield reader.line_num, {
+                    name.strip(): value
+                    for name, value in row.items()
+                    if name
+                }
+
+    def estimate_rows(self, on_progress=None):
+        # Без учёта переводов строк внутри значений в кавычках
+        return max(count_lines(self.path) - 1, 0)
+
+
+class NdjsonReader(SourceReader):
+    """
+    NDJSON: один JSON-объект на строку; файл содержит один лист.
+    Числа приходят как числа JSON, даты - строками ISO 8601.
+    """
+
+    def rows(self):
+        with open(self.path, encoding="utf-8") as file:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {line_number}: invalid JSON ({e})")
+                yield line_number, row
+
+    def estimate_rows(self, on_progress=None):
+        return count_lines(self.path)
+
+
+class ParquetReader(SourceReader):
+    """
+    Parquet (требуется pyarrow); файл содержит один лист. Колонки
+    date/timestamp/int отдаются нативными типами Python.
+    """
+
+    def rows(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Reading .parquet files requires the pyarrow package")
+
+        parquet_file = pq.ParquetFile(self.path)
+        row_number = 0
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_size):
+            for row in batch.to_pylist():
+                row_number += 1
+                yield row_number, row
+
+    def estimate_rows(self, on_progress=None):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return None
+        return pq.ParquetFile(self.path).metadata.num_rows
+
+
+READERS = {
+    ".xlsx": SheetReader,
+    ".csv": CsvReader,
+    ".ndjson": NdjsonReader,
+    ".jsonl": NdjsonReader,
+    ".parquet": ParquetReader,
+}
+
+
+def get_reader(path, sheet_name, header_row=1, chunk_size=500):
+    """Выбирает читатель по расширению файла."""
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        reader_class = READERS[extension]
+    except KeyError:
+        raise ValueError(
+            f"Unsupported file format '{extension}'. "
+            f"Supported: {', '.join(READERS)}"
+        )
+    return reader_class(path, sheet_name, header_row=header_row, chunk_size=chunk_size)
@@ -0,0 +1,177 @@
+from django.contrib.auth.hashers import make_password
+
+from core.models import (
+    CustomUser,
+    DictionaryEntry,
+    Machine,
+    PendingCredential,
+)
+
+from .utils import chunked
+
+
+class ReferenceIndex:
+    """
+    Кэш связанных объектов для импорта: машины по зав. номеру, элементы
+    справочников по (тип, значение) и пользователи по описанию.
+    Недостающие значения запрашиваются пакетно через __in, отсутствующие
+    в БД элементы справочников и пользователи создаются через bulk_create.
+    """
+    # Ограничение на число параметров одного запроса в SQLite
+    IN_BATCH_SIZE = 500
+
+    def __init__(self):
+        self.machines = {}
+        self.entries = {}
+        self.users = {}
+
+    def machine(self, factory_number):
+        return self.machines.get(factory_number)
+
+    def entry(self, entity, name):
+        return self.entries.get((entity, name))
+
+    def user(self, description):
+        return self.users.get(description)
+
+    def preload_entries(self):
+        """Загружает все элементы справочников одним запросом."""
+        for entry in DictionaryEntry.objects.all():
+            self.entries[(entry.entity, entry.name)] = entry
+
+    def resolve_machines(self, factory_numbers):
+        missing = {number for number in factory_numbers if number not in self.machines}
+
+        for part in chunked(sorted(missing), self.IN_BATCH_SIZE):
+            queryset = Machine.objects.select_related("client").filter(
+                factory_number__in=part,
+            )
+            for machine in queryset:
+                self.machines[machine.factory_number] = machine
+
+    def resolve_entries(self, entity, descriptions):
+        """
+        descriptions - словарь {значение: описание для создаваемого элемента}.
+        Возвращает список созданных значений.
+        """
+        missing = [name for name in descriptions if (entity, name) not in self.entries]
+        self._fetch_entries(entity, missing)
+
+        to_create = [name for name in missing if (entity, name) not in self.entries]
+        if not to_create:
+            return []
+
+        DictionaryEntry.objects.bulk_create(
+            [
+                DictionaryEntry(
+                    entity=entity,
+                    name=name,
+                    description=descriptions[name],
+                )
+                for name in to_create
+            ],
+            batch_size=self.IN_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        self._fetch_entries(entity, to_create)
+        return to_create
+
+    def _fetch_entries(self, entity, names):
+        for part in chunked(names, self.IN_BATCH_SIZE):
+            queryset = DictionaryEntry.objects.filter(entity=entity, name__in=part)
+            for entry in queryset:
+                self.entries[(entity, entry.name)] = entry
+
+    def resolve_users(self, defaults):
+        """
+        defaults - словарь {описание пользователя: поля для создания}.
+        Поля должны содержать username, user_type и group. Пользователи
+        создаются с неиспользуемым паролем и ставятся в очередь
+        PendingCredential (пароли выдаёт команда hash-credentials).
+        Возвращает список созданных пользователей.
+        """
+        missing = [description for description in defaults if description not in self.users]
+        self._fetch_users(missing)
+
+        to_create = [description for description in missing if description not in self.users]
+        if not to_create:
+            return []
+
+        usernames = self._free_usernames(
+            [defaults[description]["username"] for description in to_create],
+        )
+        new_users = []
+        for description, username in zip(to_create, usernames):
+            fields = dict(defaults[description], username=username)
+            new_users.append(CustomUser(
+                user_description=description,
+                password=make_password(None),
+                **fields,
+            ))
+
+        CustomUser.objects.bulk_create(new_users, batch_size=self.IN_BATCH_SIZE)
+        self._fetch_users(to_create)
+
+        created = [self.users[description] for description in to_create]
+        PendingCredential.objects.bulk_create(
+            [PendingCredential(user=user) for user in created],
+            batch_size=self.IN_BATCH_SIZE,
+        )
+        return created
+
+    def _fetch_users(self, descriptions):
+        for part in chunked(descriptions, self.IN_BATCH_SIZE):
+            for user in CustomUser.objects.filter(user_description__in=part):
+                self.users[user.user_description] = user
+
+    def _existing_usernames(self, usernames):
+        existing = set()
+        for part in chunked(usernames, self.IN_BATCH_SIZE):
+            existing.update(
+                CustomUser.objects.filter(username__in=part).values_list("username", flat=True)
+            )
+        return existing
+
+    def _free_usernames(self, usernames):
+        """Подбирает свободные логины, добавляя к занятым числовой суффикс."""
+        taken = self._existing_usernames(usernames)
+        result = list(usernames)
+
+        while True:
+            assigned = set()
+            renamed = []
+            for i, username in enumerate(usernames):
+                candidate = username
+                suffix = 2
+                while candidate in taken or candidate in assigned:
+                    candidate = f"{username}-{suffix}"
+                    suffix += 1
+                assigned.add(candidate)
+                if candidate != username:
+                    renamed.append(candidate)
+                result[i] = candidate
+
+            clashes = self._existing_usernames(renamed)
+            if not clashes:
+                return result
+            taken |= clashes
+
+    @staticmethod
+    def add_to_group(users, group):
+        """Добавляет пользователей в группу (M2M groups) одним запросом на чтение и вставку."""
+        through = CustomUser.groups.through
+        user_ids = {user.pk for user in users}
+        if not user_ids:
+            return []
+
+        existing = set(
+            through.objects.filter(
+                group=group,
+                customuser_id__in=user_ids,
+            ).values_list("customuser_id", flat=True)
+        )
+        added = sorted(user_ids - existing)
+        through.objects.bulk_create(
+            [through(customuser_id=user_id, group=group) for user_id in added],
+        )
+        return added
@@ -0,0 +1,78 @@
+import csv
+import json
+
+from dataclasses import asdict
+
+from django.utils import timezone
+
+
+class RejectReport:
+    """
+    Отчёт об отклонённых строках исходного файла: JSONL (по умолчанию)
+    или CSV, если путь оканчивается на .csv. Файл создаётся только при
+    появлении первой отклонённой строки.
+    """
+    CSV_FIELDS = [
+        "sheet",
+        "row",
+        "reason",
+        "data",
+    ]
+
+    def __init__(self, path, sheet):
+        self.path = path
+        self.sheet = sheet
+        self.count = 0
+        self.is_csv = path.lower().endswith(".csv")
+        self._file = None
+        self._writer = None
+
+    def add(self, row_number, reason, row=None):
+        if self._file is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            if self.is_csv:
+                self._writer = csv.DictWriter(self._file, fieldnames=self.CSV_FIELDS)
+                self._writer.writeheader()
+
+        record = {
+            "sheet": self.sheet,
+            "row": row_number,
+            "reason": reason,
+            "data": row or {},
+        }
+        if self.is_csv:
+            record["data"] = json.dumps(record["data"], ensure_ascii=False, default=str)
+            self._writer.writerow(record)
+        else:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str))
+            self._file.write("\n")
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def append_summary(path, command, sheet, source, stats, dry_run=False, rejects=None, profiler=None):
+    """Дописывает в JSONL-файл итог импорта одного листа."""
+    record = {
+        "finished_at": timezone.now().isoformat(),
+        "command": command,
+        "sheet": sheet,
+        "source": source,
+        "dry_run": dry_run,
+        **asdict(stats),
+        "rejects_path": rejects.path if rejects is not None and rejects.count else None,
+        "phases": profiler.as_list() if profiler is not None else [],
+    }
+    with open(path, "a", encoding="utf-8") as file:
+        file.write(json.dumps(record, ensure_ascii=False))
+        file.write("\n")
@@ -0,0 +1,8 @@
+from itertools import islice
+
+
+def chunked(iterable, size):
+    """Разбивает итерируемый объект на списки длиной не более size."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
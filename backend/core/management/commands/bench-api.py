@@ -0,0 +1,198 @@
+"""
+Кастомная команда - python manage.py bench-api
+Сравнивает пропускную способность и задержки эндпоинтов чтения:
+синхронные представления через WSGI-обработчик (пул потоков),
+синхронные и async ORM представления через ASGI-обработчик.
+Запросы выполняются в процессе, без сетевого сервера.
+"""
+
+import asyncio
+import statistics
+import time
+import types
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import include, path
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.urls import build_urlpatterns
+from core.models import Machine
+
+
+MODES = {
+    "wsgi-sync": (Client, False),
+    "asgi-sync": (AsyncClient, False),
+    "asgi-async": (AsyncClient, True),
+}
+
+
+def build_urlconf(async_views):
+    urlconf = types.ModuleType(f"bench_urls_{'async' if async_views else 'sync'}")
+    urlconf.urlpatterns = [
+        path("api/v1/", include(build_urlpatterns(async_views=async_views))),
+    ]
+    return urlconf
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = "Benchmark sync (WSGI) vs async ORM (ASGI) read endpoints"
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--endpoint",
+            type=str,
+            choices=["machine-list", "machine-detail", "machine-search", "dict-entry-list"],
+            default="machine-list",
+        )
+        parser.add_argument(
+            "--user",
+            type=str,
+            help="Username to authenticate as (default: first manager)",
+            default=None,
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=str,
+            help="Comma-separated concurrency levels",
+            default="1,8,32,64",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            help="Requests per mode and concurrency level",
+            default=500,
+        )
+        parser.add_argument(
+            "--modes",
+            type=str,
+            help=f"Comma-separated modes ({', '.join(MODES)})",
+            default=",".join(MODES),
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        user_model = get_user_model()
+        if options["user"]:
+            user = user_model.objects.filter(username=options["user"]).first()
+        else:
+            user = user_model.objects.filter(user_type="manager").first()
+        if user is None:
+            raise CommandError("User not found, pass --user")
+
+        machine = Machine.objects.order_by("pk").first()
+        if machine is None:
+            raise CommandError("No machines in the database, run db-import-all first")
+
+        method, url, data = {
+            "machine-list": ("get", "/api/v1/machines", None),
+            "machine-detail": ("get", f"/api/v1/machines/{machine.pk}", None),
+            "machine-search": ("post", "/api/v1/machines/search", {"factory_number": machine.factory_number}),
+            "dict-entry-list": ("get", "/api/v1/dict-entries", None),
+        }[options["endpoint"]]
+        self.request_args = (method, url, data)
+        self.token = str(AccessToken.for_user(user))
+
+        modes = [mode.strip() for mode in options["modes"].split(",")]
+        for mode in modes:
+            if mode not in MODES:
+                raise CommandError(f"Unknown mode '{mode}'")
+        levels = [int(level) for level in options["concurrency"].split(",")]
+
+        self.stdout.write(
+            f"{options['endpoint']} as {user.username}, {options['requests']} requests per run"
+        )
+        self.stdout.write(
+            f"{'mode':<11} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+        for mode in modes:
+            client_class, async_views = MODES[mode]
+            # Тестовые клиенты всегда обращаются к хосту testserver
+            with override_settings(
+                ROOT_URLCONF=build_urlconf(async_views),
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            ):
+                for level in levels:
+                    run = self.run_async if client_class is AsyncClient else self.run_sync
+                    # Прогрев: импорт модулей, соединение с БД
+                    run(1, level)
+                    elapsed, latencies, errors = run(options["requests"], level)
+                    self.stdout.write(
+                        f"{mode:<11} {level:>5} {len(latencies) / elapsed:>9.0f} "
+                        f"{statistics.median(latencies) * 1000:>8.1f} "
+                        f"{percentile(latencies, 0.99) * 1000:>8.1f} {errors:>7}"
+                    )
+
+    def make_client(self, client_class):
+        client = client_class()
+        client.cookies["access_token"] = self.token
+        return client
+
+    def request_kwargs(self):
+        method, url, data = self.request_args
+        if data is None:
+            return method, url, {}
+        return method, url, {"data": data, "content_type": "application/json"}
+
+    def run_sync(self, total, concurrency):
+        method, url, kwargs = self.request_kwargs()
+        per_worker = [total // concurrency + (worker < total % concurrency) for worker in range(concurrency)]
+
+        def worker(count):
+            client = self.make_client(Client)
+            latencies, errors = [], 0
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = getattr(client, method)(url, **kwargs)
+                    latencies.append(time.perf_counter() - started)
+                    errors += response.status_code != 200
+            finally:
+                connection.close()
+            return latencies, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(worker, per_worker))
+        elapsed = time.perf_counter() - started
+        return elapsed, [value for latencies, _ in results for value in latencies], sum(e for _, e in results)
+
+    def run_async(self, total, concurrency):
+        method, url, kwargs = self.request_kwargs()
+        per_worker = [total // concurrency + (worker < total % concurrency) for worker in range(concurrency)]
+
+        async def worker(count):
+            client = self.make_client(AsyncClient)
+            latencies, errors = [], 0
+            for _ in range(count):
+                started = time.perf_counter()
+                response = await getattr(client, method)(url, **kwargs)
+                latencies.append(time.perf_counter() - started)
+                errors += response.status_code != 200
+            return latencies, errors
+
+        async def main():
+            return await asyncio.gather(*(worker(count) for count in per_worker))
+
+        started = time.perf_counter()
+        results = asyncio.run(main())
+        elapsed = time.perf_counter() - started
+        return elapsed, [value for latencies, _ in results for value in latencies], sum(e for _, e in results)
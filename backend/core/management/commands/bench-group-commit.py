@@ -0,0 +1,142 @@
+"""
+Кастомная команда - python manage.py bench-group-commit
+Сравнивает пропускную способность вставки записей ТО из нескольких
+потоков: отдельная транзакция на запись против групповой фиксации
+(core.writer). Работает на копии базы данных.
+"""
+
+import copy
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from core.models import Maintenance
+from core.writer import GroupCommitWriter
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent maintenance inserts: one transaction per record vs group commit"
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--threads",
+            type=int,
+            help="Concurrent submitting threads",
+            default=16,
+        )
+        parser.add_argument(
+            "--records",
+            type=int,
+            help="Records inserted per mode",
+            default=2000,
+        )
+        parser.add_argument(
+            "--window-ms",
+            type=float,
+            help="Group commit collection window",
+            default=settings.GROUP_COMMIT_WINDOW_MS,
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        if connection.vendor != "sqlite":
+            raise CommandError("Default database is not SQLite")
+
+        template = Maintenance.objects.select_related("machine").order_by("pk").first()
+        if template is None:
+            raise CommandError("No maintenance records in the database, run db-import-all first")
+
+        self.stdout.write(f"{options['threads']} threads, {options['records']} records per mode")
+        self.stdout.write(
+            f"{'mode':<7} {'records/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        )
+
+        db_settings = settings.DATABASES["default"]
+        source = db_settings["NAME"]
+        connection.close()
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode in ("direct", "group"):
+                path = os.path.join(tmp, f"{mode}.sqlite3")
+                src, dst = sqlite3.connect(source), sqlite3.connect(path)
+                src.backup(dst)
+                src.close()
+                dst.close()
+
+                # Соединения всех потоков открываются к копии
+                db_settings["NAME"] = path
+                try:
+                    elapsed, latencies, errors = self.run(mode, template, options)
+                finally:
+                    connections.close_all()
+                    db_settings["NAME"] = source
+
+                self.stdout.write(
+                    f"{mode:<7} {len(latencies) / elapsed:>10.0f} "
+                    f"{statistics.median(latencies) * 1000:>8.1f} "
+                    f"{percentile(latencies, 0.99) * 1000:>8.1f} {errors:>7}"
+                )
+
+    def run(self, mode, template, options):
+        writer = None
+        if mode == "group":
+            writer = GroupCommitWriter(
+                window=options["window_ms"] / 1000,
+                max_batch=settings.GROUP_COMMIT_MAX_BATCH,
+            )
+
+        def worker(count):
+            latencies, errors = [], 0
+            try:
+                for _ in range(count):
+                    instance = copy.copy(template)
+                    instance.pk = None
+                    instance._state = copy.copy(template._state)
+                    instance._state.adding = True
+                    started = time.perf_counter()
+                    try:
+                        if writer is None:
+                            instance.save()
+                        else:
+                            writer.submit(instance).result()
+                    except Exception:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            return latencies, errors
+
+        threads = options["threads"]
+        total = options["records"]
+        per_worker = [total // threads + (worker < total % threads) for worker in range(threads)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(worker, per_worker))
+        elapsed = time.perf_counter() - started
+        if writer is not None:
+            writer.close()
+
+        return (
+            elapsed,
+            [value for latencies, _ in results for value in latencies],
+            sum(errors for _, errors in results),
+        )
@@ -0,0 +1,161 @@
+"""
+Кастомная команда - python manage.py bench-import-formats
+Сравнивает скорость чтения и разбора одного и того же листа
+в форматах xlsx, csv, ndjson и parquet.
+"""
+
+import csv
+import json
+import os
+import tempfile
+import time
+
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import (
+    ClaimImporter,
+    MachineImporter,
+    MaintenanceImporter,
+    ReferenceIndex,
+    RejectReport,
+    SheetReader,
+    get_reader,
+)
+from core.importers.base import RowRejected
+from core.importers.command import DEFAULT_IMPORT_FILE
+
+
+IMPORTERS = {
+    importer_class.sheet_name: importer_class
+    for importer_class in (MachineImporter, MaintenanceImporter, ClaimImporter)
+}
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Unsupported value {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Benchmark import parsing speed of xlsx, csv, ndjson and parquet"
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--file",
+            type=str,
+            help="Source Excel file full path",
+            default=DEFAULT_IMPORT_FILE,
+        )
+        parser.add_argument(
+            "--sheet",
+            type=str,
+            choices=sorted(IMPORTERS),
+            default="claims",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            help="Repeat sheet rows N times to get a bigger dataset",
+            default=1000,
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        if not os.path.exists(options["file"]):
+            raise CommandError(f"File not found: {options['file']}")
+
+        importer_class = IMPORTERS[options["sheet"]]
+        rows = [
+            row
+            for chunk in SheetReader(options["file"], options["sheet"], importer_class.header_row)
+            for _, row in chunk
+        ]
+        if not rows:
+            raise CommandError(f"Sheet {options['sheet']} is empty")
+        rows = rows * options["repeat"]
+        columns = list(rows[0])
+
+        with tempfile.TemporaryDirectory() as directory:
+            files = {
+                "xlsx": self._write_xlsx(directory, options["sheet"], columns, rows),
+                "csv": self._write_csv(directory, columns, rows),
+                "ndjson": self._write_ndjson(directory, rows),
+            }
+            try:
+                files["parquet"] = self._write_parquet(directory, rows)
+            except ImportError:
+                self.stderr.write("pyarrow is not installed, skipping parquet")
+
+            self.stdout.write(f"{len(rows)} rows of sheet {options['sheet']}")
+            self.stdout.write(f"{'format':<8} {'size, KB':>10} {'seconds':>9} {'rows/s':>10}")
+            for name, path in files.items():
+                elapsed = self._parse(importer_class, path, options["sheet"])
+                self.stdout.write(
+                    f"{name:<8} {os.path.getsize(path) // 1024:>10} "
+                    f"{elapsed:>9.2f} {len(rows) / elapsed:>10.0f}"
+                )
+
+    def _parse(self, importer_class, path, sheet_name):
+        """Время потокового чтения файла и разбора всех строк импортёром."""
+        with RejectReport(os.devnull, sheet=sheet_name) as rejects:
+            importer = importer_class(ReferenceIndex(), rejects)
+
+            started = time.perf_counter()
+            for chunk in get_reader(path, sheet_name, header_row=importer_class.header_row):
+                for row_number, row in chunk:
+                    try:
+                        importer.parse_row(row_number, row)
+                    except RowRejected:
+                        pass
+            return time.perf_counter() - started
+
+    def _write_xlsx(self, directory, sheet_name, columns, rows):
+        from openpyxl import Workbook
+
+        path = os.path.join(directory, "data.xlsx")
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(sheet_name)
+        importer_class = IMPORTERS[sheet_name]
+        for _ in range(importer_class.header_row - 1):
+            sheet.append([])
+        sheet.append(columns)
+        for row in rows:
+            sheet.append([row[column] for column in columns])
+        workbook.save(path)
+        return path
+
+    def _write_csv(self, directory, columns, rows):
+        path = os.path.join(directory, "data.csv")
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow([
+                    _json_default(value) if isinstance(value, (date, datetime)) else value
+                    for value in row.values()
+                ])
+        return path
+
+    def _write_ndjson(self, directory, rows):
+        path = os.path.join(directory, "data.ndjson")
+        with open(path, "w", encoding="utf-8") as file:
+            for row in rows:
+                file.write(json.dumps(row, ensure_ascii=False, default=_json_default))
+                file.write("\n")
+        return path
+
+    def _write_parquet(self, directory, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        path = os.path.join(directory, "data.parquet")
+        pq.write_table(pa.Table.from_pylist(rows), path)
+        return path
@@ -0,0 +1,183 @@
+"""
+Кастомная команда - python manage.py bench-sqlite
+Сравнивает пропускную способность SQLite при одновременных чтении
+списка машин и обновлении машин: настройки по умолчанию против
+профиля из settings.SQLITE_PRAGMAS. Работает на копиях базы данных.
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api.components import get_machine_queryset
+from core.models import Machine
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = "Benchmark concurrent SQLite reads/writes with default settings vs the SQLite profile"
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--readers",
+            type=int,
+            help="Reader threads (machine list query)",
+            default=8,
+        )
+        parser.add_argument(
+            "--writers",
+            type=int,
+            help="Writer threads (machine update)",
+            default=2,
+        )
+        parser.add_argument(
+            "--seconds",
+            type=float,
+            help="Duration of each run",
+            default=5.0,
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        if connection.vendor != "sqlite":
+            raise CommandError("Default database is not SQLite")
+
+        user = get_user_model().objects.filter(user_type="manager").first()
+        if user is None:
+            raise CommandError("No manager user, the list query needs one")
+        machine_ids = list(Machine.objects.values_list("pk", flat=True))
+        if not machine_ids:
+            raise CommandError("No machines in the database, run db-import-all first")
+
+        read_sql, read_params = get_machine_queryset(user).query.sql_with_params()
+        self.read_query = (read_sql, read_params)
+        self.machine_ids = machine_ids
+
+        connection.close()
+        source = settings.DATABASES["default"]["NAME"]
+        profiles = {
+            # Как у Django без OPTIONS: журнал DELETE, ожидание блокировки 5 с
+            "default": ("DEFERRED", {"journal_mode": "DELETE"}),
+            "profile": (
+                settings.DATABASES["default"]["OPTIONS"].get("transaction_mode") or "DEFERRED",
+                settings.SQLITE_PRAGMAS,
+            ),
+        }
+
+        self.stdout.write(
+            f"{options['readers']} readers, {options['writers']} writers, "
+            f"{options['seconds']:g} s per run"
+        )
+        self.stdout.write(
+            f"{'profile':<8} {'reads/s':>8} {'writes/s':>9} {'read p99 ms':>12} "
+            f"{'write p99 ms':>13} {'locked':>7}"
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, (transaction_mode, pragmas) in profiles.items():
+                path = os.path.join(tmp, f"{name}.sqlite3")
+                # backup, а не копирование файла: учитывает содержимое WAL
+                src, dst = sqlite3.connect(source), sqlite3.connect(path)
+                src.backup(dst)
+                # Режим журнала хранится в файле, его меняют один раз
+                dst.execute(f"PRAGMA journal_mode={pragmas['journal_mode']}")
+                src.close()
+                dst.close()
+                result = self.run(path, transaction_mode, pragmas, options)
+                self.stdout.write(
+                    f"{name:<8} {result['reads'] / options['seconds']:>8.0f} "
+                    f"{result['writes'] / options['seconds']:>9.0f} "
+                    f"{result['read_p99'] * 1000:>12.1f} "
+                    f"{result['write_p99'] * 1000:>13.1f} {result['locked']:>7}"
+                )
+
+    def connect(self, path, pragmas):
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        for pragma, value in pragmas.items():
+            if pragma != "journal_mode":
+                conn.execute(f"PRAGMA {pragma}={value}")
+        return conn
+
+    def run(self, path, transaction_mode, pragmas, options):
+        stop = threading.Event()
+        lock = threading.Lock()
+        result = {"reads": 0, "writes": 0, "locked": 0}
+        read_latencies, write_latencies = [], []
+
+        def reader():
+            conn = self.connect(path, pragmas)
+            latencies, locked = [], 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute(*self.read_query).fetchall()
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+                    locked += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+            conn.close()
+            with lock:
+                result["reads"] += len(latencies)
+                result["locked"] += locked
+                read_latencies.extend(latencies)
+
+        def writer():
+            conn = self.connect(path, pragmas)
+            latencies, locked = [], 0
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute(f"BEGIN {transaction_mode}")
+                    conn.execute(
+                        "UPDATE core_machine SET delivery_address = ?, version = version + 1 "
+                        "WHERE id = ?",
+                        (f"bench {started}", random.choice(self.machine_ids)),
+                    )
+                    conn.execute("COMMIT")
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    locked += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+            conn.close()
+            with lock:
+                result["writes"] += len(latencies)
+                result["locked"] += locked
+                write_latencies.extend(latencies)
+
+        threads = [
+            *(threading.Thread(target=reader) for _ in range(options["readers"])),
+            *(threading.Thread(target=writer) for _ in range(options["writers"])),
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options["seconds"])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        result["read_p99"] = percentile(read_latencies, 0.99) if read_latencies else 0
+        result["write_p99"] = percentile(write_latencies, 0.99) if write_latencies else 0
+        return result
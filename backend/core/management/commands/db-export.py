@@ -0,0 +1,99 @@
+"""
+Кастомная команда - python manage.py db-export
+Выгружает машины, ТО и рекламации в формате листов basic_data.xlsx:
+xlsx (все листы, режим write-only) или csv/ndjson (один лист).
+"""
+
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.exporters import (
+    EXPORTERS,
+    STREAM_FORMATS,
+    write_stream,
+    write_xlsx,
+)
+
+
+class Command(BaseCommand):
+    help = "Export machines, maintenances and claims in the basic_data.xlsx layout"
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--file",
+            type=str,
+            help=f"Output file (xlsx, {', '.join(STREAM_FORMATS)})",
+            default="silant-export.xlsx",
+        )
+        parser.add_argument(
+            "--sheet",
+            type=str,
+            choices=list(EXPORTERS),
+            help="Sheet to export (required for csv/ndjson, default for xlsx: all sheets)",
+            default=None,
+        )
+        parser.add_argument(
+            "--user",
+            type=str,
+            help="Export only data visible to this username",
+            default=None,
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Rows fetched from the database per cursor chunk",
+            default=2000,
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        path = options["file"]
+        file_format = os.path.splitext(path)[1].lower().lstrip(".")
+        if file_format != "xlsx" and file_format not in STREAM_FORMATS:
+            raise CommandError(
+                f"Unsupported file format '{file_format}'. "
+                f"Supported: xlsx, {', '.join(STREAM_FORMATS)}"
+            )
+
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.select_related("group").get(
+                    username=options["user"],
+                )
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User '{options['user']}' not found")
+
+        sheets = [options["sheet"]] if options["sheet"] else list(EXPORTERS)
+        if file_format != "xlsx" and len(sheets) > 1:
+            raise CommandError(f"Exporting to {file_format} requires --sheet")
+
+        exporters = [
+            EXPORTERS[sheet](user=user, chunk_size=options["chunk_size"])
+            for sheet in sheets
+        ]
+
+        started = time.perf_counter()
+        try:
+            if file_format == "xlsx":
+                write_xlsx(path, exporters)
+            else:
+                write_stream(path, exporters[0], file_format)
+        except OSError as e:
+            raise CommandError(f"Cannot write export file: {e}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {', '.join(sheets)} to {path} "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+        )
@@ -0,0 +1,188 @@
+"""
+Кастомная команда - python manage.py db-import-all
+Импортирует машины, ТО и рекламации за один проход: листы разбираются
+параллельно в отдельных процессах, затем данные загружаются в порядке
+зависимостей с общим индексом связанных объектов.
+"""
+
+import os
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.importers import (
+    IMPORTERS,
+    IMPORTERS_BY_SHEET,
+    ImportProfiler,
+    ReferenceIndex,
+    RejectReport,
+    append_summary,
+    parse_in_parallel,
+)
+from core.importers.command import (
+    DEFAULT_IMPORT_FILE,
+    add_report_arguments,
+    get_importer_kwargs,
+)
+from core.models import PendingCredential
+
+
+class Command(BaseCommand):
+    help = "Import machines, maintenances and claims in one pass"
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--file",
+            type=str,
+            help="Excel file with machines, maintenances and claims sheets",
+            default=DEFAULT_IMPORT_FILE,
+        )
+        for importer_class in IMPORTERS:
+            parser.add_argument(
+                f"--{importer_class.sheet_name}-file",
+                type=str,
+                help=f"Separate source file for {importer_class.sheet_name} (overrides --file)",
+                default=None,
+            )
+        parser.add_argument(
+            "--rejects-dir",
+            type=str,
+            help="Directory for JSONL reports of rejected rows (default: next to source files)",
+            default=None,
+        )
+        add_report_arguments(parser)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Parsing processes (default: one per sheet)",
+            default=None,
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        sources = {}
+        for importer_class in IMPORTERS:
+            path = options[f"{importer_class.sheet_name}_file"] or options["file"]
+            if not os.path.exists(path):
+                raise CommandError(f"File not found: {path}")
+            sources[importer_class] = path
+
+        dry_run = options["dry_run"]
+        summary_path = options["summary"] or (
+            f"{os.path.splitext(options['file'])[0]}-import-summary.jsonl"
+        )
+        profiler = ImportProfiler(detailed=options["profile"])
+        verbose_stdout = self.stdout if options["verbosity"] > 1 else None
+
+        with profiler:
+            with profiler.phase("total"):
+                results = self._import(sources, options, profiler, verbose_stdout)
+
+        for sheet_name, stats, rejects in results:
+            append_summary(
+                summary_path,
+                command="db-import-all",
+                sheet=sheet_name,
+                source=sources[IMPORTERS_BY_SHEET[sheet_name]],
+                stats=stats,
+                dry_run=dry_run,
+                rejects=rejects,
+                profiler=profiler,
+            )
+            self.stdout.write(
+                f"{sheet_name}: created {stats.created}, updated {stats.updated}, "
+                f"unchanged {stats.unchanged}, rejected {stats.rejected}"
+            )
+            if stats.rejected:
+                self.stderr.write(f"Rejected rows written to {rejects.path}")
+
+        profiler.write_report(self.stdout)
+        self.stdout.write(f"Summary appended to {summary_path}")
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS("Dry run completed, all changes rolled back."))
+            return
+
+        if PendingCredential.objects.exists():
+            self.stdout.write(
+                "New accounts are waiting for passwords: run 'python manage.py hash-credentials'"
+            )
+        self.stdout.write(self.style.SUCCESS("Import completed successfully!"))
+
+    def _import(self, sources, options, profiler, verbose_stdout):
+        batch_size = options["batch_size"]
+
+        self.stdout.write("Parsing sheets...")
+        with profiler.phase("parse") as phase:
+            try:
+                parsed = parse_in_parallel(sources, batch_size, workers=options["workers"])
+            except Exception as e:
+                raise CommandError(f"Parsing failed: {e}")
+            phase["rows"] = sum(
+                sum(len(chunk) for chunk in chunks) + len(rejected)
+                for chunks, rejected, _ in parsed.values()
+            )
+        for importer_class, (_, _, elapsed) in parsed.items():
+            self.stdout.write(f"  {importer_class.sheet_name}: parsed in {elapsed:.2f}s")
+
+        with profiler.phase("index"):
+            index = ReferenceIndex()
+            index.preload_entries()
+            index.resolve_machines({
+                data["factory_number"]
+                for chunks, _, _ in parsed.values()
+                for chunk in chunks
+                for _, _, data, _, _ in chunk
+            })
+
+        importer_kwargs = get_importer_kwargs()
+
+        results = []
+        try:
+            with ExitStack() as stack, transaction.atomic():
+                for importer_class in IMPORTERS:
+                    sheet_name = importer_class.sheet_name
+                    rejects = stack.enter_context(RejectReport(
+                        self._rejects_path(sources[importer_class], sheet_name, options["rejects_dir"]),
+                        sheet=sheet_name,
+                    ))
+                    importer = importer_class(
+                        index,
+                        rejects,
+                        batch_size=batch_size,
+                        stdout=verbose_stdout,
+                        **importer_kwargs[importer_class],
+                    )
+
+                    chunks, rejected, _ = parsed[importer_class]
+                    for row_number, reason, row in rejected:
+                        importer.reject(row_number, reason, row)
+
+                    self.stdout.write(f"Loading {sheet_name}...")
+                    with profiler.phase(sheet_name, rows=sum(len(chunk) for chunk in chunks)):
+                        for chunk in chunks:
+                            importer.load_chunk(chunk)
+                    results.append((sheet_name, importer.stats, rejects))
+
+                if options["dry_run"]:
+                    transaction.set_rollback(True)
+        except CommandError:
+            raise
+        except Exception as e:
+            raise CommandError(f"Import failed: {e}")
+
+        return results
+
+    @staticmethod
+    def _rejects_path(source_path, sheet_name, rejects_dir):
+        base_path = os.path.splitext(source_path)[0]
+        if rejects_dir:
+            base_path = os.path.join(rejects_dir, os.path.basename(base_path))
+        return f"{base_path}-{sheet_name}-rejects.jsonl"
@@ -0,0 +1,80 @@
+"""
+Кастомная команда - python manage.py hash-credentials
+Генерирует пароли для пользователей, созданных командами db-import-*,
+хэширует их в пуле процессов и выгружает выданные учётные данные в CSV.
+"""
+
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.credentials import hash_pending_credentials
+from core.models import PendingCredential
+
+
+class Command(BaseCommand):
+    help = "Generate and hash passwords for imported accounts queued for credentials"
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="CSV file to append generated credentials to",
+            default="generated-credentials.csv",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Hashing processes (default: CPU count)",
+            default=None,
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Accounts per bulk update",
+            default=200,
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        if not PendingCredential.objects.exists():
+            self.stdout.write("No accounts waiting for credentials")
+            return
+
+        # Дописываем в файл, чтобы не потерять пароли, выданные ранее
+        is_new_file = not os.path.exists(options["output"]) or not os.path.getsize(options["output"])
+        try:
+            # Файл с паролями в открытом виде доступен только владельцу
+            fd = os.open(options["output"], os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            if hasattr(os, "fchmod"):
+                os.fchmod(fd, 0o600)
+            with open(fd, "a", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                if is_new_file:
+                    writer.writerow(["username", "user_description", "password"])
+
+                def write_batch(credentials):
+                    for user, password in credentials:
+                        writer.writerow([user.username, user.user_description, password])
+                    file.flush()
+
+                processed = hash_pending_credentials(
+                    batch_size=options["batch_size"],
+                    workers=options["workers"],
+                    on_batch=write_batch,
+                )
+        except OSError as e:
+            raise CommandError(f"Cannot write credentials file: {e}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated passwords for {processed} accounts, written to {options['output']}"
+            )
+        )
@@ -0,0 +1,21 @@
+"""
+Кастомная команда - python manage.py purge-idempotency-keys
+Удаляет сохранённые ответы по ключам Idempotency-Key старше
+settings.IDEMPOTENCY_KEY_TTL.
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL"
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        deleted = purge_expired()
+        self.stdout.write(f"Deleted {deleted} expired idempotency records")
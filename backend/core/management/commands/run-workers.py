@@ -0,0 +1,173 @@
+"""
+Кастомная команда - python manage.py run-workers
+Запускает пул воркеров (потоков или процессов), выполняющих задания
+импорта (загрузка файлов через API) и фоновые задачи из очередей в БД,
+и планировщик периодических задач из settings.TASK_SCHEDULE. Несколько
+процессов run-workers могут работать с одними очередями. Импорты
+выполняются по одному (claim_job).
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.importers.jobs import requeue_stale
+from core.tasks import (
+    autodiscover,
+    get_schedules,
+    get_task,
+    requeue_stale_tasks,
+    run_due_schedules,
+)
+from core.workers import Worker, run_process
+
+
+class Command(BaseCommand):
+    help = "Run a pool of workers executing queued import jobs and background tasks, plus the task scheduler"
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Workers in the pool",
+            default=2,
+        )
+        parser.add_argument(
+            "--pool",
+            choices=["thread", "process"],
+            help="Run workers as threads or as separate processes",
+            default="thread",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            help="Seconds between queue polls when it is empty",
+            default=1.0,
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Rows per chunk and bulk insert for import jobs",
+            default=500,
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Enqueue due scheduled tasks, then exit once the queues are empty",
+        )
+        parser.add_argument(
+            "--no-scheduler",
+            action="store_true",
+            help="Do not enqueue periodic tasks from TASK_SCHEDULE in this process",
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        autodiscover()
+        schedules = {} if options["no_scheduler"] else self.check_schedules()
+
+        self.requeue()
+        self.schedule(schedules)
+
+        worker_options = {
+            "poll_interval": options["poll_interval"],
+            "batch_size": options["batch_size"],
+            "burst": options["burst"],
+        }
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        if options["pool"] == "process":
+            stop = multiprocessing.Event()
+            # Дочерние процессы не должны унаследовать открытые соединения
+            connections.close_all()
+            workers = [
+                multiprocessing.Process(
+                    target=run_process,
+                    args=(f"{prefix}:{number}", stop, worker_options),
+                    name=f"worker-{number}",
+                )
+                for number in range(1, options["workers"] + 1)
+            ]
+        else:
+            stop = threading.Event()
+            workers = [
+                threading.Thread(
+                    target=Worker(
+                        f"{prefix}:{number}",
+                        stop,
+                        stdout=self.stdout,
+                        stderr=self.stderr,
+                        **worker_options,
+                    ).run,
+                    name=f"worker-{number}",
+                )
+                for number in range(1, options["workers"] + 1)
+            ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(
+            f"Started {len(workers)} {options['pool']} worker(s), "
+            f"{len(schedules)} schedule(s), waiting for jobs..."
+        )
+
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        # Задание остановленного воркера иначе занимало бы очередь
+        requeue_interval = max(min(settings.IMPORT_JOB_STALE_AFTER, settings.TASK_STALE_AFTER) / 4, 1)
+        next_requeue = time.monotonic() + requeue_interval
+        try:
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(1)
+                if stop.is_set() or options["burst"]:
+                    continue
+                self.schedule(schedules)
+                if time.monotonic() >= next_requeue:
+                    self.requeue()
+                    next_requeue = time.monotonic() + requeue_interval
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping: finishing running jobs...")
+            stop.set()
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
+
+    def check_schedules(self):
+        try:
+            schedules = get_schedules()
+            for task_name, *_ in schedules.values():
+                get_task(task_name)
+        except (KeyError, LookupError, ValueError) as e:
+            raise CommandError(f"Invalid TASK_SCHEDULE: {e}")
+        return schedules
+
+    def schedule(self, schedules):
+        if not schedules:
+            return
+        enqueued = run_due_schedules(schedules)
+        for task in enqueued:
+            self.stdout.write(f"Scheduled task {task.pk} {task.name} ({task.schedule})")
+
+    def requeue(self):
+        jobs = requeue_stale()
+        tasks = requeue_stale_tasks()
+        if jobs:
+            self.stdout.write(
+                f"Requeued {jobs} import job(s) without progress for "
+                f"{settings.IMPORT_JOB_STALE_AFTER} s"
+            )
+        if tasks:
+            self.stdout.write(
+                f"Recovered {tasks} task(s) without worker heartbeat for {settings.TASK_STALE_AFTER} s"
+            )
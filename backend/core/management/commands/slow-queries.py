@@ -0,0 +1,166 @@
+"""
+Кастомная команда - python manage.py slow-queries
+Сводка лога медленных запросов (api.slow_queries) по отпечаткам SQL:
+число запросов, p95, максимальное и суммарное время, маршруты, место
+вызова и последний снятый план EXPLAIN QUERY PLAN. Полные просмотры
+таблиц и сортировки без индекса в плане отмечаются - это кандидаты на
+новый индекс.
+"""
+
+import json
+import os
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.slow_queries import normalize_sql
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def log_files(path):
+    """Файлы лога от старых к новым: path.N, ..., path.1, path."""
+    rotated = []
+    directory, name = os.path.split(path)
+    if not os.path.isdir(directory or "."):
+        return []
+    for file_name in os.listdir(directory or "."):
+        suffix = file_name.removeprefix(f"{name}.")
+        if file_name != suffix and suffix.isdigit():
+            rotated.append((int(suffix), os.path.join(directory, file_name)))
+    files = [file_path for _, file_path in sorted(rotated, reverse=True)]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def plan_warning(line):
+    detail = line.strip()
+    # "SCAN t" - полный просмотр таблицы; "SCAN t USING INDEX" - по индексу
+    if re.match(r"SCAN (TABLE )?\S+$", detail):
+        return "full table scan"
+    if detail.startswith("USE TEMP B-TREE"):
+        return "sort without index"
+    return None
+
+
+class Command(BaseCommand):
+    help = "Summarize the slow query log by SQL fingerprint with query plans"
+
+    def add_arguments(
+        self,
+        parser,
+    ) -> None:
+        parser.add_argument(
+            "--limit",
+            type=int,
+            help="Fingerprints to show",
+            default=20,
+        )
+        parser.add_argument(
+            "--sort",
+            choices=["total", "count", "p95", "max"],
+            help="Order fingerprints by total time, count, p95 or max duration",
+            default="total",
+        )
+        parser.add_argument(
+            "--full-sql",
+            action="store_true",
+            help="Print whole normalized SQL instead of the first 300 characters",
+        )
+        parser.add_argument(
+            "--log",
+            help="Slow query log path (SLOW_QUERY_LOG by default)",
+            default=None,
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        path = str(options["log"] or settings.SLOW_QUERY_LOG)
+        groups = {}
+        broken = 0
+        for file_path in log_files(path):
+            with open(file_path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Строка, оборванная при ротации
+                        broken += 1
+                        continue
+                    group = groups.setdefault(record["fingerprint"], {
+                        "durations": [],
+                        "views": set(),
+                        "frames": set(),
+                        "sql": record["sql"],
+                        "plan": None,
+                    })
+                    group["durations"].append(record["duration_ms"])
+                    if record.get("view"):
+                        group["views"].add(record["view"])
+                    if record.get("frame"):
+                        group["frames"].add(record["frame"])
+                    if record.get("plan"):
+                        group["plan"] = (record["time"], record["plan"])
+
+        if not groups:
+            self.stdout.write(f"No slow queries logged in {path}")
+            return
+
+        for group in groups.values():
+            durations = group["durations"]
+            group["count"] = len(durations)
+            group["total"] = sum(durations)
+            group["max"] = max(durations)
+            group["p95"] = percentile(durations, 0.95)
+        ordered = sorted(groups.items(), key=lambda item: item[1][options["sort"]], reverse=True)
+        shown = ordered[:options["limit"]]
+
+        self.stdout.write(
+            f"{'fingerprint':<13} {'count':>6} {'p95 ms':>9} {'max ms':>9} {'total ms':>10}  views"
+        )
+        for key, group in shown:
+            self.stdout.write(
+                f"{key:<13} {group['count']:>6} {group['p95']:>9.1f} {group['max']:>9.1f} "
+                f"{group['total']:>10.1f}  {', '.join(sorted(group['views'])) or '-'}"
+            )
+
+        scans = {}
+        for key, group in shown:
+            self.stdout.write("")
+            sql = normalize_sql(group["sql"])
+            if not options["full_sql"] and len(sql) > 300:
+                sql = f"{sql[:300]}..."
+            self.stdout.write(self.style.MIGRATE_HEADING(f"[{key}] {sql}"))
+            for frame in sorted(group["frames"]):
+                self.stdout.write(f"  at {frame}")
+            if group["plan"] is None:
+                self.stdout.write("  plan: not captured")
+                continue
+            captured, plan = group["plan"]
+            self.stdout.write(f"  plan ({captured}):")
+            for line in plan:
+                warning = plan_warning(line)
+                if warning is None:
+                    self.stdout.write(f"    {line}")
+                    continue
+                self.stdout.write(self.style.WARNING(f"    {line}  <- {warning}"))
+                if warning == "full table scan":
+                    table = line.split()[-1]
+                    scans[table] = scans.get(table, 0) + group["count"]
+
+        if scans:
+            self.stdout.write("")
+            self.stdout.write(self.style.WARNING(
+                "Full table scans (consider an index): "
+                + ", ".join(f"{table} ({count} queries)" for table, count in sorted(scans.items()))
+            ))
+        if broken:
+            self.stdout.write(f"Skipped {broken} malformed log line(s)")
@@ -0,0 +1,60 @@
+"""
+Кастомная команда - python manage.py task-stats
+Выводит метрики фоновых задач (core.tasks): число попыток, ошибок и
+повторов, среднее, максимальное и p95 время выполнения, размер очереди.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+
+from core.models import Task, TaskStat
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = "Show background task runtime metrics and queue sizes"
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        queues = {
+            row["name"]: row
+            for row in Task.objects.values("name").annotate(
+                queued=Count("pk", filter=Q(status="queued")),
+                running=Count("pk", filter=Q(status="running")),
+                failed=Count("pk", filter=Q(status="failed")),
+            )
+        }
+        # p95 - по задачам, ещё не удалённым purge_finished_tasks
+        durations = {}
+        for name, duration in Task.objects.filter(duration__isnull=False).values_list("name", "duration"):
+            durations.setdefault(name, []).append(duration)
+
+        stats = {stat.name: stat for stat in TaskStat.objects.all()}
+        names = sorted(set(stats) | set(queues))
+        if not names:
+            self.stdout.write("No background tasks have been queued yet")
+            return
+
+        self.stdout.write(
+            f"{'task':<45} {'runs':>6} {'fail':>5} {'retry':>6} {'avg s':>8} {'p95 s':>8} "
+            f"{'max s':>8} {'queued':>7} {'running':>8} {'failed':>7}  last run"
+        )
+        for name in names:
+            stat = stats.get(name) or TaskStat(name=name)
+            queue = queues.get(name, {})
+            average = stat.total_duration / stat.runs if stat.runs else 0
+            p95 = percentile(durations[name], 0.95) if name in durations else 0
+            last_run = stat.last_finished_at.isoformat(timespec="seconds") if stat.last_finished_at else "-"
+            self.stdout.write(
+                f"{name:<45} {stat.runs:>6} {stat.failures:>5} {stat.retries:>6} "
+                f"{average:>8.3f} {p95:>8.3f} {stat.max_duration:>8.3f} "
+                f"{queue.get('queued', 0):>7} {queue.get('running', 0):>8} "
+                f"{queue.get('failed', 0):>7}  {last_run}"
+            )
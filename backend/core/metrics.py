@@ -0,0 +1,389 @@
+"""
+Метрики в текстовом формате Prometheus, общие для всех процессов
+сервера (воркеров gunicorn, run-workers). Каждый процесс пишет значения
+в свой файл в METRICS_DIR, отображённый в память (mmap); эндпоинт
+/metrics суммирует файлы всех процессов. Поддерживаются счётчики и
+гистограммы: значения завершившихся процессов продолжают учитываться -
+при чтении их файлы переносятся в общий файл metrics-merged.db и
+удаляются (merge_dead_processes), поэтому число файлов не растёт с
+каждым перезапуском воркера.
+"""
+
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: без блокировок каталога файлы процессов не объединяются
+    fcntl = None
+
+
+_HEADER = struct.Struct("<Q")
+_KEY_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+_INITIAL_SIZE = 64 * 1024
+
+MERGED_FILE = "metrics-merged.db"
+
+
+def _iter_entries(data, used):
+    """(ключ, смещение значения) записей файла до used байт."""
+    position = _HEADER.size
+    while position < used:
+        (length,) = _KEY_LENGTH.unpack_from(data, position)
+        key_start = position + _KEY_LENGTH.size
+        value_position = position + _padded(_KEY_LENGTH.size + length)
+        yield bytes(data[key_start:key_start + length]).decode(), value_position
+        position = value_position + _VALUE.size
+
+
+def _padded(size):
+    # Значения выравниваются по 8 байт
+    return (size + 7) // 8 * 8
+
+
+class MmapValues:
+    """
+    Файл значений одного процесса: заголовок с числом занятых байт и
+    записи (длина ключа, ключ, float64). Заголовок обновляется после
+    записи новой строки, поэтому читатель из другого процесса видит
+    только полностью записанные записи.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, "a+b")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+            size = _INITIAL_SIZE
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        self._positions = dict(_iter_entries(self._mmap, self._used))
+
+    def inc(self, key, amount):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._append(key)
+            (value,) = _VALUE.unpack_from(self._mmap, position)
+            _VALUE.pack_into(self._mmap, position, value + amount)
+
+    def _append(self, key):
+        encoded = key.encode()
+        value_position = self._used + _padded(_KEY_LENGTH.size + len(encoded))
+        end = value_position + _VALUE.size
+        if end > len(self._mmap):
+            self._grow(end)
+
+        _KEY_LENGTH.pack_into(self._mmap, self._used, len(encoded))
+        key_start = self._used + _KEY_LENGTH.size
+        self._mmap[key_start:key_start + len(encoded)] = encoded
+        _VALUE.pack_into(self._mmap, value_position, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._mmap, 0, self._used)
+        self._positions[key] = value_position
+        return value_position
+
+    def _grow(self, needed):
+        size = len(self._mmap)
+        while size < needed:
+            size *= 2
+        self._mmap.close()
+        self._file.truncate(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+
+    def close(self):
+        self._mmap.close()
+        self._file.close()
+
+
+def get_metrics_dir():
+    return str(settings.METRICS_DIR)
+
+
+_values = None
+_values_pid = None
+_values_lock = threading.Lock()
+
+
+def get_values():
+    """Файл значений текущего процесса (после fork открывается свой)."""
+    global _values, _values_pid
+    with _values_lock:
+        if _values is None or _values_pid != os.getpid():
+            directory = get_metrics_dir()
+            os.makedirs(directory, exist_ok=True)
+            _values = MmapValues(os.path.join(directory, f"metrics-{os.getpid()}.db"))
+            _values_pid = os.getpid()
+        return _values
+
+
+def _sample_key(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+def _read_file(path):
+    """[(ключ, значение)] файла процесса; None, если файла уже нет."""
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < _HEADER.size:
+        return []
+    (used,) = _HEADER.unpack_from(data, 0)
+    return [
+        (key, _VALUE.unpack_from(data, position)[0])
+        for key, position in _iter_entries(data, min(used, len(data)))
+    ]
+
+
+@contextmanager
+def _locked(directory, operation):
+    """Блокировка каталога: объединение файлов - исключительная, чтение - общая."""
+    if fcntl is None or not os.path.isdir(directory):
+        yield
+        return
+    with open(os.path.join(directory, "metrics.lock"), "a") as lock:
+        fcntl.flock(lock, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс существует, но принадлежит другому пользователю
+        return True
+    return True
+
+
+def _dead_process_files(directory):
+    dead = []
+    for path in glob.glob(os.path.join(directory, "metrics-*.db")):
+        pid = os.path.basename(path).removeprefix("metrics-").removesuffix(".db")
+        if pid.isdigit() and int(pid) != os.getpid() and not _is_alive(int(pid)):
+            dead.append(path)
+    return dead
+
+
+def merge_dead_processes():
+    """
+    Переносит значения завершившихся процессов в metrics-merged.db и
+    удаляет их файлы; суммы метрик при этом не меняются. Каталог METRICS_DIR
+    должен быть локальным для хоста: живость процесса проверяется по PID.
+    Возвращает число объединённых файлов.
+    """
+    directory = get_metrics_dir()
+    if fcntl is None or not _dead_process_files(directory):
+        return 0
+    merged_count = 0
+    with _locked(directory, fcntl.LOCK_EX):
+        # Список заново: файлы мог объединить другой процесс
+        dead = _dead_process_files(directory)
+        if not dead:
+            return 0
+        merged = MmapValues(os.path.join(directory, MERGED_FILE))
+        try:
+            for path in dead:
+                values = _read_file(path)
+                if values is None:
+                    continue
+                for key, value in values:
+                    merged.inc(key, value)
+                os.unlink(path)
+                merged_count += 1
+        finally:
+            merged.close()
+    return merged_count
+
+
+def read_samples():
+    """Значения всех процессов: {(имя сэмпла, метки): сумма}."""
+    merge_dead_processes()
+    directory = get_metrics_dir()
+    totals = {}
+    # Общая блокировка: файл не должен попасть в сумму и до, и после переноса
+    with _locked(directory, fcntl.LOCK_SH if fcntl else None):
+        for path in glob.glob(os.path.join(directory, "metrics-*.db")):
+            for key, value in _read_file(path) or ():
+                name, labels = json.loads(key)
+                sample = (name, tuple(tuple(pair) for pair in labels))
+                totals[sample] = totals.get(sample, 0.0) + value
+    return totals
+
+
+_registry = []
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return {name: str(value) for name, value in labels.items()}
+
+    def _inc(self, sample_name, labels, amount):
+        if not settings.METRICS_ENABLED:
+            return
+        get_values().inc(_sample_key(sample_name, labels), amount)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        self._inc(f"{self.name}_total", self._labels(labels), amount)
+
+    def expose(self, samples):
+        return [
+            (name, dict(labels), value)
+            for (name, labels), value in sorted(samples.items())
+            if name == f"{self.name}_total"
+        ]
+
+
+class Histogram(Metric):
+    type = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(float(bound) for bound in buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        # Хранятся некумулятивные счётчики корзин, суммируются при выдаче
+        bound = next(bound for bound in self.buckets if value <= bound)
+        self._inc(f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, 1)
+        self._inc(f"{self.name}_sum", labels, value)
+
+    def expose(self, samples):
+        by_labels = {}
+        for (name, labels), value in samples.items():
+            labels = dict(labels)
+            if name == f"{self.name}_bucket":
+                bound = labels.pop("le")
+                series = by_labels.setdefault(tuple(sorted(labels.items())), {"buckets": {}, "sum": 0.0})
+                series["buckets"][bound] = value
+            elif name == f"{self.name}_sum":
+                series = by_labels.setdefault(tuple(sorted(labels.items())), {"buckets": {}, "sum": 0.0})
+                series["sum"] = value
+
+        result = []
+        for labels, series in sorted(by_labels.items()):
+            labels = dict(labels)
+            cumulative = 0.0
+            for bound in self.buckets:
+                cumulative += series["buckets"].get(_format_value(bound), 0.0)
+                result.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            result.append((f"{self.name}_sum", labels, series["sum"]))
+            result.append((f"{self.name}_count", labels, cumulative))
+        return result
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return f"{int(value)}.0"
+    return repr(value)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_metrics():
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    samples = read_samples()
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.type}")
+        for name, labels, value in metric.expose(samples):
+            if labels:
+                label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                name = f"{name}{{{label_text}}}"
+            lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+REQUESTS = Counter(
+    "silant_http_requests",
+    "API requests by view, method and status code.",
+    ["view", "method", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "silant_http_request_duration_seconds",
+    "API request latency by view.",
+    ["view", "method"],
+)
+REQUEST_DB_QUERIES = Histogram(
+    "silant_http_request_db_queries",
+    "DB queries per API request by view.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+THROTTLED_REQUESTS = Counter(
+    "silant_http_throttled_requests",
+    "API requests rejected with 429 Too Many Requests.",
+    ["view"],
+)
+CACHE_REQUESTS = Counter(
+    "silant_cache_requests",
+    "Response cache lookups by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+IMPORT_ROWS = Counter(
+    "silant_import_rows",
+    "Rows processed by import jobs, by sheet.",
+    ["sheet"],
+)
+IMPORT_JOBS = Counter(
+    "silant_import_jobs",
+    "Finished import jobs by status.",
+    ["status"],
+)
+IMPORT_JOB_DURATION = Histogram(
+    "silant_import_job_duration_seconds",
+    "Import job run time.",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+)
+TASK_RUNS = Counter(
+    "silant_task_runs",
+    "Background task attempts by task and outcome (done, retry, failed).",
+    ["task", "outcome"],
+)
+TASK_DURATION = Histogram(
+    "silant_task_duration_seconds",
+    "Background task attempt run time.",
+    ["task"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300, 1800),
+)
+
+
+def count_cache(cache_name, hit):
+    CACHE_REQUESTS.inc(cache=cache_name, result="hit" if hit else "miss")
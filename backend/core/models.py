@@ -1,7 +1,10 @@
 import datetime
+import os
 
 from django.contrib import admin
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import AbstractUser
@@ -76,6 +79,30 @@ class CustomUser(AbstractUser):
         return f"{self.username} ({self.user_type})"
 
 
+class PendingCredential(models.Model):
+    """
+    Очередь пользователей, созданных импортом с неиспользуемым паролем.
+    Пароли для них генерируются и хэшируются отдельно командой hash-credentials.
+    """
+    user = models.OneToOneField(
+        to=CustomUser,
+        on_delete=models.CASCADE,
+        related_name="pending_credential",
+        verbose_name="Пользователь",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата постановки в очередь",
+    )
+
+    class Meta:
+        verbose_name = "Ожидающая генерации учётная запись"
+        verbose_name_plural = "Ожидающие генерации учётные записи"
+
+    def __str__(self):
+        return f"{self.user.username}"
+
+
 class DictionaryEntry(models.Model):
     """
     Справочная таблица для хранения списков значений (модели техники, виды ТО, узлы отказа и т.п.)
@@ -142,7 +169,102 @@ class DictionaryEntry(models.Model):
         return f"{self.name} ({self.entity})"
 
 
-class Machine(models.Model):
+class SyncCounter(models.Model):
+    """
+    Глобальный счётчик изменений для дельта-синхронизации. Значения
+    выдаются внутри транзакции записи, поэтому порядок версий совпадает
+    с порядком фиксации изменений.
+    """
+    value = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Последняя выданная версия",
+    )
+
+    class Meta:
+        verbose_name = "Счётчик изменений"
+        verbose_name_plural = "Счётчики изменений"
+
+    @classmethod
+    def reserve(cls, count=1):
+        """Резервирует count версий подряд, возвращает первую из них."""
+        with transaction.atomic():
+            if not cls.objects.filter(pk=1).update(value=F("value") + count):
+                cls.objects.get_or_create(pk=1)
+                cls.objects.filter(pk=1).update(value=F("value") + count)
+            value = cls.objects.values_list("value", flat=True).get(pk=1)
+        return value - count + 1
+
+    def __str__(self):
+        return f"{self.value}"
+
+
+class CacheVersion(models.Model):
+    """
+    Версия группы закэшированных данных (core.cache). Хранится в БД, а не
+    в кэше: кэш у каждого процесса свой, а смена версии должна быть видна
+    всем процессам сервера, воркерам и командам импорта.
+    """
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name="Группа данных",
+    )
+    value = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Версия",
+    )
+
+    class Meta:
+        verbose_name = "Версия кэша"
+        verbose_name_plural = "Версии кэша"
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class SyncTrackedModel(models.Model):
+    """
+    Модель с отметкой времени изменения и версией строки: каждое
+    сохранение получает следующую версию из SyncCounter.
+    """
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Дата изменения",
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name="Версия",
+    )
+
+    # Поля строки, из которых состоит sync_scope(): (клиент, сервисная
+    # организация). При их смене прежний владелец получает надгробие
+    scope_fields = ()
+    # Связи, которые читает sync_scope(): подгружаются пакетом при удалении
+    scope_related = ()
+
+    class Meta:
+        abstract = True
+
+    def before_save(self):
+        """Проверки и расчётные поля; вызывается до записи строки."""
+
+    def save(self, *args, **kwargs):
+        self.before_save()
+        with transaction.atomic():
+            if self.scope_fields and self.pk is not None:
+                Tombstone.record_reassigned([self])
+            self.version = SyncCounter.reserve()
+            super().save(*args, **kwargs)
+
+    def sync_scope(self):
+        """ID клиента и сервисной организации, которым видна строка."""
+        raise NotImplementedError
+
+
+class Machine(SyncTrackedModel):
     # 1. Зав. № машины (уникальный номер)
     factory_number = models.CharField(
         max_length=50,
@@ -307,15 +429,19 @@ class Machine(models.Model):
                 'shipment_date': 'Дата отгрузки с завода не может быть больше текущей даты.'
             })
 
-    def save(self, *args, **kwargs):
+    def before_save(self):
         self.clean()
-        super().save(*args, **kwargs)
+
+    scope_fields = ("client_id", "service_company_id")
+
+    def sync_scope(self):
+        return self.client_id, self.service_company_id
 
     def __str__(self):
         return f"{self.model_tech.name} (№{self.factory_number})"
     
 
-class Maintenance(models.Model):
+class Maintenance(SyncTrackedModel):
     # 1. Вид ТО (справочник)
     maintenance_type = models.ForeignKey(
         to=DictionaryEntry,
@@ -391,12 +517,16 @@ class Maintenance(models.Model):
                 'work_order_date': 'Дата заказ-наряда не может быть позже даты проведения ТО.'
             })
 
-    def save(self, *args, **kwargs):
+    def before_save(self):
         self.clean()
-        super().save(*args, **kwargs)
 
+    scope_related = ("machine",)
+
+    def sync_scope(self):
+        return self.machine.client_id, self.service_company_id
 
-class Claim(models.Model):
+
+class Claim(SyncTrackedModel):
     # 1. Дата отказа (календарь)
     failure_date = models.DateField(
         verbose_name="Дата отказа",
@@ -495,25 +625,584 @@ class Claim(models.Model):
                 'recovery_date': 'Дата восстановления не может быть раньше даты отказа.'
             })
 
-    def save(self, *args, **kwargs):
+    def calculate_downtime_days(self):
+        """Время простоя в днях: recovery_date - failure_date (0, если не вычисляется)."""
+        if not (self.failure_date and self.recovery_date):
+            return 0
+
+        try:
+            failure_date = self.failure_date
+            if isinstance(failure_date, datetime.datetime):
+                failure_date = failure_date.date()
+
+            recovery_date = self.recovery_date
+            if isinstance(recovery_date, datetime.datetime):
+                recovery_date = recovery_date.date()
+
+            if recovery_date >= failure_date:
+                return (recovery_date - failure_date).days
+        except (TypeError, AttributeError):
+            pass
+        return 0
+
+    def before_save(self):
         self.clean()
+        self.downtime_days = self.calculate_downtime_days()
+
+    scope_related = ("machine",)
+
+    def sync_scope(self):
+        return self.machine.client_id, self.machine.service_company_id
+
+
+class ImportLedgerEntry(models.Model):
+    """
+    Журнал импорта: хэш нормализованной строки исходного файла
+    по листу и естественному ключу строки. Позволяет при повторном
+    импорте пропускать неизменённые строки и обновлять изменённые.
+    """
+    source = models.CharField(
+        max_length=50,
+        verbose_name="Лист исходного файла",
+    )
+    natural_key = models.CharField(
+        max_length=255,
+        verbose_name="Естественный ключ строки",
+    )
+    row_hash = models.CharField(
+        max_length=64,
+        verbose_name="Хэш нормализованной строки",
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name="ID импортированного объекта",
+    )
+    imported_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата последнего импорта",
+    )
+
+    class Meta:
+        verbose_name = "Запись журнала импорта"
+        verbose_name_plural = "Журнал импорта"
+        unique_together = (
+            "source",
+            "natural_key",
+        )
+
+    def __str__(self):
+        return f"{self.source}: {self.natural_key}"
+
+
+class Tombstone(models.Model):
+    """
+    Запись об удалённой строке для дельта-синхронизации. Хранит версию
+    удаления и ID пользователей, которым была видна строка. При смене
+    клиента или сервисной организации строка пропадает только у прежнего
+    владельца: надгробие помечается reassigned и хранит лишь его ID.
+    """
+    model = models.CharField(
+        max_length=50,
+        verbose_name="Модель",
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name="ID удалённого объекта",
+    )
+    version = models.PositiveBigIntegerField(
+        db_index=True,
+        verbose_name="Версия",
+    )
+    client_id = models.PositiveBigIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="ID клиента",
+    )
+    service_company_id = models.PositiveBigIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="ID сервисной организации",
+    )
+    reassigned = models.BooleanField(
+        default=False,
+        verbose_name="Смена владельца",
+    )
+    deleted_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата удаления",
+    )
+
+    class Meta:
+        verbose_name = "Удалённая запись"
+        verbose_name_plural = "Удалённые записи"
+        indexes = [
+            models.Index(fields=["model", "version"]),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} (v{self.version})"
+
+    @classmethod
+    def record_reassigned(cls, objects):
+        """
+        Надгробия для прежних владельцев строк, у которых меняются поля
+        scope_fields. Вызывается до записи строк, в их транзакции: старые
+        значения читаются из БД.
+        """
+        objects = [obj for obj in objects if obj.pk is not None]
+        if not objects:
+            return []
+        model = type(objects[0])
+        previous = {
+            pk: scope
+            for pk, *scope in model.objects
+            .filter(pk__in=[obj.pk for obj in objects])
+            .values_list("pk", *model.scope_fields)
+        }
+
+        tombstones = []
+        for obj in objects:
+            if obj.pk not in previous:
+                continue
+            current = [getattr(obj, field) for field in model.scope_fields]
+            # Только владельцы, которые теряют доступ к строке
+            lost = [old if old != new else None for old, new in zip(previous[obj.pk], current)]
+            if any(owner is not None for owner in lost):
+                client_id, service_company_id = lost
+                tombstones.append(cls(
+                    model=model._meta.model_name,
+                    object_id=obj.pk,
+                    client_id=client_id,
+                    service_company_id=service_company_id,
+                    reassigned=True,
+                ))
+
+        if tombstones:
+            first_version = SyncCounter.reserve(len(tombstones))
+            for offset, tombstone in enumerate(tombstones):
+                tombstone.version = first_version + offset
+            cls.objects.bulk_create(tombstones)
+        return tombstones
+
+
+class MaintenanceUploadKey(models.Model):
+    """
+    Ключ идемпотентности записи ТО из пакетной выгрузки: повторная
+    отправка записи с тем же ключом не создаёт дубликат.
+    """
+    user = models.ForeignKey(
+        to=CustomUser,
+        on_delete=models.CASCADE,
+        related_name="maintenance_upload_keys",
+        verbose_name="Пользователь",
+    )
+    key = models.CharField(
+        max_length=64,
+        verbose_name="Ключ идемпотентности",
+    )
+    maintenance = models.ForeignKey(
+        to=Maintenance,
+        on_delete=models.CASCADE,
+        related_name="upload_keys",
+        verbose_name="ТО",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата выгрузки",
+    )
+
+    class Meta:
+        verbose_name = "Ключ выгрузки ТО"
+        verbose_name_plural = "Ключи выгрузки ТО"
+        unique_together = (
+            "user",
+            "key",
+        )
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key}"
+
+
+class IdempotencyRecord(models.Model):
+    """
+    Сохранённый ответ на запрос с заголовком Idempotency-Key. Повтор
+    запроса с тем же ключом получает этот ответ без повторной обработки.
+    Пока ответа нет (status_code пуст), запрос ещё выполняется.
+    """
+    user = models.ForeignKey(
+        to=CustomUser,
+        on_delete=models.CASCADE,
+        related_name="idempotency_records",
+        verbose_name="Пользователь",
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name="Ключ идемпотентности",
+    )
+    fingerprint = models.CharField(
+        max_length=64,
+        verbose_name="Хэш метода, пути и тела запроса",
+    )
+    status_code = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="Код ответа",
+    )
+    response_data = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        blank=True,
+        null=True,
+        verbose_name="Тело ответа",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name="Дата запроса",
+    )
+
+    class Meta:
+        verbose_name = "Ответ по ключу идемпотентности"
+        verbose_name_plural = "Ответы по ключам идемпотентности"
+        unique_together = (
+            "user",
+            "key",
+        )
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key} ({self.status_code or 'pending'})"
+
+
+class ImportJob(models.Model):
+    """
+    Задание на импорт загруженного файла. Ставится в очередь
+    эндпоинтом загрузки, выполняется воркером (run-workers). Счётчики
+    прогресса обновляются после каждого чанка строк.
+    """
+    STATUS_CHOICES = [
+        (
+            "queued",
+            "В очереди",
+        ),
+        (
+            "running",
+            "Выполняется",
+        ),
+        (
+            "done",
+            "Завершено",
+        ),
+        (
+            "failed",
+            "Ошибка",
+        ),
+    ]
+
+    user = models.ForeignKey(
+        to=CustomUser,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="import_jobs",
+        verbose_name="Загрузил",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default="queued",
+        db_index=True,
+        verbose_name="Статус",
+    )
+    file_name = models.CharField(
+        max_length=255,
+        verbose_name="Имя загруженного файла",
+    )
+    file_path = models.CharField(
+        max_length=500,
+        verbose_name="Путь к файлу на диске",
+    )
+    sheet = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name="Лист (пусто - все листы)",
+    )
+    rows_total = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name="Строк в файле (оценка)",
+    )
+    rows_processed = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Обработано строк",
+    )
+    created = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Создано",
+    )
+    updated = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Обновлено",
+    )
+    unchanged = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Без изменений",
+    )
+    rejected = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Отклонено",
+    )
+    sheets = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Итоги по листам",
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name="Ошибка",
+    )
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name="Воркер",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата постановки в очередь",
+    )
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Дата начала",
+    )
+    heartbeat_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Последнее обновление прогресса",
+    )
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Дата завершения",
+    )
+
+    class Meta:
+        verbose_name = "Задание импорта"
+        verbose_name_plural = "Задания импорта"
+        ordering = [
+            "-created_at",
+        ]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.status})"
+
+    @property
+    def upload_dir(self):
+        return os.path.dirname(self.file_path)
+
+    def throughput(self):
+        """Строк в секунду с начала выполнения."""
+        if self.started_at is None:
+            return None
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        if elapsed <= 0:
+            return None
+        return self.rows_processed / elapsed
+
+    def eta_seconds(self):
+        """Оценка оставшегося времени по текущей пропускной способности."""
+        if self.status != "running" or not self.rows_total:
+            return None
+        throughput = self.throughput()
+        if not throughput:
+            return None
+        return max(self.rows_total - self.rows_processed, 0) / throughput
+
+
+class Task(models.Model):
+    """
+    Фоновая задача в очереди (core.tasks): имя зарегистрированной
+    функции и её аргументы. Выполняется воркером run-workers не раньше
+    run_at; при ошибке повторяется с экспоненциальной задержкой, пока
+    не исчерпаны попытки.
+    """
+    STATUS_CHOICES = [
+        (
+            "queued",
+            "В очереди",
+        ),
+        (
+            "running",
+            "Выполняется",
+        ),
+        (
+            "done",
+            "Выполнена",
+        ),
+        (
+            "failed",
+            "Ошибка",
+        ),
+    ]
+
+    name = models.CharField(
+        max_length=200,
+        db_index=True,
+        verbose_name="Имя задачи",
+    )
+    args = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        default=list,
+        blank=True,
+        verbose_name="Позиционные аргументы",
+    )
+    kwargs = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        default=dict,
+        blank=True,
+        verbose_name="Именованные аргументы",
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default="queued",
+        verbose_name="Статус",
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name="Выполнить не раньше",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Попыток сделано",
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=3,
+        verbose_name="Попыток всего",
+    )
+    schedule = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name="Расписание, поставившее задачу",
+    )
+    worker = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name="Воркер",
+    )
+    result = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        blank=True,
+        null=True,
+        verbose_name="Результат",
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name="Последняя ошибка",
+    )
+    duration = models.FloatField(
+        blank=True,
+        null=True,
+        verbose_name="Время выполнения последней попытки, с",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Дата постановки в очередь",
+    )
+    started_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Начало последней попытки",
+    )
+    heartbeat_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Последняя отметка воркера",
+    )
+    finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Дата завершения",
+    )
 
-        self.downtime_days = 0
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+        ]
 
-        if self.failure_date and self.recovery_date:
-            try:
-                failure_date = self.failure_date
-                if isinstance(failure_date, datetime.datetime):
-                    failure_date = failure_date.date()
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
 
-                recovery_date = self.recovery_date
-                if isinstance(recovery_date, datetime.datetime):
-                    recovery_date = recovery_date.date()
 
-                if recovery_date >= failure_date:
-                    delta = recovery_date - failure_date
-                    self.downtime_days = delta.days
-            except (TypeError, AttributeError):
-                self.downtime_days = 0
+class TaskStat(models.Model):
+    """
+    Накопленные метрики выполнения фоновых задач по имени задачи.
+    Обновляются после каждой попытки и переживают очистку выполненных задач.
+    """
+    name = models.CharField(
+        max_length=200,
+        unique=True,
+        verbose_name="Имя задачи",
+    )
+    runs = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Попыток",
+    )
+    failures = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Неудачных попыток",
+    )
+    retries = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Повторов",
+    )
+    total_duration = models.FloatField(
+        default=0,
+        verbose_name="Суммарное время, с",
+    )
+    max_duration = models.FloatField(
+        default=0,
+        verbose_name="Максимальное время, с",
+    )
+    last_duration = models.FloatField(
+        default=0,
+        verbose_name="Время последней попытки, с",
+    )
+    last_finished_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Дата последней попытки",
+    )
+
+    class Meta:
+        verbose_name = "Метрики фоновой задачи"
+        verbose_name_plural = "Метрики фоновых задач"
+
+    def __str__(self):
+        return self.name
+
+
+class TaskSchedule(models.Model):
+    """
+    Состояние периодического расписания из settings.TASK_SCHEDULE:
+    время следующего запуска. Сдвигается условным UPDATE, поэтому
+    задачу по расписанию ставит в очередь только один процесс.
+    """
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Расписание",
+    )
+    next_run_at = models.DateTimeField(
+        verbose_name="Следующий запуск",
+    )
+    last_run_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name="Последний запуск",
+    )
+
+    class Meta:
+        verbose_name = "Периодическое расписание"
+        verbose_name_plural = "Периодические расписания"
 
-        super().save(*args, **kwargs)
+    def __str__(self):
+        return f"{self.name} ({self.next_run_at})"
@@ -0,0 +1,99 @@
+"""
+Маршрутизация чтения на реплику - соединение только для чтения
+(mode=ro, query_only) к той же базе SQLite в режиме WAL. Чтение из
+реплики включается только внутри replica_reads(), например в
+представлениях, обёрнутых read_from_replica. Запись, чтение внутри
+транзакции и чтение после записи в том же запросе идут в default.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+REPLICA_DB_ALIAS = "replica"
+
+_replica_reads = ContextVar("replica_reads", default=None)
+
+
+class ReplicaReads:
+    """Состояние replica_reads(): после записи чтение идёт в default."""
+
+    def __init__(self):
+        self.wrote = False
+
+
+@contextmanager
+def replica_reads(state=None):
+    state = state or ReplicaReads()
+    token = _replica_reads.set(state)
+    try:
+        yield state
+    finally:
+        _replica_reads.reset(token)
+
+
+def _iter_from_replica(iterator, state):
+    # Потоковый ответ читается из БД уже после возврата из представления
+    iterator = iter(iterator)
+    while True:
+        with replica_reads(state):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+def read_from_replica(view):
+    """Декоратор представления: его чтение идёт в реплику."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with replica_reads():
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads() as state:
+            response = view(request, *args, **kwargs)
+        if getattr(response, "streaming", False) and not response.is_async:
+            response.streaming_content = _iter_from_replica(response.streaming_content, state)
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _replica_reads.get()
+        if state is None or state.wrote or REPLICA_DB_ALIAS not in settings.DATABASES:
+            return None
+        # В транзакции читаем то, что она уже записала
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Реплика могла бы ещё не видеть записанное
+        state = _replica_reads.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Обе базы - один и тот же файл
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
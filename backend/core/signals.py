@@ -0,0 +1,134 @@
+import threading
+
+from functools import partial
+
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import bump_version
+from .events import change_event, hub
+from .models import (
+    Claim,
+    CustomUser,
+    DictionaryEntry,
+    Machine,
+    Maintenance,
+    SyncCounter,
+    SyncTrackedModel,
+    Tombstone,
+)
+
+
+# Названия справочников и описания пользователей входят в данные машин
+@receiver([post_save, post_delete], sender=DictionaryEntry)
+def dictionary_changed(sender, **kwargs):
+    bump_version("dictionary", "machines")
+
+
+@receiver([post_save, post_delete], sender=Machine)
+def machine_changed(sender, **kwargs):
+    bump_version("machines")
+
+
+def publish_after_commit(event):
+    transaction.on_commit(partial(hub.publish, event))
+
+
+@receiver(post_save, sender=Machine)
+def publish_machine_saved(sender, instance, created, **kwargs):
+    publish_after_commit(change_event("machine.created" if created else "machine.updated", instance))
+
+
+@receiver(post_save, sender=Maintenance)
+def publish_maintenance_added(sender, instance, created, **kwargs):
+    if created:
+        publish_after_commit(change_event("maintenance.added", instance))
+
+
+@receiver(post_save, sender=Claim)
+def publish_claim_added(sender, instance, created, **kwargs):
+    if created:
+        publish_after_commit(change_event("claim.added", instance))
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, **kwargs):
+    bump_version("users", "machines")
+
+
+# Права пользователя складываются из его прав и прав его групп
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver([post_save, post_delete], sender=Group)
+def user_permissions_changed(sender, **kwargs):
+    bump_version("users")
+
+
+# Строки текущего вызова delete() в потоке. Collector отправляет pre_delete
+# для всех строк до первого post_delete, поэтому надгробия пишутся одним
+# пакетом на первом post_delete
+_deletion = threading.local()
+
+
+def write_tombstones(instances):
+    """
+    Надгробия удаляемых строк: версии резервируются одним блоком, связи
+    для sync_scope() подгружаются пакетом. Возвращает {(модель, pk): версия}.
+    """
+    by_model = {}
+    for instance in instances:
+        by_model.setdefault(type(instance), []).append(instance)
+    for model, objects in by_model.items():
+        prefetch_related_objects(objects, *model.scope_related)
+
+    first_version = SyncCounter.reserve(len(instances))
+    tombstones = []
+    for offset, instance in enumerate(instances):
+        client_id, service_company_id = instance.sync_scope()
+        tombstones.append(Tombstone(
+            model=instance._meta.model_name,
+            object_id=instance.pk,
+            version=first_version + offset,
+            client_id=client_id,
+            service_company_id=service_company_id,
+        ))
+    Tombstone.objects.bulk_create(tombstones)
+    return {
+        (type(instance), instance.pk): tombstone.version
+        for instance, tombstone in zip(instances, tombstones)
+    }
+
+
+def collect_deleted(sender, instance, origin=None, **kwargs):
+    batch = getattr(_deletion, "batch", None)
+    # Пакет, уже записанный на post_delete, принадлежит прошлому удалению
+    if batch is None or batch["origin"] is not origin or batch["versions"] is not None:
+        batch = _deletion.batch = {"origin": origin, "instances": [], "versions": None}
+    batch["instances"].append(instance)
+
+
+def create_tombstone(sender, instance, origin=None, **kwargs):
+    batch = getattr(_deletion, "batch", None)
+    if batch is not None and batch["origin"] is origin and batch["versions"] is None:
+        batch["versions"] = write_tombstones(batch["instances"])
+    versions = batch["versions"] if batch is not None and batch["origin"] is origin else {}
+    version = versions.get((sender, instance.pk))
+    if version is None:
+        # Сигнал без pre_delete
+        version = write_tombstones([instance])[(sender, instance.pk)]
+
+    if sender is Machine:
+        event = change_event("machine.deleted", instance)
+        event["version"] = version
+        publish_after_commit(event)
+
+
+# Только модели с версиями: приёмник без sender отключил бы быстрое
+# удаление (fast delete) для всех моделей проекта
+for model in SyncTrackedModel.__subclasses__():
+    pre_delete.connect(collect_deleted, sender=model, dispatch_uid=f"collect_deleted.{model.__name__}")
+    post_delete.connect(create_tombstone, sender=model, dispatch_uid=f"create_tombstone.{model.__name__}")
@@ -0,0 +1,301 @@
+"""
+Очередь фоновых задач в БД (core.models.Task) и периодические
+расписания. Задача - функция, зарегистрированная декоратором @task в
+модуле tasks.py любого приложения; её ставят в очередь через enqueue(),
+выполняют воркеры команды run-workers. Расписания задаются в
+settings.TASK_SCHEDULE в формате cron.
+"""
+
+import threading
+import time
+import traceback
+
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import management
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .cron import CronSchedule
+from .metrics import TASK_DURATION, TASK_RUNS
+from .models import Task, TaskSchedule, TaskStat
+
+
+_registry = {}
+
+
+def task(name=None, max_attempts=3):
+    """
+    Регистрирует функцию как фоновую задачу. Имя по умолчанию -
+    "<модуль>.<функция>"; аргументы должны сериализоваться в JSON.
+    """
+    def decorator(func):
+        func.task_name = name or f"{func.__module__}.{func.__name__}"
+        func.max_attempts = max_attempts
+        _registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def autodiscover():
+    """Импортирует модули tasks.py установленных приложений."""
+    autodiscover_modules("tasks")
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"Task '{name}' is not registered")
+
+
+def enqueue(name, args=(), kwargs=None, run_at=None, schedule=""):
+    """Ставит задачу в очередь; name - имя задачи или функция с @task."""
+    name = getattr(name, "task_name", name)
+    return Task.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=get_task(name).max_attempts,
+        schedule=schedule,
+    )
+
+
+def retry_delay(attempt):
+    """Задержка перед повтором: TASK_RETRY_BACKOFF * 2^(attempt - 1) секунд."""
+    return timedelta(seconds=settings.TASK_RETRY_BACKOFF * 2 ** (attempt - 1))
+
+
+def claim_task(worker):
+    """
+    Забирает задачу, срок которой наступил. Аналог SELECT ... FOR UPDATE
+    для SQLite: статус меняется условным UPDATE, и только один воркер
+    (поток или процесс) получает задачу. None, если выполнять нечего.
+    """
+    while True:
+        now = timezone.now()
+        candidate = Task.objects.filter(
+            status="queued",
+            run_at__lte=now,
+        ).order_by("run_at", "pk").first()
+        if candidate is None:
+            return None
+
+        claimed = Task.objects.filter(pk=candidate.pk, status="queued").update(
+            status="running",
+            worker=worker,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            candidate.refresh_from_db()
+            return candidate
+
+
+def run_task(task_obj):
+    """
+    Выполняет задачу и сохраняет итог. При ошибке задача возвращается в
+    очередь с задержкой retry_delay(), пока не исчерпаны попытки; затем
+    остаётся в статусе failed с трассировкой последней ошибки.
+    """
+    started = time.perf_counter()
+    try:
+        func = get_task(task_obj.name)
+        with heartbeat(task_obj):
+            result = func(*task_obj.args, **task_obj.kwargs)
+    except Exception:
+        task_obj.last_error = traceback.format_exc()
+        failed = True
+    else:
+        task_obj.result = _jsonable(result)
+        task_obj.last_error = ""
+        failed = False
+    task_obj.duration = time.perf_counter() - started
+
+    retry = failed and task_obj.attempts < task_obj.max_attempts
+    if retry:
+        task_obj.status = "queued"
+        task_obj.run_at = timezone.now() + retry_delay(task_obj.attempts)
+    else:
+        task_obj.status = "failed" if failed else "done"
+        task_obj.finished_at = timezone.now()
+    task_obj.worker = ""
+    task_obj.save(update_fields=[
+        "status",
+        "run_at",
+        "result",
+        "last_error",
+        "duration",
+        "worker",
+        "finished_at",
+    ])
+    record_stat(task_obj.name, task_obj.duration, failed=failed, retry=retry)
+    TASK_RUNS.inc(task=task_obj.name, outcome="retry" if retry else task_obj.status)
+    TASK_DURATION.observe(task_obj.duration, task=task_obj.name)
+    return task_obj
+
+
+@contextmanager
+def heartbeat(task_obj, interval=None):
+    """
+    Пока выполняется блок, отдельный поток раз в interval секунд
+    (TASK_HEARTBEAT_INTERVAL) обновляет heartbeat_at задачи: по этой
+    отметке requeue_stale_tasks() отличает долгую задачу от брошенной.
+    """
+    if interval is None:
+        interval = settings.TASK_HEARTBEAT_INTERVAL
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval):
+                Task.objects.filter(pk=task_obj.pk, status="running").update(
+                    heartbeat_at=timezone.now(),
+                )
+        finally:
+            # У потока своё соединение с БД
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{task_obj.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _jsonable(value):
+    try:
+        DjangoJSONEncoder().encode(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def record_stat(name, duration, failed=False, retry=False):
+    updates = {
+        "runs": F("runs") + 1,
+        "failures": F("failures") + int(failed),
+        "retries": F("retries") + int(retry),
+        "total_duration": F("total_duration") + duration,
+        "max_duration": Greatest(F("max_duration"), duration),
+        "last_duration": duration,
+        "last_finished_at": timezone.now(),
+    }
+    if TaskStat.objects.filter(name=name).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            TaskStat.objects.create(name=name)
+    except IntegrityError:
+        # Строку успел создать другой воркер
+        pass
+    TaskStat.objects.filter(name=name).update(**updates)
+
+
+def requeue_stale_tasks(stale_after=None):
+    """
+    Задачи в статусе running без отметки воркера (heartbeat_at) дольше
+    stale_after секунд (воркер остановлен) считаются неудачной попыткой:
+    возвращаются в очередь или, если попытки исчерпаны, помечаются failed.
+    Время выполнения задачи не ограничено, пока воркер её отмечает.
+    """
+    if stale_after is None:
+        stale_after = settings.TASK_STALE_AFTER
+    now = timezone.now()
+    deadline = now - timedelta(seconds=stale_after)
+    stale = Task.objects.filter(
+        # Задачи, забранные до появления отметок, - по времени начала
+        Q(heartbeat_at__lt=deadline) | Q(heartbeat_at__isnull=True, started_at__lt=deadline),
+        status="running",
+    )
+    requeued = stale.filter(attempts__lt=F("max_attempts")).update(
+        status="queued",
+        run_at=now,
+        worker="",
+        last_error="Worker stopped while running the task",
+    )
+    failed = stale.update(
+        status="failed",
+        worker="",
+        finished_at=now,
+        last_error="Worker stopped while running the task",
+    )
+    return requeued + failed
+
+
+def get_schedules():
+    """{имя: (задача, CronSchedule, args, kwargs)} из settings.TASK_SCHEDULE."""
+    return {
+        name: (
+            entry["task"],
+            CronSchedule(entry["cron"]),
+            entry.get("args", ()),
+            entry.get("kwargs", {}),
+        )
+        for name, entry in getattr(settings, "TASK_SCHEDULE", {}).items()
+    }
+
+
+def run_due_schedules(schedules=None):
+    """
+    Ставит в очередь задачи расписаний, время которых наступило, и
+    сдвигает время следующего запуска. Пропущенные за время простоя
+    запуски не накапливаются: задача ставится один раз.
+    Возвращает список поставленных задач.
+    """
+    if schedules is None:
+        schedules = get_schedules()
+    now = timezone.localtime()
+    states = {state.name: state for state in TaskSchedule.objects.filter(name__in=schedules)}
+    enqueued = []
+
+    for name, (task_name, cron, args, kwargs) in schedules.items():
+        state = states.get(name)
+        if state is None:
+            try:
+                with transaction.atomic():
+                    TaskSchedule.objects.create(name=name, next_run_at=cron.next_after(now))
+            except IntegrityError:
+                pass
+            continue
+        if state.next_run_at > now:
+            continue
+
+        with transaction.atomic():
+            moved = TaskSchedule.objects.filter(
+                pk=state.pk,
+                next_run_at=state.next_run_at,
+            ).update(
+                next_run_at=cron.next_after(now),
+                last_run_at=now,
+            )
+            # Запуск уже забрал другой процесс
+            if moved:
+                enqueued.append(enqueue(task_name, args, kwargs, schedule=name))
+    return enqueued
+
+
+@task()
+def call_command(command, *args, **options):
+    """Management-команда как фоновая задача (например, в расписании)."""
+    management.call_command(command, *args, **options)
+
+
+@task()
+def purge_finished_tasks():
+    """Удаляет выполненные и упавшие задачи старше TASK_RESULT_TTL (метрики остаются)."""
+    deleted, _ = Task.objects.filter(
+        status__in=["done", "failed"],
+        finished_at__lt=timezone.now() - timedelta(seconds=settings.TASK_RESULT_TTL),
+    ).delete()
+    return deleted
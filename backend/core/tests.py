@@ -0,0 +1,606 @@
+import csv
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import metrics, writer
+from core.credentials import hash_pending_credentials
+from core.cron import CronSchedule
+from core.importers import MaintenanceImporter, SheetReader
+from core.importers.command import DEFAULT_IMPORT_FILE
+from core.importers.jobs import claim_job, requeue_stale, run_job
+from core.metrics import MmapValues
+from core.routers import read_from_replica, replica_reads
+from core.writer import group_commit
+from core.models import (
+    Claim,
+    CustomUser,
+    DictionaryEntry,
+    IdempotencyRecord,
+    ImportJob,
+    ImportLedgerEntry,
+    Machine,
+    Maintenance,
+    PendingCredential,
+    Task,
+    TaskSchedule,
+    TaskStat,
+    Tombstone,
+)
+from core.tasks import (
+    claim_task,
+    enqueue,
+    heartbeat,
+    requeue_stale_tasks,
+    run_due_schedules,
+    run_task,
+    task,
+)
+
+
+MACHINE_COLUMNS = {
+    "Зав. номер машины": "0017",
+    "Дата отгрузки с завода": "2022-03-01",
+    "Модель техники": "ПД1,5",
+    "Модель двигателя": "Kubota D1803",
+    "Зав. номер двигателя": "7U2345",
+    "Модель трансмиссии": "10VB-00106",
+    "Зав. номер трансмиссии": "AB3467",
+    "Модель ведущего моста": "20VA-00101",
+    "Зав. номер ведущего моста": "21A123",
+    "Модель управляемого моста": "VS20-00001",
+    "Зав. номер управляемого моста": "20A456",
+    "Грузополучатель (конечный потребитель)": "ООО Ромашка",
+    "Адрес поставки (эксплуатации)": "г. Пермь",
+    "Комплектация (доп. опции)": "Стандарт",
+    "Покупатель": "ООО Ромашка",
+    "Сервисная компания": "ООО Сервис",
+}
+
+MAINTENANCE_COLUMNS = {
+    "Зав. номер машины": "0017",
+    "Вид ТО": "ТО-1 (200 м/час)",
+    "Дата проведения ТО": "2022-05-01",
+    "Наработка, м/час": "210",
+    "Номер заказ-наряда": "#2022-01",
+    "Дата заказ-наряда": "2022-04-28",
+    "Организация, проводившая ТО": "самостоятельно",
+}
+
+CLAIM_COLUMNS = {
+    "Зав. номер машины": "0017",
+    "Дата отказа": "2022-06-01",
+    "Наработка, м/час": "320",
+    "Узел отказа": "Двигатель",
+    "Описание отказа": "Не заводится",
+    "Способ восстановления": "Ремонт узла",
+    "Используемые запасные части": "Стартер",
+    "Дата восстановления": "2022-06-05",
+}
+
+
+class ImportTestCase(TestCase):
+    """Импорт из временных CSV-файлов; отчёты пишутся в тот же каталог."""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command("setup-groups", stdout=StringIO())
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+
+    def write_csv(self, name, rows):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+
+    def run_import(self, command, path):
+        call_command(
+            command,
+            file=path,
+            rejects=os.path.join(self.tmp_dir, "rejects.jsonl"),
+            summary=os.path.join(self.tmp_dir, "summary.jsonl"),
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+
+
+class FactoryNumberTests(ImportTestCase):
+    def test_leading_zeros_are_dropped_like_baseline_import(self):
+        path = self.write_csv("machines.csv", [MACHINE_COLUMNS])
+        self.run_import("db-import-machines", path)
+        self.run_import("db-import-machines", path)
+
+        self.assertEqual(list(Machine.objects.values_list("factory_number", flat=True)), ["17"])
+
+    def test_xlsx_factory_numbers(self):
+        self.run_import("db-import-machines", DEFAULT_IMPORT_FILE)
+
+        self.assertTrue(Machine.objects.filter(factory_number="17").exists())
+        self.assertFalse(Machine.objects.filter(factory_number__startswith="0").exists())
+
+
+class IncrementalImportTests(ImportTestCase):
+    def import_all(self, maintenance_rows=None):
+        self.run_import("db-import-machines", self.write_csv("machines.csv", [MACHINE_COLUMNS]))
+        self.run_import(
+            "db-import-maintenance",
+            self.write_csv("maintenance.csv", maintenance_rows or [
+                MAINTENANCE_COLUMNS,
+                # Без номера заказ-наряда
+                dict(MAINTENANCE_COLUMNS, **{"Вид ТО": "ТО-0 (50 м/час)", "Номер заказ-наряда": ""}),
+            ]),
+        )
+        self.run_import("db-import-claims", self.write_csv("claims.csv", [CLAIM_COLUMNS]))
+
+    def snapshot(self):
+        return [
+            sorted(model.objects.values_list("pk", "version"))
+            for model in (Machine, Maintenance, Claim)
+        ]
+
+    def test_reimport_skips_unchanged_rows(self):
+        self.import_all()
+        before = self.snapshot()
+
+        self.import_all()
+
+        self.assertEqual(self.snapshot(), before)
+
+    def test_rows_imported_before_ledger_are_not_duplicated(self):
+        self.import_all()
+        pks = [sorted(model.objects.values_list("pk", flat=True)) for model in (Machine, Maintenance, Claim)]
+        ImportLedgerEntry.objects.all().delete()
+
+        self.import_all()
+
+        self.assertEqual(
+            [sorted(model.objects.values_list("pk", flat=True)) for model in (Machine, Maintenance, Claim)],
+            pks,
+        )
+        self.assertEqual(ImportLedgerEntry.objects.count(), 4)
+
+    def test_changed_row_is_updated_in_place(self):
+        self.import_all()
+        maintenance = Maintenance.objects.get(work_order_number="#2022-01")
+
+        self.import_all([
+            dict(MAINTENANCE_COLUMNS, **{"Наработка, м/час": "250"}),
+        ])
+
+        maintenance.refresh_from_db()
+        self.assertEqual(maintenance.operating_hours, 250)
+        self.assertEqual(Maintenance.objects.filter(work_order_number="#2022-01").count(), 1)
+
+    def test_client_change_leaves_tombstone_for_previous_client(self):
+        self.import_all()
+        machine = Machine.objects.get()
+        previous_client = machine.client_id
+
+        self.run_import(
+            "db-import-machines",
+            self.write_csv("machines.csv", [dict(MACHINE_COLUMNS, **{"Покупатель": "ООО Лютик"})]),
+        )
+
+        machine.refresh_from_db()
+        self.assertNotEqual(machine.client_id, previous_client)
+        tombstone = Tombstone.objects.get(object_id=machine.pk)
+        self.assertTrue(tombstone.reassigned)
+        self.assertEqual((tombstone.client_id, tombstone.service_company_id), (previous_client, None))
+        self.assertLess(tombstone.version, machine.version)
+
+
+class HashCredentialsTests(TestCase):
+    def setUp(self):
+        call_command("setup-groups", stdout=StringIO())
+        for username in ("client-1", "client-2"):
+            user = CustomUser.objects.create(
+                username=username,
+                user_description=username,
+                user_type="client",
+                group=Group.objects.get(name="Клиент"),
+                password=make_password(None),
+            )
+            PendingCredential.objects.create(user=user)
+
+    def test_password_set_after_queueing_is_kept(self):
+        user = CustomUser.objects.get(username="client-1")
+        user.set_password("chosen-by-manager")
+        user.save()
+
+        issued = []
+        processed = hash_pending_credentials(workers=1, on_batch=issued.extend)
+
+        user.refresh_from_db()
+        self.assertEqual(processed, 1)
+        self.assertTrue(user.check_password("chosen-by-manager"))
+        self.assertEqual([user.username for user, _ in issued], ["client-2"])
+        self.assertTrue(CustomUser.objects.get(username="client-2").has_usable_password())
+        self.assertFalse(PendingCredential.objects.exists())
+
+    def test_credentials_file_is_private(self):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "credentials.csv")
+
+        call_command("hash-credentials", output=path, workers=1, stdout=StringIO())
+
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+        with open(path, encoding="utf-8") as file:
+            self.assertEqual(len(list(csv.reader(file))), 3)
+
+
+class ImportJobQueueTests(ImportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create(
+            username="manager",
+            user_description="manager",
+            user_type="manager",
+            group=Group.objects.get(name="Менеджер"),
+        )
+
+    def create_job(self, path=None):
+        path = path or os.path.join(self.tmp_dir, "machines.csv")
+        return ImportJob.objects.create(
+            user=self.user,
+            file_name=os.path.basename(path),
+            file_path=path,
+        )
+
+    def test_jobs_are_claimed_one_at_a_time(self):
+        first = self.create_job()
+        second = self.create_job()
+
+        self.assertEqual(claim_job("worker-1").pk, first.pk)
+        self.assertIsNone(claim_job("worker-2"))
+        ImportJob.objects.filter(pk=first.pk).update(status="done")
+        self.assertEqual(claim_job("worker-2").pk, second.pk)
+
+    def test_requeue_depends_on_heartbeat_only(self):
+        job = self.create_job()
+        claim_job("worker-1")
+        long_ago = timezone.now() - timedelta(hours=1)
+        ImportJob.objects.filter(pk=job.pk).update(started_at=long_ago)
+
+        self.assertEqual(requeue_stale(stale_after=60), 0)
+
+        ImportJob.objects.filter(pk=job.pk).update(heartbeat_at=long_ago)
+        self.assertEqual(requeue_stale(stale_after=60), 1)
+        self.assertEqual(ImportJob.objects.get(pk=job.pk).status, "queued")
+
+    def test_row_estimate_reports_progress(self):
+        reader = SheetReader(DEFAULT_IMPORT_FILE, MaintenanceImporter.sheet_name, chunk_size=5)
+        calls = []
+
+        rows = reader.estimate_rows(on_progress=lambda: calls.append(1))
+
+        self.assertEqual(rows, sum(1 for _ in reader.rows()))
+        self.assertEqual(len(calls), rows // 5)
+
+    def test_run_job(self):
+        path = os.path.join(self.tmp_dir, "upload.xlsx")
+        shutil.copy(DEFAULT_IMPORT_FILE, path)
+        self.create_job(path)
+
+        job = run_job(claim_job("worker-1"))
+
+        self.assertEqual(job.status, "done", job.error)
+        self.assertEqual(job.rows_processed, job.rows_total)
+        self.assertEqual(job.created, Machine.objects.count() + Maintenance.objects.count() + Claim.objects.count())
+
+
+@task(name="core.tests.add")
+def add(a, b):
+    return a + b
+
+
+@task(name="core.tests.fail", max_attempts=2)
+def fail():
+    raise RuntimeError("boom")
+
+
+class TaskQueueTests(TestCase):
+    def test_due_tasks_are_claimed_in_order_once(self):
+        later = enqueue(add, (1, 2), run_at=timezone.now() + timedelta(hours=1))
+        first = enqueue(add, (1, 2))
+        second = enqueue(add, (3, 4))
+
+        claimed = [claim_task("worker-1"), claim_task("worker-2"), claim_task("worker-3")]
+
+        self.assertEqual([task.pk if task else None for task in claimed], [first.pk, second.pk, None])
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(claimed[0].heartbeat_at, claimed[0].started_at)
+        self.assertEqual(Task.objects.get(pk=later.pk).status, "queued")
+
+    def test_run_task_stores_result(self):
+        enqueue(add, (2, 3))
+
+        task_obj = run_task(claim_task("worker-1"))
+
+        self.assertEqual((task_obj.status, task_obj.result), ("done", 5))
+        self.assertEqual(TaskStat.objects.get(name="core.tests.add").runs, 1)
+
+    def test_failed_task_is_retried_with_backoff(self):
+        enqueue(fail)
+
+        task_obj = run_task(claim_task("worker-1"))
+        self.assertEqual(task_obj.status, "queued")
+        self.assertGreater(task_obj.run_at, timezone.now())
+        self.assertIn("boom", task_obj.last_error)
+
+        Task.objects.filter(pk=task_obj.pk).update(run_at=timezone.now())
+        task_obj = run_task(claim_task("worker-1"))
+        self.assertEqual((task_obj.status, task_obj.attempts), ("failed", 2))
+
+    def test_long_task_with_heartbeat_is_not_requeued(self):
+        task_obj = enqueue(add, (1, 2))
+        claim_task("worker-1")
+        long_ago = timezone.now() - timedelta(hours=1)
+        Task.objects.filter(pk=task_obj.pk).update(started_at=long_ago)
+
+        self.assertEqual(requeue_stale_tasks(stale_after=60), 0)
+
+        Task.objects.filter(pk=task_obj.pk).update(heartbeat_at=long_ago)
+        self.assertEqual(requeue_stale_tasks(stale_after=60), 1)
+        task_obj.refresh_from_db()
+        self.assertEqual((task_obj.status, task_obj.worker), ("queued", ""))
+
+    def test_stale_task_without_attempts_left_fails(self):
+        task_obj = enqueue(fail)
+        Task.objects.filter(pk=task_obj.pk).update(
+            status="running",
+            attempts=2,
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+
+        self.assertEqual(requeue_stale_tasks(stale_after=60), 1)
+        self.assertEqual(Task.objects.get(pk=task_obj.pk).status, "failed")
+
+
+class TaskHeartbeatTests(TransactionTestCase):
+    def test_heartbeat_is_updated_while_task_runs(self):
+        enqueue(add, (1, 2))
+        task_obj = claim_task("worker-1")
+        claimed_at = task_obj.heartbeat_at
+
+        with heartbeat(task_obj, interval=0.01):
+            time.sleep(0.2)
+
+        self.assertGreater(Task.objects.get(pk=task_obj.pk).heartbeat_at, claimed_at)
+
+
+class CronScheduleTests(TestCase):
+    def test_next_after(self):
+        moment = datetime(2024, 1, 31, 10, 7, 30)
+        cases = [
+            ("*/15 * * * *", datetime(2024, 1, 31, 10, 15)),
+            ("0 4 * * *", datetime(2024, 2, 1, 4, 0)),
+            ("@monthly", datetime(2024, 2, 1, 0, 0)),
+            ("30 9 29 2 *", datetime(2024, 2, 29, 9, 30)),
+            # День месяца или день недели: 1 февраля - четверг
+            ("0 0 15 * 4", datetime(2024, 2, 1, 0, 0)),
+            ("0 12 * * 7", datetime(2024, 2, 4, 12, 0)),
+        ]
+        for expression, expected in cases:
+            with self.subTest(expression=expression):
+                self.assertEqual(CronSchedule(expression).next_after(moment), expected)
+
+    def test_invalid_expressions(self):
+        for expression in ("* * * *", "60 * * * *", "*/0 * * * *", "0 0 31 2 *"):
+            with self.subTest(expression=expression), self.assertRaises(ValueError):
+                CronSchedule(expression).next_after(datetime(2024, 1, 1))
+
+    def test_due_schedule_is_enqueued_once(self):
+        schedules = {"nightly": ("core.tests.add", CronSchedule("0 4 * * *"), (1, 2), {})}
+
+        self.assertEqual(run_due_schedules(schedules), [])
+        TaskSchedule.objects.update(next_run_at=timezone.now() - timedelta(days=3))
+
+        enqueued = run_due_schedules(schedules)
+        self.assertEqual([task_obj.schedule for task_obj in enqueued], ["nightly"])
+        self.assertEqual(run_due_schedules(schedules), [])
+        self.assertGreater(TaskSchedule.objects.get().next_run_at, timezone.now())
+
+
+class MetricsFileTests(TestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir)
+        settings_override = self.settings(METRICS_DIR=self.metrics_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write_runs(self, pid, amount):
+        file = MmapValues(os.path.join(self.metrics_dir, f"metrics-{pid}.db"))
+        file.inc(metrics._sample_key("silant_task_runs", {"task": "add", "outcome": "done"}), amount)
+        file.close()
+
+    def runs(self):
+        return metrics.read_samples()[("silant_task_runs", (("outcome", "done"), ("task", "add")))]
+
+    def dead_pid(self):
+        process = subprocess.Popen([sys.executable, "-c", ""])
+        process.wait()
+        return process.pid
+
+    def test_dead_process_files_are_merged_without_changing_totals(self):
+        self.write_runs(self.dead_pid(), 2)
+        self.write_runs(self.dead_pid(), 3)
+        self.write_runs(os.getpid(), 1)
+
+        self.assertEqual(self.runs(), 6)
+        self.assertEqual(
+            sorted(name for name in os.listdir(self.metrics_dir) if name.endswith(".db")),
+            sorted([metrics.MERGED_FILE, f"metrics-{os.getpid()}.db"]),
+        )
+
+        self.write_runs(self.dead_pid(), 4)
+        self.assertEqual(self.runs(), 10)
+
+
+class TombstoneTests(ImportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.run_import("db-import-machines", self.write_csv("machines.csv", [MACHINE_COLUMNS]))
+        self.run_import("db-import-maintenance", self.write_csv("maintenance.csv", [
+            MAINTENANCE_COLUMNS,
+            dict(MAINTENANCE_COLUMNS, **{"Вид ТО": "ТО-0 (50 м/час)", "Номер заказ-наряда": ""}),
+        ]))
+
+    def test_batch_delete_writes_tombstones_in_one_block(self):
+        maintenance = list(Maintenance.objects.order_by("pk"))
+        machine = Machine.objects.get()
+
+        with CaptureQueriesContext(connection) as single:
+            Maintenance.objects.filter(pk=maintenance[0].pk).delete()
+        Maintenance.objects.bulk_create(maintenance[:1])
+        with CaptureQueriesContext(connection) as batch:
+            Maintenance.objects.all().delete()
+
+        self.assertEqual(len(batch), len(single))
+        tombstones = list(Tombstone.objects.filter(model="maintenance").order_by("pk")[1:])
+        self.assertEqual([tombstone.object_id for tombstone in tombstones], [obj.pk for obj in maintenance])
+        self.assertEqual(
+            [tombstone.version for tombstone in tombstones],
+            list(range(tombstones[0].version, tombstones[0].version + len(maintenance))),
+        )
+        self.assertTrue(all(tombstone.client_id == machine.client_id for tombstone in tombstones))
+
+    def test_models_without_versions_keep_fast_delete(self):
+        user = CustomUser.objects.first()
+        for key in ("a", "b", "c"):
+            IdempotencyRecord.objects.create(user=user, key=key, fingerprint=key)
+
+        with self.assertNumQueries(1):
+            IdempotencyRecord.objects.all().delete()
+
+
+class MetricsEndpointTests(TestCase):
+    def test_closed_without_token(self):
+        with self.settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+    def test_requires_matching_token(self):
+        with self.settings(METRICS_TOKEN="secret"):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            self.assertEqual(
+                self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code,
+                401,
+            )
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"# TYPE silant_http_requests counter", response.content)
+
+
+@override_settings(GROUP_COMMIT_WRITES=True)
+class GroupCommitTests(TransactionTestCase):
+    def setUp(self):
+        self.addCleanup(self.stop_writer)
+
+    def stop_writer(self):
+        if writer._writer is not None:
+            writer._writer.close()
+            writer._writer = None
+
+    def write(self, number):
+        TaskSchedule.objects.create(name=f"schedule-{number}", next_run_at=timezone.now())
+        if number == 3:
+            raise ValueError("rejected")
+        return number
+
+    def test_concurrent_writes_are_committed_and_isolated(self):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = {
+                number: pool.submit(group_commit, partial(self.write, number))
+                for number in range(8)
+            }
+
+        for number, future in futures.items():
+            with self.subTest(number=number):
+                if number == 3:
+                    self.assertRaises(ValueError, future.result)
+                else:
+                    self.assertEqual(future.result(), number)
+        self.assertEqual(
+            sorted(TaskSchedule.objects.values_list("name", flat=True)),
+            [f"schedule-{number}" for number in range(8) if number != 3],
+        )
+        self.assertIsNotNone(writer._writer)
+
+
+# Без транзакции теста: внутри неё всё чтение и так идёт в default
+class ReplicaRouterTests(TransactionTestCase):
+    def read_db(self):
+        return DictionaryEntry.objects.all().db
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.read_db(), "default")
+        with replica_reads():
+            self.assertEqual(self.read_db(), "replica")
+            self.assertEqual(Machine.objects.filter(pk=1).db, "replica")
+
+    def test_reads_in_transaction_stay_on_default(self):
+        with replica_reads():
+            with transaction.atomic():
+                self.assertEqual(self.read_db(), "default")
+            self.assertEqual(self.read_db(), "replica")
+
+    def test_reads_after_write_in_request_stay_on_default(self):
+        def view(request):
+            databases = [self.read_db()]
+            if "write" in request.GET:
+                DictionaryEntry.objects.create(entity="engine_model", name="Д-245")
+            databases.append(self.read_db())
+
+            # Тело потокового ответа читается уже после возврата из представления
+            def content():
+                for database in [*databases, self.read_db()]:
+                    yield f"{database} "
+            return StreamingHttpResponse(content(), content_type="text/plain")
+
+        view = read_from_replica(view)
+        factory = RequestFactory()
+
+        for query, expected in (
+            ({"write": "1"}, b"replica default default "),
+            ({}, b"replica replica replica "),
+        ):
+            with self.subTest(query=query):
+                response = view(factory.get("/", query))
+                self.assertEqual(b"".join(response.streaming_content), expected)
+
+    async def test_async_reads_after_write_stay_on_default(self):
+        @sync_to_async
+        def write_and_read():
+            DictionaryEntry.objects.create(entity="engine_model", name="Д-245")
+            return self.read_db()
+
+        async def view(request):
+            return [await sync_to_async(self.read_db)(), await write_and_read()]
+
+        self.assertEqual(await read_from_replica(view)(RequestFactory().get("/")), ["replica", "default"])
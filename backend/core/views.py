@@ -0,0 +1,26 @@
+import secrets
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from .metrics import render_metrics
+
+
+@require_GET
+def metrics(request):
+    """
+    Метрики всех процессов сервера в текстовом формате Prometheus. Доступ
+    только с Bearer-токеном METRICS_TOKEN; пока токен не задан, эндпоинт
+    закрыт.
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if not token:
+        return HttpResponse(status=403)
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not secrets.compare_digest(supplied, token):
+        return HttpResponse(status=401)
+    return HttpResponse(
+        render_metrics(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -0,0 +1,82 @@
+"""
+Цикл воркера команды run-workers: забирает задания импорта
+(core.importers.jobs) и фоновые задачи (core.tasks) из очередей в БД.
+Один и тот же цикл выполняется в потоке или в отдельном процессе.
+"""
+
+import signal
+import sys
+
+import django
+
+from django.core.management.base import OutputWrapper
+from django.db import close_old_connections, connection
+
+
+class Worker:
+    def __init__(self, name, stop, poll_interval=1.0, batch_size=500, burst=False, stdout=None, stderr=None):
+        self.name = name
+        self.stop = stop
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.burst = burst
+        self.stdout = stdout or OutputWrapper(sys.stdout)
+        self.stderr = stderr or OutputWrapper(sys.stderr)
+
+    def run(self):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                if self.run_once():
+                    continue
+                if self.burst:
+                    return
+                self.stop.wait(self.poll_interval)
+        finally:
+            connection.close()
+
+    def run_once(self):
+        """Выполняет одно задание импорта или задачу; False, если очереди пусты."""
+        # Модули с моделями импортируются после django.setup() (процессы spawn)
+        from core.importers.jobs import claim_job, run_job
+        from core.tasks import claim_task, run_task
+
+        # Импорт загруженных файлов важнее обслуживающих задач
+        job = claim_job(self.name)
+        if job is not None:
+            self.stdout.write(f"[{self.name}] job {job.pk}: importing {job.file_name}...")
+            run_job(job, batch_size=self.batch_size)
+            if job.status == "done":
+                self.stdout.write(
+                    f"[{self.name}] job {job.pk}: created {job.created}, updated {job.updated}, "
+                    f"unchanged {job.unchanged}, rejected {job.rejected}"
+                )
+            else:
+                self.stderr.write(f"[{self.name}] job {job.pk} failed: {job.error}")
+            return True
+
+        task = claim_task(self.name)
+        if task is not None:
+            run_task(task)
+            message = (
+                f"[{self.name}] task {task.pk} {task.name}: {task.status} "
+                f"in {task.duration:.2f}s (attempt {task.attempts}/{task.max_attempts})"
+            )
+            if task.status == "done":
+                self.stdout.write(message)
+            else:
+                self.stderr.write(f"{message}\n{task.last_error}")
+            return True
+
+        return False
+
+
+def run_process(name, stop, options):
+    """Точка входа процесса пула: остановку по Ctrl+C координирует родитель."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # При запуске процессов через spawn Django нужно инициализировать заново
+    django.setup()
+
+    from core.tasks import autodiscover
+    autodiscover()
+    Worker(name, stop, **options).run()
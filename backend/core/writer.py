@@ -0,0 +1,211 @@
+"""
+Групповая фиксация записей ТО и рекламаций. Один поток-писатель на
+процесс собирает сохранения за несколько миллисекунд и фиксирует их
+одной транзакцией - один fsync вместо одного на запись. Каждая запись
+проверяется до записи, поэтому ошибка валидации одной записи не
+затрагивает остальные; новые записи вставляются одним bulk_create.
+
+Кроме объектов моделей писатель выполняет функции записи (group_commit):
+так пакетная выгрузка ТО (api.uploads) при одновременных выгрузках
+фиксирует пачки разных запросов одной транзакцией. Включается настройкой
+GROUP_COMMIT_WRITES; выигрыш измеряет команда bench-group-commit.
+"""
+
+import os
+import queue
+import threading
+import time
+
+from collections import defaultdict
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, transaction
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from .models import SyncCounter
+
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, window=0.005, max_batch=200):
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="group-commit-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def submit(self, item):
+        """
+        Ставит в очередь сохранение объекта модели или функцию записи без
+        аргументов; Future завершится после фиксации (результат функции
+        или сохранённый объект).
+        """
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def close(self):
+        """Дописывает очередь и останавливает поток."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch and batch[-1] is not _STOP:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                close_old_connections()
+                self._commit(batch)
+            if stop:
+                connection.close()
+                return
+
+    def _commit(self, batch):
+        pending = []
+        for item, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            if callable(item):
+                pending.append((item, future))
+                continue
+            # Ошибки валидации возникают до записи и не затрагивают пачку
+            try:
+                item.before_save()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                pending.append((item, future))
+        if not pending:
+            return
+
+        new = [
+            item for item, _ in pending
+            if not callable(item) and item._state.adding and item.pk is None
+        ]
+        try:
+            with transaction.atomic():
+                outcomes = self._write([item for item, _ in pending])
+        except Exception:
+            # Пачка откачена: каждая запись повторяется своей транзакцией,
+            # чтобы ошибка БД досталась только своему вызывающему
+            for instance in new:
+                instance.pk = None
+                instance._state.adding = True
+            for item, future in pending:
+                try:
+                    result = self._write_one(item)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+            return
+
+        for (_, future), (result, error) in zip(pending, outcomes):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _write(self, items):
+        """Запись пачки в открытой транзакции; [(результат, ошибка)] по элементам."""
+        outcomes = []
+        new_by_model = defaultdict(list)
+        for item in items:
+            if callable(item):
+                # Точка сохранения: ошибка функции откатывает только её записи
+                try:
+                    with transaction.atomic():
+                        outcomes.append((item(), None))
+                except Exception as e:
+                    outcomes.append((None, e))
+                continue
+            if item._state.adding and item.pk is None:
+                new_by_model[type(item)].append(item)
+            else:
+                item.save()
+            outcomes.append((item, None))
+
+        for model, objects in new_by_model.items():
+            insert_batch(model, objects)
+        return outcomes
+
+    def _write_one(self, item):
+        if callable(item):
+            with transaction.atomic():
+                return item()
+        item.save()
+        return item
+
+
+def insert_batch(model, objects):
+    """
+    Вставка новых строк модели одним bulk_create. Версии выдаются
+    пакетом, сигналы pre_save/post_save отправляются явно, как при
+    save(). Вызывается внутри транзакции; before_save() уже выполнен.
+    """
+    first_version = SyncCounter.reserve(len(objects))
+    now = timezone.now()
+    for offset, obj in enumerate(objects):
+        obj.version = first_version + offset
+        obj.updated_at = now
+        pre_save.send(sender=model, instance=obj, raw=False, using=DEFAULT_DB_ALIAS, update_fields=None)
+    model.objects.bulk_create(objects)
+    for obj in objects:
+        post_save.send(
+            sender=model, instance=obj, created=True, raw=False,
+            using=DEFAULT_DB_ALIAS, update_fields=None,
+        )
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Писатель текущего процесса (после fork создаётся заново)."""
+    global _writer, _writer_pid
+    with _writer_lock:
+        if _writer is None or _writer_pid != os.getpid():
+            _writer = GroupCommitWriter(
+                window=getattr(settings, "GROUP_COMMIT_WINDOW_MS", 5) / 1000,
+                max_batch=getattr(settings, "GROUP_COMMIT_MAX_BATCH", 200),
+            )
+            _writer_pid = os.getpid()
+        return _writer
+
+
+def group_commit(write):
+    """
+    Выполняет функцию записи write() в транзакции и возвращает её
+    результат; ошибки поднимаются так же, как при прямом вызове. С
+    GROUP_COMMIT_WRITES функция выполняется потоком-писателем вместе с
+    записями других запросов. Внутри транзакции вызывающего - сразу, в ней.
+    """
+    if not getattr(settings, "GROUP_COMMIT_WRITES", False) or connection.in_atomic_block:
+        with transaction.atomic():
+            return write()
+    return get_writer().submit(write).result()
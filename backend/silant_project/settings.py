@@ -1,4 +1,9 @@
+import os
+import sys
+import tempfile
+
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 
 
@@ -29,9 +34,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
 
     'django.middleware.security.SecurityMiddleware',
+    "api.middleware.CompressionMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,11 +66,100 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'silant_project.wsgi.application'
 
+# Async ORM варианты эндпоинтов чтения (api.async_views) - для запуска под ASGI
+ASYNC_READ_VIEWS = False
+
+# Профиль SQLite: PRAGMA выполняются при создании каждого соединения.
+# WAL не блокирует читателей во время записи, busy_timeout (мс) - ожидание
+# блокировки вместо ошибки "database is locked"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # в КиБ
+    "temp_store": "MEMORY",
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        # Постоянные соединения: профиль применяется один раз на соединение
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ";".join(
+                f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()
+            ),
+            # Блокировка на запись берётся в начале транзакции, иначе при
+            # повышении блокировки busy_timeout не помогает
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Реплика для чтения списков, поиска, справочников и выгрузок:
+    # тот же файл WAL, открытый только для чтения (core.routers)
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': (BASE_DIR / 'db.sqlite3').as_uri() + '?mode=ro',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'uri': True,
+            # Режим журнала задаёт только default
+            'init_command': ";".join(
+                f"PRAGMA {name}={value}"
+                for name, value in {**SQLITE_PRAGMAS, "query_only": 1}.items()
+                if name != "journal_mode"
+            ),
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+
+# Групповая фиксация вставок ТО и рекламаций (core.writer): записи,
+# пришедшие за GROUP_COMMIT_WINDOW_MS, фиксируются одной транзакцией.
+# GROUP_COMMIT_WRITES включает её для пакетной выгрузки ТО (api.uploads)
+GROUP_COMMIT_WRITES = False
+GROUP_COMMIT_WINDOW_MS = 5
+GROUP_COMMIT_MAX_BATCH = 200
+
+# Срок хранения ответов по заголовку Idempotency-Key (api.idempotency), с
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+# Запрос без ответа дольше IDEMPOTENCY_PENDING_TIMEOUT (с) считается
+# оборванным (процесс упал или убит), его ключ можно занять повторно
+IDEMPOTENCY_PENDING_TIMEOUT = 60
+
+# Задания импорта (core.importers.jobs): каталог загруженных файлов и
+# отчётов об отклонённых строках. Задание без обновления прогресса дольше
+# IMPORT_JOB_STALE_AFTER (с) возвращается в очередь при запуске run-workers
+IMPORT_UPLOAD_DIR = BASE_DIR / "uploads"
+IMPORT_JOB_STALE_AFTER = 10 * 60
+
+# Фоновые задачи (core.tasks): повтор после ошибки через
+# TASK_RETRY_BACKOFF * 2^(попытка - 1) с; воркер отмечает выполняемую
+# задачу раз в TASK_HEARTBEAT_INTERVAL с, задача без отметки дольше
+# TASK_STALE_AFTER (с) считается брошенной; выполненные задачи хранятся
+# TASK_RESULT_TTL (с)
+TASK_RETRY_BACKOFF = 30
+TASK_HEARTBEAT_INTERVAL = 30
+TASK_STALE_AFTER = 5 * 60
+TASK_RESULT_TTL = 7 * 24 * 60 * 60
+
+# Периодические задачи: имя расписания -> задача и выражение cron (время TIME_ZONE)
+TASK_SCHEDULE = {
+    "purge-idempotency-keys": {
+        "task": "api.tasks.purge_idempotency_keys",
+        "cron": "30 3 * * *",
+    },
+    "purge-finished-tasks": {
+        "task": "core.tasks.purge_finished_tasks",
+        "cron": "0 4 * * *",
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -92,13 +188,88 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = "core.CustomUser"
 
+# Сжатие ответов API (api.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CACHE_MIN_SIZE = 64 * 1024
+COMPRESSION_PATH_PREFIXES = ["/api/"]
+
+# Замер запросов API (api.middleware.RequestTimingMiddleware): заголовок
+# Server-Timing и строка JSON в лог api.timing. Бюджет числа запросов к БД
+# задаётся по имени маршрута, при превышении - предупреждение с SQL
+REQUEST_TIMING_PATH_PREFIXES = ["/api/"]
+QUERY_BUDGETS = {
+    "machine-list": 5,
+    "machine-search": 3,
+    "machine-detail": 5,
+    "dict-entry-list": 3,
+    "bootstrap": 8,
+}
+DEFAULT_QUERY_BUDGET = 20
+
+# Метрики Prometheus (core.metrics, эндпоинт /metrics): каждый процесс
+# пишет значения в свой файл в METRICS_DIR, отображённый в память; каталог
+# общий для всех воркеров сервера, вне дерева исходников. METRICS_TOKEN -
+# Bearer-токен для доступа к /metrics из переменной окружения; без него
+# /metrics отвечает 403. В тестах метрики не пишутся
+METRICS_ENABLED = sys.argv[1:2] != ["test"]
+METRICS_DIR = Path(os.environ.get("SILANT_METRICS_DIR", Path(tempfile.gettempdir()) / "silant-metrics"))
+METRICS_TOKEN = os.environ.get("SILANT_METRICS_TOKEN") or None
+
+# Лог медленных запросов к БД (api.slow_queries): запросы дольше
+# SLOW_QUERY_THRESHOLD секунд (None - выключено) пишутся строкой JSON в
+# SLOW_QUERY_LOG с ротацией, план EXPLAIN QUERY PLAN снимается для каждого
+# отпечатка SQL не чаще раза в SLOW_QUERY_PLAN_INTERVAL секунд.
+# Сводка - python manage.py slow-queries
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_LOG = BASE_DIR / "slow-queries.jsonl"
+SLOW_QUERY_PLAN_INTERVAL = 10 * 60
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+        },
+        "slow_queries": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": SLOW_QUERY_LOG,
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "encoding": "utf-8",
+            "delay": True,
+        },
+    },
+    "loggers": {
+        # DEBUG - строка по каждому запросу API, WARNING - только превышения
+        # QUERY_BUDGETS
+        "api.timing": {
+            "handlers": ["console"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+        "api.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": None,
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
-    "DEFAULT_RENDER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+    # Первый рендерер используется по умолчанию; msgpack - по Accept: application/msgpack
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        *(["api.renderers.MessagePackRenderer"] if find_spec("msgpack") else []),
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
@@ -1,6 +1,8 @@
 from django.urls import path, include
 from django.contrib import admin
 
+from core.views import metrics
+
 
 urlpatterns = [
     path(
@@ -13,4 +15,9 @@ urlpatterns = [
         view=include("api.urls"),
         name="api-v1",
     ),
+    path(
+        route="metrics",
+        view=metrics,
+        name="metrics",
+    ),
 ]